@@ -2,20 +2,29 @@
 # 01_Dedup_pipe_CI_2.7.py
 # ============================================================
 # 실행 흐름:
-#   1) ROOT / BASE 경로 입력 및 확인
+#   1) ROOT / (추가 ROOT) / BASE 경로 입력 및 확인
+#        - 추가 ROOT 를 주면 모든 ROOT 의 크기를 합쳐 한 번에 중복 그룹 산출 (드라이브 간 중복)
+#        - 순회·해시는 디스크(st_dev)별 작업 스레드가 동시에 진행
 #   2) 모드 선택:
 #        1 = DUP 모드     (중복 그룹 TOP N)
 #        2 = BIGFILE 모드 (대용량 중복 그룹 TOP N)
+#        3 = WATCH 모드   (ROOT 감시 데몬, 아래 3~6 없음)
+#        4 = JOIN 모드    (참조 세트 폴더 추가 입력 → 참조 세트에 이미 있는 ROOT 파일)
+#        5 = EXPORT       (이 PC 의 ROOT 색인 파일 생성, 아래 3~6 없음)
+#        6 = MERGE        (여러 PC 의 색인 파일 병합 → 01/04/05 CSV, 리뷰 링크·02 없음)
 #   3) 생성 수량 N 입력 (TOP N 그룹 개수)
 #   4) BASE\Runs\run_YYYYMMDD_HHMM 생성  ← 초 단위 제거
 #        - DUP    : 01_review_dup/ 이하 그룹 폴더 + .lnk
 #        - BIGFILE: 01_review_big/ 이하 그룹 폴더 + .lnk
+#        - JOIN   : 01_review_join/ 이하 그룹 폴더 + .lnk (참조 파일은 mmm 링크로 미리 표시)
 #   5) run_meta.txt 기록 (ROOT/BASE/RUN_ID/MODE/TOP_N 등)
 #   6) 02 실행용 cmd / 텍스트 생성
 #
 # 모드별 동작:
 #   [DUP]
 #     1) 사이즈 → blake3 → SHA256 중복 후보 탐지
+#        - 0바이트는 읽지 않고 한 그룹, SMALL_FILE_KB(64KB) 이하는 1회 읽기 + sha256 1개
+#          (blake3 생략, 카탈로그에 기록 → 다음 실행은 읽지 않음)
 #     2) 그룹 리포트 생성
 #     3) COUNT>=3 필터
 #     4) wasted_bytes 기준 TOP N 그룹 선택
@@ -27,7 +36,60 @@
 #     3) wasted_bytes 기준 TOP N 그룹 선택
 #     4) review 링크 생성
 #
+#   [JOIN] (새 반입 폴더 ROOT × 이미 정리된 아카이브 = 참조 세트)
+#     1) 참조 세트는 크기만 수집 (폴더 목록 캐시 / 감시 카탈로그, 아카이브 재해시 없음)
+#     2) 참조 크기 색인에 있는 크기의 ROOT 파일만 해시
+#     3) 참조 쪽 해시는 참조 카탈로그 값 사용, 카탈로그에 없는 것만 필요할 때 계산
+#     4) 일치 전체 → 01_join_result.csv, wasted_bytes TOP N 그룹 → review 링크
+#        (ROOT 파일 = 02 이동 대상, 참조 파일 = mmm 보존)
+#
+#   [EXPORT / MERGE] (다른 PC 에 연결된 드라이브끼리 비교)
+#     1) 각 PC 에서 EXPORT → BASE\Exports\index_<PC명>_<실행ID>.jsonl.gz
+#        (경로·크기·mtime·sha256·blake3, 해시는 ROOT 카탈로그 재사용)
+#     2) 색인 파일만 한 PC 로 모아 MERGE → (크기, sha256) 중복 그룹, wasted_bytes TOP N
+#        원본 디스크 접근 없음 (CPU 작업). 결과 CSV 에 HOST 열
+#
+#   [WATCH] (dedup_watch.py)
+#     1) ROOT 전체를 카탈로그와 1회 대조 (크기·mtime 이 다른 파일만 해시)
+#     2) Linux = inotify 알림, 그 외/감시 한도 초과 = 폴더 mtime 주기 확인
+#     3) 바뀐 파일을 낮은 우선순위로 다시 해시 → 카탈로그 상시 최신 (Ctrl+C 로 종료)
+#     → 데몬이 inotify 로 ready 인 동안 DUP / BIGFILE 은 ROOT 순회 없이 카탈로그에서 후보 수집
+#       (이때 카탈로그는 읽기 전용 — 기록은 데몬만. 폴더 mtime 폴백 중에는 평소처럼 순회)
+#
+#   하드링크 (같은 (st_dev, st_ino) 의 여러 이름, NTFS / ext4):
+#     - 해시 후보 stat 에서 링크 수 > 1 인 파일은 실제 파일(inode)마다 1번만 읽음
+#     - DUP / BIGFILE 중복 판정·COUNT·wasted_bytes 는 inode 당 1번 → 실제로 확보되는 바이트 기준 TOP N
+#     - 결과 CSV·리뷰 링크에는 모든 이름 (HLn 표시, 이름 하나라도 남으면 공간이 늘지 않음)
+#     - 묶음 목록은 01_hardlink_sets.csv 에도 따로
+#     - JOIN 은 ROOT 쪽 링크 이름을 모두 삭제 후보로 (wasted_bytes 는 실제 파일 기준)
+#
 #   삭제/이동 없음. 리뷰/후보만 생성.
+#
+# 해시 카탈로그 (dedup_catalog.py, GUI 폴더 스캔과 공유):
+#   - ROOT 별 카탈로그에 크기·mtime 이 같은 항목이 있으면 blake3/sha256 재사용
+#   - 새로 읽는 파일은 1회 읽기로 blake3 + sha256 + 앞뒤 64KB 지문을 함께 계산해 기록
+#     → SHA256 단계에서 다시 읽지 않고, GUI 폴더 스캔도 이 파일을 다시 읽지 않음
+#   - 폴더 목록 캐시(.dirs.jsonl): mtime 이 지난 실행과 같은 폴더는 다시 나열하지 않고
+#     저장된 이름·크기·mtime 을 재사용 (파일 stat 없음 — NAS 에서는 폴더 나열 왕복이 생략됨).
+#     크기 버킷 후보만 해시 단계에서 stat → 카탈로그와 대조
+#
+# 모듈로 사용 (GUI 가 같은 프로세스에서 실행):
+#   run_pipeline(DedupOptions(root, base, mode, top_n, extra_roots=[...]),
+#                log=..., progress=..., stop=threading.Event())
+#   - log      : 로그 한 줄씩 전달 (기본 print)
+#   - progress : dedup_progress.ProgressEvent (단계·파일 수·바이트·속도·ETA)
+#   - stop     : 설정되면 다음 파일에서 PipelineStopped 발생
+#   - on_run_dir : RUN_DIR 생성 직후 1회 호출 (GUI 실행 로그 파일 위치 지정)
+#   - pause    : 설정되어 있는 동안 파일 사이에서 대기 (GUI ⏸)
+#   - JOIN 모드는 DedupOptions(..., mode="JOIN", ref_roots=[아카이브 폴더]) 필수
+#   반환값 = 생성된 RUN_DIR
+#
+# 중지 / 이어하기:
+#   - CLI 는 Ctrl+C (Windows Ctrl+Break) → 현재 파일까지 마치고 상태 저장 후 종료
+#   - RUN_DIR\run_state.json 에 완료 단계 기록. 같은 ROOT·모드·N 으로 다시 실행하면
+#     가장 최근 RUN_DIR 이 미완료일 때 그 폴더에서 이어서 진행 (완료 단계 건너뜀)
+#   - 해시 단계는 카탈로그에 저장된 파일을 다시 읽지 않으므로 마지막 완료 파일 다음부터,
+#     리뷰 링크는 이미 만든 .lnk 를 건너뜀
 # ============================================================
 
 import os
@@ -35,11 +97,19 @@ import csv
 import re
 import time
 import hashlib
+import threading
 import subprocess
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 
+import dedup_catalog as catalog
+import dedup_watch as watch
+from dedup_progress import (Reporter, RunState, RUN_STATE_NAME, PipelineStopped,
+                            install_stop_signal)
+
 try:
     from blake3 import blake3
 except Exception as e:
@@ -49,6 +119,7 @@ except Exception as e:
     ) from e
 
 # 기본 경로
+SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_ROOT = r"C:\Users\Meclaser\Desktop\Mec_DB"
 DEFAULT_BASE = r"C:\elice\dedup"
 
@@ -66,6 +137,11 @@ BIG_EXT_WHITELIST = [
 # BIGFILE 모드에서 중복으로 인정할 최소 개수
 BIG_MIN_DUP_COUNT = 2
 
+# 작은 파일 빠른 경로: 이 크기 이하는 1회 읽기 + sha256 1개 (blake3 생략, 카탈로그는 공유),
+# 디스크별 작업자가 그대로 처리 (디스크당 읽기 1개). 0바이트는 읽지 않음.
+SMALL_FILE_KB = 64
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
 PRINT_EVERY_FILES = 5000
 PRINT_EVERY_HASH = 1000
 
@@ -75,8 +151,12 @@ WIN_PATH_RE = re.compile(r"""[A-Za-z]:\\[^\r\n\|\;\,"]+""")
 NEXT_02_SCRIPT = "02_Full_pipe_CI_2.7.py"
 
 
+# 출력 대상 — CLI 는 print, run_pipeline() 호출 중에는 호출 측 log/progress/stop
+_rep = Reporter()
+
+
 def stamp(msg: str):
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+    _rep.log(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 
 def prompt_dir(prompt: str, default: str, must_exist: bool, create_if_missing: bool) -> Path:
@@ -104,74 +184,397 @@ def prompt_dir(prompt: str, default: str, must_exist: bool, create_if_missing: b
         return p
 
 
-# ---------------- 공통 해시 함수 ----------------
+def prompt_ref_roots() -> "list[Path]":
+    """JOIN 모드 참조 세트 (아카이브, ; 로 구분, 1개 이상)"""
+    while True:
+        s = input("참조 세트(아카이브) 폴더 (; 로 구분)\n> ").strip()
+        roots = [Path(x.strip().strip('"')) for x in s.split(";") if x.strip()]
+        bad = [r for r in roots if not r.is_dir()]
+        if roots and not bad:
+            return roots
+        if not roots:
+            print("[ERR] 참조 폴더를 1개 이상 입력하세요.")
+        for r in bad:
+            print(f"[ERR] 폴더가 아님: {r}")
+
+
+def prompt_merge_inputs(BASE: Path) -> "list[Path]":
+    """MERGE 모드 입력 — 색인 파일 또는 폴더 (; 로 구분, Enter=BASE\\Exports)"""
+    default = BASE / "Exports"
+    while True:
+        s = input(f"병합할 색인 파일/폴더 (; 로 구분, Enter={default})\n> ").strip()
+        items = [Path(x.strip().strip('"')) for x in s.split(";") if x.strip()] or [default]
+        bad = [x for x in items if not x.exists()]
+        if not bad:
+            return items
+        for x in bad:
+            print(f"[ERR] 없음: {x}")
 
-def fast_hash(path: str) -> str:
-    h = blake3()
-    with open(path, "rb") as f:
-        for c in iter(lambda: f.read(CHUNK), b""):
-            h.update(c)
-    return h.hexdigest()
+
+def prompt_extra_roots() -> "list[Path]":
+    """다른 드라이브 등 함께 검사할 ROOT (; 로 구분, Enter=없음)"""
+    while True:
+        s = input("추가 ROOT (다른 드라이브 등, ; 로 구분, Enter=없음)\n> ").strip()
+        roots = [Path(x.strip().strip('"')) for x in s.split(";") if x.strip()]
+        bad = [r for r in roots if not r.is_dir()]
+        if not bad:
+            return roots
+        for r in bad:
+            print(f"[ERR] 폴더가 아님: {r}")
 
 
-def sha256_hex(path: str) -> str:
-    h = hashlib.sha256()
+# ---------------- 공통 해시 함수 ----------------
+
+def full_hashes(path: str, cat: "catalog.HashCatalog | None",
+                st: "os.stat_result | None" = None) -> "tuple[str, str]":
+    """
+    (blake3, sha256) 를 파일 1회 읽기로 계산.
+    읽는 김에 GUI 폴더 스캔용 앞뒤 64KB 지문도 만들어 카탈로그에 함께 기록.
+    카탈로그에 크기·mtime 이 같은 항목이 있으면 파일을 읽지 않고 재사용.
+    st : 호출 측이 이미 stat 한 결과 (하드링크 확인용, 없으면 여기서 stat)
+    """
+    if st is None:
+        st = os.stat(path)
+    key = path.lower()
+    if cat is not None:
+        hit = cat.get(key, st.st_size, st.st_mtime_ns)
+        if hit and hit.get("b3") and "sha256" in hit:     # b3 빈 칸 = 작은 파일 빠른 경로 항목
+            return hit["b3"], hit["sha256"]
+
+    h_b3, h_sha = blake3(), hashlib.sha256()
+    head, tail = b"", b""
     with open(path, "rb") as f:
         for c in iter(lambda: f.read(CHUNK), b""):
-            h.update(c)
-    return h.hexdigest()
+            h_b3.update(c)
+            h_sha.update(c)
+            if len(head) < catalog.FP_CHUNK:
+                head += c[:catalog.FP_CHUNK - len(head)]
+            tail = c[-catalog.FP_CHUNK:] if len(c) >= catalog.FP_CHUNK \
+                else (tail + c)[-catalog.FP_CHUNK:]
+    b3, sha = h_b3.hexdigest(), h_sha.hexdigest()
+    if cat is not None:
+        extra = {"b3": b3, "sha256": sha}
+        if key != path:
+            extra["path"] = path          # 감시 카탈로그로 리포트 시 원래 경로
+        cat.put(key, catalog.fingerprint_digest(st.st_size, head, tail),
+                st.st_size, st.st_mtime_ns, extra)
+    return b3, sha
+
+
+def cached_hashes(path: str, cat: "catalog.HashCatalog | None") -> "tuple[str, str] | None":
+    """카탈로그에 크기·mtime 이 같은 항목이 있으면 (blake3, sha256), 없으면 None (파일은 읽지 않음)"""
+    if cat is None:
+        return None
+    st = os.stat(path)
+    hit = cat.get(path.lower(), st.st_size, st.st_mtime_ns)
+    if hit and "b3" in hit and "sha256" in hit:
+        return hit["b3"], hit["sha256"]
+    return None
+
+
+def walk_sizes(ROOT: Path, live: "catalog.HashCatalog | None" = None,
+               dindex: "catalog.DirIndex | None" = None):
+    """
+    (경로, 크기) 순회. 크기를 못 읽은 파일은 크기=None.
+    live 가 주어지면 ROOT 를 돌지 않고 감시 데몬이 유지 중인 카탈로그 항목을 그대로 사용
+    (해시 단계에서 후보 파일만 stat 으로 다시 확인).
+    dindex 가 주어지면 mtime 이 그대로인 폴더는 다시 나열하지 않고 기록된 크기 사용
+    (내용만 바뀐 파일의 크기는 낡을 수 있음 → 해시 단계에서 후보만 다시 stat).
+    """
+    if live is not None:
+        prefix = os.path.join(str(ROOT), "").lower()
+        for key, (_fp, sz, _mt, extra) in list(live.index.items()):
+            if key.startswith(prefix):
+                yield (extra or {}).get("path", key), sz
+        return
+    for root, _depth, _dirs, files in catalog.walk_with_stat(str(ROOT), dindex):
+        for name, sz, _mt in files:
+            yield os.path.join(root, name), (sz if sz >= 0 else None)
+
+
+# ---------------- 여러 ROOT: 디스크별 병렬 순회 / 해시 ----------------
+
+@dataclass
+class RootSource:
+    """ROOT 1개의 순회·해시 자원 (ROOT 별 카탈로그 / 폴더 목록 캐시 / 감시 카탈로그 사용 여부)"""
+    root: Path
+    cat: "catalog.HashCatalog | None" = None
+    live: bool = False
+    dindex: "catalog.DirIndex | None" = None
+
+
+def normalize_roots(roots) -> "list[Path]":
+    """순서 유지, 같은 경로·다른 ROOT 안에 포함된 ROOT 제거 (같은 파일을 두 번 세지 않도록)"""
+    out: "list[Path]" = []
+    for r in roots:
+        r = Path(r)
+        key = os.path.normcase(os.path.abspath(r))
+        if any(key == k or key.startswith(os.path.join(k, "")) for k in
+               (os.path.normcase(os.path.abspath(x)) for x in out)):
+            stamp(f"[WARN] ROOT 중복/포함 — 제외: {r}")
+            continue
+        drop = [x for x in out if os.path.normcase(os.path.abspath(x)).startswith(os.path.join(key, ""))]
+        for x in drop:
+            stamp(f"[WARN] ROOT 중복/포함 — 제외: {x}")
+            out.remove(x)
+        out.append(r)
+    return out
 
 
-# ---------------- DUP 모드: 중복 탐지 ----------------
+def _device_of(root: Path):
+    try:
+        return os.stat(root).st_dev
+    except OSError:
+        return str(root)
 
-def step1_scan_duplicates(ROOT: Path, CSV_DUP: Path):
-    stamp("STEP 1/5: 파일 크기 수집 시작")
-    t0 = time.time()
 
-    size_groups = defaultdict(list)
-    scanned = 0
-    failed = 0
+def run_per_device(sources: "list[RootSource]", fn) -> list:
+    """
+    fn(i, src) 를 ROOT 마다 실행 → ROOT 순서대로 결과 목록.
+    같은 디스크(st_dev) 의 ROOT 는 한 작업자가 차례로, 다른 디스크는 동시에
+    (디스크 하나를 여러 스레드가 읽으면 탐색 경합으로 오히려 느려짐).
+    작업자 예외(PipelineStopped 등)는 그대로 다시 발생.
+    """
+    groups = defaultdict(list)
+    for i, src in enumerate(sources):
+        groups[_device_of(src.root)].append(i)
+    out = [None] * len(sources)
+
+    def work(idx):
+        for i in idx:
+            out[i] = fn(i, sources[i])
+
+    if len(groups) == 1:
+        work(next(iter(groups.values())))
+        return out
+    with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="root") as ex:
+        for f in [ex.submit(work, idx) for idx in groups.values()]:
+            f.result()
+    return out
+
 
-    for root, _, files in os.walk(str(ROOT)):
-        for name in files:
-            p = os.path.join(root, name)
-            scanned += 1
+def collect_sizes(sources: "list[RootSource]", keep, label: str):
+    """
+    모든 ROOT 순회 → ROOT 별 [(경로, 크기)] (keep(경로, 크기) 가 참인 파일만).
+    반환: (ROOT 별 목록, 순회 파일 수, 크기 실패 수)
+    """
+    meter = _rep.meter("scan")
+    lock = threading.Lock()
+    counts = {"failed": 0}
+
+    def walk(_i: int, src: RootSource):
+        files = []
+        for p, sz in walk_sizes(src.root, src.cat if src.live else None, src.dindex):
+            if sz is None:
+                meter.update(1)
+                with lock:
+                    counts["failed"] += 1
+                continue
+            meter.update(1, sz)
+            if keep(p, sz):
+                files.append((p, sz))
+            if meter.files % PRINT_EVERY_FILES == 0:
+                stamp(f"  {label} scanned={meter.files:,}")
+        if src.dindex is not None:
+            src.dindex.save()
+            stamp(f"  {src.root}: 폴더 목록 재사용={src.dindex.reused:,} "
+                  f"다시 나열={src.dindex.listed:,}")
+        return files
+
+    per_src = run_per_device(sources, walk)
+    meter.close()
+    return per_src, meter.files, counts["failed"]
+
+
+def small_hash(path: str, cat: "catalog.HashCatalog | None") -> "tuple[int, str, tuple | None]":
+    """
+    작은 파일: stat → 카탈로그에 크기·mtime 이 같은 항목이 있으면 열지 않음,
+    없으면 한 번의 read 로 전체 → sha256 1개. 새로 읽은 값은 카탈로그에 기록
+    (b3 는 빈 칸, 지문은 읽은 내용에서 fast_fingerprint 와 같은 앞/뒤 구간으로 계산
+    → GUI 폴더 스캔도 재사용. small_file_kb 가 128KB 를 넘어도 같은 지문).
+    반환: (크기, sha256, 하드링크 키 (st_dev, st_ino) | None)
+    """
+    key = path.lower()
+    st = os.stat(path)
+    ino = (st.st_dev, st.st_ino) if st.st_nlink > 1 and st.st_ino else None
+    if cat is not None:
+        hit = cat.get(key, st.st_size, st.st_mtime_ns)
+        if hit and "sha256" in hit:
+            return st.st_size, hit["sha256"], ino
+    with open(path, "rb", buffering=0) as f:
+        data = f.read(st.st_size + 1)
+    sha = hashlib.sha256(data).hexdigest()
+    if cat is not None and len(data) == st.st_size:     # 읽는 중 바뀐 파일은 기록하지 않음
+        extra = {"b3": "", "sha256": sha}
+        if key != path:
+            extra["path"] = path
+        tail = data[-catalog.FP_CHUNK:] if st.st_size > catalog.FP_CHUNK * 2 else None
+        cat.put(key, catalog.fingerprint_digest(st.st_size, data[:catalog.FP_CHUNK], tail),
+                st.st_size, st.st_mtime_ns, extra)
+    return len(data), sha, ino
+
+
+def hash_candidates(sources: "list[RootSource]", cand: "list[list]", label: str,
+                    small_bytes: int = SMALL_FILE_KB * 1024):
+    """
+    ROOT 별 후보 [(경로, 크기)] 를 그 ROOT 의 카탈로그로 해시 (디스크별 병렬).
+    하드링크(같은 (st_dev, st_ino))는 처음 만난 경로만 읽고 나머지는 그 해시를 그대로 사용.
+    빠른 경로 (blake3 없음, 그룹 키의 두 번째 값 = sha256):
+      - 0바이트 : 읽지 않고 빈 내용의 sha256 (폴더 목록 캐시 크기면 stat 으로 확인)
+      - small_bytes 이하 : small_hash() — 카탈로그 항목이 있으면 읽지 않고, 없으면 1회 읽기
+    반환: (fast_groups {(크기, blake3): [경로]}  ← 실제 파일(inode)마다 대표 경로 1개,
+           sha_of {경로: sha256}  ← 하드링크 포함 모든 경로,
+           해시 수, 카탈로그 재사용 수,
+           links {대표 경로: [같은 inode 의 다른 경로]})
+    """
+    meter = _rep.meter("hash", sum(len(c) for c in cand),
+                       sum(sz for c in cand for _, sz in c))
+    # 같은 디스크 = 같은 작업자이므로 작업자끼리 같은 inode 키를 두고 경합하지 않음
+    first_of = {}     # (st_dev, st_ino) → (대표 경로, blake3, sha256, 카탈로그)  링크 수 > 1 인 파일만
+
+    n_zero = sum(1 for c in cand for _, sz in c if sz == 0)
+    n_small = sum(1 for c in cand for _, sz in c if 0 < sz <= small_bytes)
+
+    def work(i: int, src: RootSource):
+        out = []
+        for p, size in cand[i]:
+            if size == 0 and src.dindex is not None:
+                # 폴더 목록 캐시의 크기는 낡았을 수 있음 (빈 파일로 만든 뒤 이어 쓴 로그 등)
+                try:
+                    size = os.stat(p).st_size
+                except OSError:
+                    continue
+            if size == 0:
+                meter.update(1)
+                out.append((p, 0, EMPTY_SHA256, EMPTY_SHA256, None))
+                continue
+            meter.update(1, size)
+            if size <= small_bytes:
+                try:
+                    size, sha, ino = small_hash(p, src.cat)
+                except OSError:
+                    continue
+                first = first_of.setdefault(ino, (p, sha, sha, src.cat)) if ino else None
+                out.append((p, size, sha, sha, first[0] if first and first[0] != p else None))
+                continue
             try:
-                size_groups[os.path.getsize(p)].append(p)
+                st = os.stat(p)
+                size = st.st_size      # 순회 크기는 폴더 목록 캐시 값일 수 있음 → 현재 크기로 그룹
+                ino = (st.st_dev, st.st_ino) if st.st_nlink > 1 and st.st_ino else None
+                first = first_of.get(ino) if ino else None
+                if first is not None:
+                    _copy_entry(first[3], first[0], src.cat, p)
+                    out.append((p, size, first[1], first[2], first[0]))
+                    continue
+                h_fast, sha = full_hashes(p, src.cat, st)
             except Exception:
-                failed += 1
+                continue
+            if ino:
+                first_of[ino] = (p, h_fast, sha, src.cat)
+            out.append((p, size, h_fast, sha, None))
+            if meter.files % PRINT_EVERY_HASH == 0:
+                stamp(f"  {label} blake3 hashed={meter.files:,}")
+        if src.cat is not None:
+            src.cat.flush()
+        return out
 
-            if scanned % PRINT_EVERY_FILES == 0:
-                stamp(f"  scanned={scanned:,} failed={failed:,} size_buckets={len(size_groups):,}")
+    fast_groups = defaultdict(list)
+    sha_of = {}
+    links = defaultdict(list)
+    hashed = 0
+    for rows in run_per_device(sources, work):
+        for p, size, h_fast, sha, primary in rows:
+            sha_of[p] = sha
+            if primary is not None:
+                links[primary].append(p)
+                continue
+            fast_groups[(size, h_fast)].append(p)
+            hashed += 1
+    meter.close()
+    if n_zero or n_small:
+        stamp(f"  {label} 빠른 경로: 0바이트 {n_zero:,}개 (읽지 않음), "
+              f"{small_bytes // 1024}KB 이하 {n_small:,}개 (카탈로그 또는 1회 읽기 + sha256)")
+    hits = sum(src.cat.hits for src in sources if src.cat is not None)
+    return fast_groups, sha_of, hashed, hits, dict(links)
+
+
+def _copy_entry(src_cat: "catalog.HashCatalog | None", src_path: str,
+                cat: "catalog.HashCatalog | None", path: str):
+    """하드링크의 다른 이름도 카탈로그에 같은 값으로 기록 (다음 실행·EXPORT 에서 재사용)"""
+    if src_cat is None or cat is None:
+        return
+    ent = src_cat.index.get(src_path.lower())
+    if ent is None or ent[3] is None:
+        return
+    extra = {k: v for k, v in ent[3].items() if k != "path"}
+    key = path.lower()
+    if key != path:
+        extra["path"] = path
+    if cat.index.get(key) != (ent[0], ent[1], ent[2], extra):
+        cat.put(key, ent[0], ent[1], ent[2], extra)
+
+
+def write_hardlink_sets(CSV_LINKS: Path, links: dict, sha_of: dict) -> int:
+    """
+    하드링크 묶음 (같은 실제 파일의 여러 이름) → CSV. 반환: 묶음 수.
+    중복 그룹·wasted_bytes 에는 대표 경로만 들어가므로 여기 있는 다른 이름은
+    옮겨도 공간이 늘지 않음 (대표 경로를 옮기면 나머지 이름이 파일을 계속 유지).
+    """
+    with CSV_LINKS.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["SET", "SIZE", "SHA256", "ROLE", "FILE_PATH"])
+        for n, (primary, others) in enumerate(sorted(links.items()), start=1):
+            try:
+                size = os.path.getsize(primary)
+            except OSError:
+                size = ""
+            w.writerow([n, size, sha_of.get(primary, ""), "PRIMARY", primary])
+            for p in sorted(others):
+                w.writerow([n, size, sha_of.get(p, ""), "LINK", p])
+    return len(links)
+
+
+# ---------------- DUP 모드: 중복 탐지 ----------------
+
+def step1_scan_duplicates(sources: "list[RootSource]", CSV_DUP: Path, CSV_LINKS: Path,
+                          small_bytes: int = SMALL_FILE_KB * 1024):
+    live = all(src.live for src in sources)
+    stamp("STEP 1/5: 파일 크기 수집 시작" + (" (감시 카탈로그)" if live else "")
+          + (f" — ROOT {len(sources)}개 디스크별 병렬" if len(sources) > 1 else ""))
+    t0 = time.time()
 
-    candidates = {k: v for k, v in size_groups.items() if len(v) > 1}
-    cand_files = sum(len(v) for v in candidates.values())
+    per_src, scanned, failed = collect_sizes(sources, lambda p, sz: True, "STEP 1/5")
+    size_count = defaultdict(int)
+    for files in per_src:
+        for _, sz in files:
+            size_count[sz] += 1
+    # 크기가 겹치는 파일만 후보 — 모든 ROOT 의 크기를 합쳐 판정 (드라이브 간 중복 포함)
+    cand = [[(p, sz) for p, sz in files if size_count[sz] > 1] for files in per_src]
+    del per_src
+    n_buckets = sum(1 for n in size_count.values() if n > 1)
+    cand_files = sum(len(c) for c in cand)
+    stamp(f"  scanned={scanned:,} failed={failed:,} size_buckets={len(size_count):,}")
     stamp(
         "STEP 1/5: 크기 후보 추출 완료 "
-        f"buckets={len(candidates):,} files={cand_files:,} "
+        f"buckets={n_buckets:,} files={cand_files:,} "
         f"(elapsed={time.time()-t0:.1f}s)"
     )
 
     stamp("STEP 1/5: blake3 해시 계산 시작")
     t1 = time.time()
 
-    fast_groups = defaultdict(list)
-    hashed_fast = 0
-
-    for group in candidates.values():
-        for p in group:
-            try:
-                fast_groups[(os.path.getsize(p), fast_hash(p))].append(p)
-                hashed_fast += 1
-            except Exception:
-                pass
-
-            if hashed_fast % PRINT_EVERY_HASH == 0:
-                stamp(f"  blake3 hashed={hashed_fast:,} fast_groups={len(fast_groups):,}")
-
-    stamp(f"STEP 1/5: blake3 완료 (elapsed={time.time()-t1:.1f}s) fast_groups={len(fast_groups):,}")
-
-    stamp("STEP 1/5: SHA256 최종 검증 시작")
+    # 1차 읽기에서 sha256 도 함께 계산 (최종 검증에서 재사용)
+    fast_groups, sha_of, _hashed, hits, links = hash_candidates(sources, cand, "STEP 1/5",
+                                                               small_bytes)
+    stamp(f"STEP 1/5: blake3 완료 (elapsed={time.time()-t1:.1f}s) fast_groups={len(fast_groups):,}"
+          f" catalog_hits={hits:,}")
+    # 하드링크는 같은 실제 파일 → 중복 판정은 대표 경로(inode) 기준,
+    # 결과에는 다른 이름도 함께 (이름 하나라도 남으면 공간이 늘지 않으므로 모두 옮길 대상)
+    n_sets = write_hardlink_sets(CSV_LINKS, links, sha_of)
+    stamp(f"STEP 1/5: 하드링크 묶음 {n_sets:,}개 (다른 이름 {sum(map(len, links.values())):,}개) "
+          f"→ {CSV_LINKS.name}")
+
+    stamp("STEP 1/5: SHA256 최종 검증 시작 (1차 읽기에서 함께 계산한 값 사용)")
     t2 = time.time()
 
     final = defaultdict(list)
@@ -180,11 +583,8 @@ def step1_scan_duplicates(ROOT: Path, CSV_DUP: Path):
     for (size, _fh), files in fast_groups.items():
         if len(files) > 1:
             for p in files:
-                try:
-                    final[(size, sha256_hex(p))].append(p)
-                    hashed_sha += 1
-                except Exception:
-                    pass
+                final[(size, sha_of[p])].append(p)
+                hashed_sha += 1
 
                 if hashed_sha % PRINT_EVERY_HASH == 0:
                     stamp(f"  sha256 hashed={hashed_sha:,} final_groups={len(final):,}")
@@ -197,10 +597,11 @@ def step1_scan_duplicates(ROOT: Path, CSV_DUP: Path):
         w.writerow(["SIZE", "SHA256", "FILE_PATH"])
         out_rows = 0
         for (size, sha), files in final.items():
-            if len(files) > 1:
+            if len(files) > 1:        # 실제 파일(inode) 2개 이상
                 for p in files:
-                    w.writerow([size, sha, p])
-                    out_rows += 1
+                    for name in (p, *links.get(p, ())):
+                        w.writerow([size, sha, name])
+                        out_rows += 1
 
     stamp(
         "STEP 1/5: 완료 -> "
@@ -315,7 +716,7 @@ def step4_big_dup_analysis(CSV_COUNT3: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
     """
     DUP 모드 STEP 4/5
 
-    - COUNT >= MIN_COUNT(기본 3) 그룹만 대상
+    - COUNT >= MIN_COUNT(기본 3) 그룹만 대상 (하드링크 이름은 inode 당 1개로 셈)
     - 각 그룹에서 "가장 큰 파일 1개 크기(max_file_bytes)" 기준으로 TOP N 선정
     - 이 정렬 순서를 그대로 review 그룹 순서에 반영하기 위해
       CSV_BIG_PATHS도 top 리스트 순서대로 기록한다.
@@ -345,15 +746,35 @@ def step4_big_dup_analysis(CSV_COUNT3: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
             max_size = -1
             keeper = ""
             total = 0
-            path_sizes: list[tuple[str, int]] = []
+            path_sizes: list[tuple[str, int, str]] = []
 
+            # 하드링크(같은 inode)의 이름들은 실제 파일 1개 → 바이트·개수는 inode 당 1번
+            inode_of = {}
             for p in paths:
                 try:
-                    sz = os.path.getsize(p)
+                    st = os.stat(p)
+                    sz = st.st_size
+                    inode_of[p] = (st.st_dev, st.st_ino) if st.st_nlink > 1 and st.st_ino else p
                 except OSError:
                     sz = 0
+                    inode_of[p] = p
+                path_sizes.append((p, sz, ""))
+            names = defaultdict(int)
+            for ino in inode_of.values():
+                names[ino] += 1
+            if len(names) < MIN_COUNT:
+                continue  # COUNT 필터 (실제 파일 기준)
+            link_tag = {ino: str(n) for n, ino in
+                        enumerate((i for i, c in names.items() if c > 1), start=1)}
+
+            counted = set()
+            for i, (p, sz, _) in enumerate(path_sizes):
+                ino = inode_of[p]
+                path_sizes[i] = (p, sz, link_tag.get(ino, ""))
+                if ino in counted:
+                    continue
+                counted.add(ino)
                 total += sz
-                path_sizes.append((p, sz))
                 if sz > max_size:
                     max_size = sz
                     keeper = p
@@ -366,7 +787,7 @@ def step4_big_dup_analysis(CSV_COUNT3: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
 
             groups.append({
                 "sha256": sha,
-                "count": len(paths),
+                "count": len(counted),
                 "max_file_bytes": max_size,
                 "total_bytes": total,
                 "wasted_bytes": wasted,
@@ -422,14 +843,15 @@ def step4_big_dup_analysis(CSV_COUNT3: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
     # 05_big_dup_top_paths.csv 작성 (실제 경로 + 크기)
     # 👉 여기서도 top 순서를 그대로 사용하므로,
     #    review 그룹 폴더 순서 = max_file_bytes 기준 순서가 된다.
+    # hardlink = 그룹 안 같은 inode 이름 묶음 번호 (리뷰 링크 이름에 HLn 표시)
     with CSV_BIG_PATHS.open("w", encoding="utf-8-sig", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=["sha256", "path", "size_bytes"])
+        w = csv.DictWriter(f, fieldnames=["sha256", "path", "size_bytes", "hardlink"])
         w.writeheader()
 
         for g in top:  # 이미 max_file_bytes 기준으로 정렬된 상태
             sha = g["sha256"]
-            for p, sz in g["path_sizes"]:
-                w.writerow({"sha256": sha, "path": p, "size_bytes": sz})
+            for p, sz, tag in g["path_sizes"]:
+                w.writerow({"sha256": sha, "path": p, "size_bytes": sz, "hardlink": tag})
 
     stamp(
         "STEP 4/5: 완료 -> "
@@ -439,16 +861,21 @@ def step4_big_dup_analysis(CSV_COUNT3: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
 
 # ---------------- BIGFILE 모드: 대용량 "중복" 후보 그룹 ----------------
 
-def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
-                            min_size_mb: int, max_groups: int,
-                            exts=None):
+def step_bigfile_candidates(sources: "list[RootSource]", CSV_BIG: Path, CSV_BIG_PATHS: Path,
+                            CSV_LINKS: Path, min_size_mb: int, max_groups: int, exts=None,
+                            small_bytes: int = SMALL_FILE_KB * 1024):
     """
     BIGFILE 모드:
       - min_size_mb 이상(+ 확장자 필터)
       - size → blake3 → sha256 중복 그룹(파일 수 >= BIG_MIN_DUP_COUNT)만 대상
       - wasted_bytes 기준 TOP max_groups 그룹 선택
+      - ROOT 가 여럿이면 디스크별로 동시에 순회·해시, 크기 버킷은 모든 ROOT 합산
+      - 감시 데몬이 ready 인 ROOT 는 순회 대신 감시 카탈로그 항목 사용
+      - 하드링크는 1번만 읽고 개수·바이트는 inode 당 1번, 05 CSV 에는 모든 이름 (CSV_LINKS 에도 기록)
     """
-    stamp("BIGFILE MODE: 대용량 중복 그룹 수집 시작")
+    live = all(src.live for src in sources)
+    stamp("BIGFILE MODE: 대용량 중복 그룹 수집 시작" + (" (감시 카탈로그)" if live else "")
+          + (f" — ROOT {len(sources)}개 디스크별 병렬" if len(sources) > 1 else ""))
     t0 = time.time()
 
     min_bytes = min_size_mb * 1024 * 1024
@@ -456,38 +883,25 @@ def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
     if exts:
         exts_norm = {e.lower() for e in exts}
 
-    size_buckets = defaultdict(list)
-    scanned = 0
-
-    for root, _, files in os.walk(str(ROOT)):
-        for name in files:
-            p = os.path.join(root, name)
-            scanned += 1
-            try:
-                size = os.path.getsize(p)
-            except OSError:
-                continue
-
-            if size < min_bytes:
-                continue
-
-            if exts_norm:
-                ext = os.path.splitext(name)[1].lower()
-                if ext not in exts_norm:
-                    continue
-
-            size_buckets[size].append(p)
-
-            if scanned % PRINT_EVERY_FILES == 0:
-                stamp(f"  scanned={scanned:,} big_size_buckets={len(size_buckets):,}")
-
-    # size 기준으로 2개 이상 있는 것만 남김
-    size_buckets = {
-        sz: paths for sz, paths in size_buckets.items()
-        if len(paths) >= BIG_MIN_DUP_COUNT
-    }
-
-    if not size_buckets:
+    def keep(p: str, size: int) -> bool:
+        if size < min_bytes:
+            return False
+        return not exts_norm or os.path.splitext(p)[1].lower() in exts_norm
+
+    per_src, scanned, _failed = collect_sizes(sources, keep, "BIGFILE")
+    size_count = defaultdict(int)
+    for files in per_src:
+        for _, sz in files:
+            size_count[sz] += 1
+    stamp(f"  scanned={scanned:,} big_size_buckets={len(size_count):,}")
+
+    # size 기준으로 2개 이상 있는 것만 남김 (모든 ROOT 합산)
+    cand = [[(p, sz) for p, sz in files if size_count[sz] >= BIG_MIN_DUP_COUNT]
+            for files in per_src]
+    del per_src
+    n_buckets = sum(1 for n in size_count.values() if n >= BIG_MIN_DUP_COUNT)
+
+    if not n_buckets:
         stamp("BIGFILE MODE: 조건에 맞는 '대용량 중복 그룹(size)' 없음.")
         with CSV_BIG.open("w", newline="", encoding="utf-8-sig") as f:
             w = csv.DictWriter(
@@ -500,23 +914,15 @@ def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
             w.writeheader()
         return
 
-    stamp(f"BIGFILE MODE: size 기준 중복 후보 버킷={len(size_buckets):,}")
+    stamp(f"BIGFILE MODE: size 기준 중복 후보 버킷={n_buckets:,}")
 
-    # blake3 1차
-    fast_groups = defaultdict(list)
-    hashed_fast = 0
-
-    for size, paths in size_buckets.items():
-        for p in paths:
-            try:
-                h_fast = fast_hash(p)
-            except Exception:
-                continue
-            fast_groups[(size, h_fast)].append(p)
-            hashed_fast += 1
-
-            if hashed_fast % PRINT_EVERY_HASH == 0:
-                stamp(f"  blake3 hashed={hashed_fast:,} fast_groups={len(fast_groups):,}")
+    # blake3 1차 (sha256 도 같은 읽기에서 계산, 카탈로그 항목은 재사용)
+    fast_groups, sha_of, _hashed, hits, links = hash_candidates(sources, cand, "BIGFILE",
+                                                               small_bytes)
+    stamp(f"BIGFILE MODE: 카탈로그 재사용 {hits:,}개")
+    n_sets = write_hardlink_sets(CSV_LINKS, links, sha_of)
+    if n_sets:
+        stamp(f"BIGFILE MODE: 하드링크 묶음 {n_sets:,}개 (용량은 inode 당 1번) → {CSV_LINKS.name}")
 
     # sha256 최종
     final_groups = defaultdict(list)
@@ -526,10 +932,7 @@ def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
         if len(paths) < BIG_MIN_DUP_COUNT:
             continue
         for p in paths:
-            try:
-                h_sha = sha256_hex(p)
-            except Exception:
-                continue
+            h_sha = sha_of[p]
             final_groups[(size, h_sha)].append(p)
             hashed_sha += 1
 
@@ -591,17 +994,23 @@ def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
         w.writerows(top)
 
     with CSV_BIG_PATHS.open("w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=["sha256", "path", "size_bytes"])
+        w = csv.DictWriter(f, fieldnames=["sha256", "path", "size_bytes", "hardlink"])
         w.writeheader()
         for (size, sha), paths in final_groups.items():
             if sha not in top_sha:
                 continue
+            n_set = 0
             for p in paths:
                 try:
                     sz = os.path.getsize(p)
                 except OSError:
                     sz = size
-                w.writerow({"sha256": sha, "path": p, "size_bytes": sz})
+                tag = ""
+                if links.get(p):
+                    n_set += 1
+                    tag = str(n_set)
+                for name in (p, *links.get(p, ())):
+                    w.writerow({"sha256": sha, "path": name, "size_bytes": sz, "hardlink": tag})
 
     stamp(
         "BIGFILE MODE: 완료 -> "
@@ -609,6 +1018,132 @@ def step_bigfile_candidates(ROOT: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path,
     )
 
 
+# ---------------- JOIN 모드: 참조 세트(아카이브)에 이미 있는 ROOT 파일 ----------------
+
+def step_join_reference(sources: "list[RootSource]", refs: "list[RootSource]",
+                        CSV_JOIN: Path, CSV_BIG: Path, CSV_BIG_PATHS: Path, max_groups: int,
+                        small_bytes: int = SMALL_FILE_KB * 1024):
+    """
+    JOIN 모드 (새 ROOT × 참조 세트):
+      - 참조 세트는 크기만 수집 (폴더 목록 캐시 / 감시 카탈로그 사용, 파일은 읽지 않음)
+      - ROOT 는 참조 크기 색인에 있는 크기의 파일만 해시 (0바이트 제외)
+      - 참조 쪽 해시는 참조 카탈로그에서 가져오고, 카탈로그로 짝을 다 못 찾은
+        크기 버킷의 미기록 파일만 그때 해시 (참조 카탈로그에 기록)
+      - 일치한 ROOT 파일 = 삭제 후보, 참조 파일 1개 = 보존(mmm) → 그룹별 05 CSV
+      - 01_join_result.csv 에 일치 전체, 04/05 에는 wasted_bytes 기준 TOP max_groups
+    """
+    stamp("JOIN MODE: 참조 세트 크기 색인 수집 시작"
+          + (f" — 참조 {len(refs)}개" if len(refs) > 1 else ""))
+    t0 = time.time()
+
+    per_ref, ref_scanned, _failed = collect_sizes(refs, lambda p, sz: sz > 0, "JOIN/REF")
+    ref_by_size = defaultdict(list)       # 크기 → [(참조 번호, 경로)]
+    for i, files in enumerate(per_ref):
+        for p, sz in files:
+            ref_by_size[sz].append((i, p))
+    del per_ref
+    stamp(f"  ref_scanned={ref_scanned:,} ref_sizes={len(ref_by_size):,} "
+          f"(elapsed={time.time()-t0:.1f}s)")
+
+    stamp("JOIN MODE: ROOT 크기 수집 (참조 크기 색인에 있는 크기만 후보)")
+    cand, scanned, failed = collect_sizes(sources, lambda p, sz: sz in ref_by_size, "JOIN")
+    cand_files = sum(len(c) for c in cand)
+    stamp(f"  scanned={scanned:,} failed={failed:,} candidates={cand_files:,}")
+
+    fast_groups, sha_of, hashed, hits, links = hash_candidates(sources, cand, "JOIN", small_bytes)
+    stamp(f"JOIN MODE: ROOT 후보 해시 {hashed:,}개 (카탈로그 재사용 {hits:,}개)")
+
+    # ROOT 쪽 하드링크는 이름을 모두 삭제 후보로 (하나라도 남으면 공간이 늘지 않음)
+    new_by_size = defaultdict(lambda: defaultdict(list))   # 크기 → sha256 → [ROOT 경로]
+    for (size, _fh), paths in fast_groups.items():
+        for p in paths:
+            new_by_size[size][sha_of[p]].extend([p, *links.get(p, ())])
+    del fast_groups, sha_of
+
+    # 참조 쪽: 카탈로그 값 먼저, 짝 없는 해시가 남은 버킷만 미기록 파일을 읽음
+    ref_of = {}                            # (크기, sha256) → 참조 경로
+    missing = [[] for _ in refs]
+    ref_cached = 0
+    for size in sorted(new_by_size):
+        pend = []
+        for i, p in sorted(ref_by_size[size], key=lambda x: x[1]):
+            try:
+                h = cached_hashes(p, refs[i].cat)
+            except OSError:
+                continue
+            if h is None:
+                pend.append((i, p))
+                continue
+            ref_cached += 1
+            ref_of.setdefault((size, h[1]), p)
+        if pend and any((size, sha) not in ref_of for sha in new_by_size[size]):
+            for i, p in pend:
+                missing[i].append((p, size))
+    del ref_by_size
+
+    ref_hashed = sum(len(m) for m in missing)
+    stamp(f"JOIN MODE: 참조 해시 카탈로그 {ref_cached:,}개 / 새로 계산 {ref_hashed:,}개")
+    if ref_hashed:
+        ref_groups, ref_sha, _n, _hits, _links = hash_candidates(refs, missing, "JOIN/REF",
+                                                                 small_bytes)
+        for (size, _fh), paths in ref_groups.items():
+            for p in sorted(paths):
+                ref_of.setdefault((size, ref_sha[p]), p)
+
+    metrics = []
+    groups = {}
+    with CSV_JOIN.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["SIZE", "SHA256", "FILE_PATH", "REF_PATH"])
+        for size in sorted(new_by_size):
+            for sha, paths in new_by_size[size].items():
+                ref = ref_of.get((size, sha))
+                if ref is None:
+                    continue
+                paths.sort()
+                for p in paths:
+                    w.writerow([size, sha, p, ref])
+                groups[sha] = (size, ref, paths)
+                n_phys = len(paths) - sum(len(links.get(p, ())) for p in paths)
+                metrics.append({
+                    "sha256": sha,
+                    "count": len(paths) + 1,
+                    "total_bytes": size * (n_phys + 1),
+                    "wasted_bytes": size * n_phys,       # 실제 파일(inode) 기준
+                    "keeper_candidate_path": ref,
+                })
+
+    matched = sum(m["count"] - 1 for m in metrics)
+    stamp(f"JOIN MODE: 참조 세트에 이미 있는 ROOT 파일 {matched:,}개 "
+          f"({human_bytes(sum(m['wasted_bytes'] for m in metrics))}) -> {CSV_JOIN}")
+
+    metrics.sort(key=lambda x: x["wasted_bytes"], reverse=True)
+    top = metrics[:max_groups]
+
+    with CSV_BIG.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(
+            f,
+            fieldnames=["sha256", "count", "total_bytes", "wasted_bytes", "keeper_candidate_path"]
+        )
+        w.writeheader()
+        w.writerows(top)
+
+    # keep=1 : 참조 파일 (리뷰 링크를 mmm 으로 미리 표시 → 02 에서 이동 대상 아님)
+    with CSV_BIG_PATHS.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=["sha256", "path", "size_bytes", "keep"])
+        w.writeheader()
+        for m in top:
+            size, ref, paths = groups[m["sha256"]]
+            w.writerow({"sha256": m["sha256"], "path": ref, "size_bytes": size, "keep": "1"})
+            for p in paths:
+                w.writerow({"sha256": m["sha256"], "path": p, "size_bytes": size, "keep": ""})
+
+    stamp(
+        "JOIN MODE: 완료 -> "
+        f"{CSV_BIG}, {CSV_BIG_PATHS} groups={len(top):,} (elapsed={time.time()-t0:.1f}s)"
+    )
+
+
 # ---------------- 리뷰 링크 생성 (그룹 폴더 넘버링) ----------------
 
 def safe_filename(s: str, max_len=180) -> str:
@@ -659,6 +1194,8 @@ def step5_make_review_links(CSV_BIG_PATHS: Path, REVIEW_DIR: Path):
     # 입력 CSV: sha256(=그룹ID), path, size_bytes
     #  - DUP 모드   : sha256 = 실제 중복 그룹 해시
     #  - BIGFILE 모드: sha256 = "BIG_0001" 같은 가짜 그룹 ID 또는 실제 해시
+    #  - JOIN 모드  : keep=1 인 행(참조 파일)은 mmm 링크로 미리 표시 (보존)
+    #  - hardlink=n : 같은 실제 파일(inode)의 이름 묶음 → 링크 이름에 HLn 표시
     # 그룹 폴더 이름: 01_SHA_xxx, 02_SHA_xxx ...
     stamp(f"STEP 5: review 링크 생성 시작 -> {REVIEW_DIR}")
     t0 = time.time()
@@ -676,13 +1213,15 @@ def step5_make_review_links(CSV_BIG_PATHS: Path, REVIEW_DIR: Path):
                 sz = int(row.get("size_bytes") or 0)
             except Exception:
                 sz = 0
-            groups[gid].append((p, sz))
+            groups[gid].append((p, sz, bool((row.get("keep") or "").strip()),
+                                (row.get("hardlink") or "").strip()))
 
     made_groups = 0
     made_links = 0
     missing_targets = 0
 
     ordered = list(groups.items())  # dict 삽입 순서 유지
+    meter = _rep.meter("links", sum(len(v) for v in groups.values()))
 
     for idx, (gid, items) in enumerate(ordered, start=1):
         sha_tag = gid[:32] if len(gid) > 32 else gid
@@ -690,9 +1229,9 @@ def step5_make_review_links(CSV_BIG_PATHS: Path, REVIEW_DIR: Path):
         group_dir.mkdir(parents=True, exist_ok=True)
         made_groups += 1
 
-        items.sort(key=lambda x: x[1], reverse=True)
+        items.sort(key=lambda x: (x[2], x[1]), reverse=True)
 
-        for file_idx, (p_str, sz) in enumerate(items, start=1):
+        for file_idx, (p_str, sz, keep, hl) in enumerate(items, start=1):
             target = Path(p_str)
             if not target.exists():
                 missing_targets += 1
@@ -701,7 +1240,12 @@ def step5_make_review_links(CSV_BIG_PATHS: Path, REVIEW_DIR: Path):
             size_tag = format_size_tag(sz)
 
             link_name = f"{file_idx:02d}__{size_tag}__{label}.lnk"
+            if hl:      # 같은 실제 파일의 이름들 — 모두 옮겨야 공간이 늘어남
+                link_name = f"{file_idx:02d}__{size_tag}__HL{hl}__{label}.lnk"
+            if keep:
+                link_name = "mmm__" + link_name
             link_path = group_dir / safe_filename(link_name, max_len=220)
+            meter.update(1)
 
             if link_path.exists():
                 continue
@@ -712,6 +1256,7 @@ def step5_make_review_links(CSV_BIG_PATHS: Path, REVIEW_DIR: Path):
             if made_links % 500 == 0:
                 stamp(f"  shortcuts_created={made_links:,} groups={made_groups:,}")
 
+    meter.close()
     stamp(f"STEP 5: 완료 (elapsed={time.time()-t0:.1f}s)")
     stamp(f"- Review root: {REVIEW_DIR}")
     stamp(f"- Groups created: {made_groups:,}")
@@ -727,6 +1272,10 @@ def prompt_mode() -> str:
         print("[모드 선택]")
         print("  1) DUP 모드     (중복 그룹 TOP N)")
         print("  2) BIGFILE 모드 (대용량 중복 그룹 TOP N)")
+        print("  3) WATCH 모드   (ROOT 감시 → 카탈로그 상시 갱신, Ctrl+C 로 종료)")
+        print("  4) JOIN 모드    (참조 세트(아카이브)에 이미 있는 ROOT 파일 → 삭제 후보)")
+        print("  5) EXPORT       (이 PC 의 ROOT 색인 내보내기 → BASE\\Exports)")
+        print("  6) MERGE        (여러 PC 의 색인 병합 → 중복 그룹 TOP N, ROOT 사용 안 함)")
         s = input("선택 (Enter=2 BIGFILE): ").strip()
 
         if not s:
@@ -735,12 +1284,20 @@ def prompt_mode() -> str:
             return "DUP"
         if s == "2":
             return "BIGFILE"
+        if s == "3":
+            return "WATCH"
+        if s == "4":
+            return "JOIN"
+        if s == "5":
+            return "EXPORT"
+        if s == "6":
+            return "MERGE"
 
         s_up = s.upper()
-        if s_up in ("DUP", "BIGFILE"):
+        if s_up in ("DUP", "BIGFILE", "WATCH", "JOIN", "EXPORT", "MERGE"):
             return s_up
 
-        print("잘못된 입력. 1 / 2 / DUP / BIGFILE 중 하나를 입력하세요.")
+        print("잘못된 입력. 1~6 / DUP / BIGFILE / WATCH / JOIN / EXPORT / MERGE 중 하나를 입력하세요.")
 
 
 def prompt_top_n(default_n: int = 50) -> int:
@@ -793,11 +1350,534 @@ def write_next_02_cmd(BASE: Path, RUN_DIR: Path, sample_n: int = 10):
     except Exception as e:
         stamp(f"[WARN] NEXT_02_CMD.txt 작성 실패: {e}")
 
-    print()
-    print("[NEXT: run 02]")
-    print(f'cd /d "{base_str}"')
-    print(f'py {NEXT_02_SCRIPT} "{run_str}" {sample_n}')
-    print()
+    _rep.log()
+    _rep.log("[NEXT: run 02]")
+    _rep.log(f'cd /d "{base_str}"')
+    _rep.log(f'py {NEXT_02_SCRIPT} "{run_str}" {sample_n}')
+    _rep.log()
+
+
+# ---------------- 엔진 API ----------------
+
+@dataclass
+class DedupOptions:
+    root: Path
+    base: Path
+    mode: str = "BIGFILE"                # "DUP" / "BIGFILE" / "JOIN"
+    top_n: int = 50
+    big_min_size_mb: int = BIG_MIN_SIZE_MB
+    big_exts: "list[str]" = field(default_factory=lambda: list(BIG_EXT_WHITELIST))
+    sample_n: int = 10                   # 02 실행 명령에 넣을 샘플 수
+    resume: bool = True                  # 같은 조건으로 중단된 최근 RUN_DIR 이 있으면 이어서
+    live_index: bool = True              # ROOT 감시 데몬(WATCH) 이 ready 면 순회 없이 카탈로그 사용
+    extra_roots: "list[Path]" = field(default_factory=list)   # 함께 검사할 ROOT (다른 드라이브 등)
+    ref_roots: "list[Path]" = field(default_factory=list)     # JOIN 참조 세트 (아카이브, 삭제 대상 아님)
+    small_file_kb: int = SMALL_FILE_KB   # 이하 크기는 빠른 경로 (1회 읽기 + sha256, 0 = 0바이트만)
+
+
+@dataclass
+class WatchOptions:
+    root: Path
+    base: Path
+    use_inotify: bool = True             # False 면 Linux 에서도 폴더 mtime 주기 확인
+    poll_sec: float = watch.WATCH_POLL_SEC
+    settle_sec: float = watch.WATCH_SETTLE_SEC
+
+
+@dataclass
+class ExportOptions:
+    root: Path
+    base: Path
+    extra_roots: "list[Path]" = field(default_factory=list)
+    live_index: bool = True
+    small_file_kb: int = SMALL_FILE_KB
+
+
+@dataclass
+class MergeOptions:
+    inputs: "list[Path]"                 # 색인 파일 또는 그 파일들이 있는 폴더
+    base: Path
+    top_n: int = 50
+
+
+def _open_source(r: Path, BASE: Path, live_index: bool) -> RootSource:
+    """ROOT 1개의 카탈로그 로드 + 감시 데몬 확인 (ready 가 아니면 폴더 목록 캐시 사용)"""
+    local = catalog.catalog_dir(SCRIPT_DIR) / catalog.catalog_name(r)
+    beat_path = watch.heartbeat_path(local)
+    beat = watch.live_status(beat_path, r) if live_index else None
+    live = beat is not None
+    daemon = beat or watch.daemon_status(beat_path, r)
+    cat = catalog.HashCatalog(
+        local,
+        BASE / catalog.catalog_name(r),
+        warn=stamp,
+        read_only=daemon is not None,   # 데몬이 기록 중인 파일에는 쓰지 않음 (방식 무관, 작은 파일 항목 포함)
+    )
+    n_cat = cat.load()
+    src = RootSource(r, cat, live)
+    stamp(f"CATALOG = {cat.local} ({n_cat:,}개 항목)")
+    if daemon is not None and not live:
+        stamp(f"WATCH   = 감시 데몬 실행 중 (pid={daemon.get('pid')}, 방식={daemon.get('mode')}, "
+              f"ready={daemon.get('ready')}) → 카탈로그 읽기 전용, ROOT 는 평소처럼 순회")
+    if live:
+        stamp(f"LIVE    = 감시 데몬 실행 중 (pid={beat.get('pid')}, 방식={beat.get('mode')}) "
+              "→ ROOT 순회 생략, 카탈로그에서 후보 수집")
+    else:
+        # mtime 이 그대로인 폴더는 나열·파일 stat 없이 기록된 크기 사용 (후보는 해시 단계에서 stat)
+        src.dindex = catalog.DirIndex(catalog.dirs_path(cat.local))
+        stamp(f"DIRS    = {src.dindex.path} ({src.dindex.load():,}개 폴더)")
+    return src
+
+
+def _find_resumable_run(runs_root: Path, mode_suffix: str, key: dict):
+    """가장 최근 run_*_<suffix> 폴더가 같은 key 로 중단된 상태면 (폴더, RunState), 아니면 (None, None)"""
+    runs = sorted(runs_root.glob(f"run_*_{mode_suffix}"), reverse=True)
+    if runs:
+        state = RunState.load(runs[0] / RUN_STATE_NAME, key)
+        if state is not None:
+            return runs[0], state
+    return None, None
+
+
+def run_pipeline(opts: DedupOptions, log=None, progress=None, stop=None,
+                 on_run_dir=None, pause=None) -> Path:
+    """
+    입력 프롬프트 없이 DUP / BIGFILE / JOIN 파이프라인 실행 → RUN_DIR 반환.
+    log(str) / progress(ProgressEvent) / stop·pause(threading.Event) /
+    on_run_dir(Path) 는 모두 선택.
+    중지 요청 시 dedup_progress.PipelineStopped 발생 (카탈로그·완료 단계는 그때까지 기록).
+    """
+    global _rep
+    prev, _rep = _rep, Reporter(log, progress, stop, pause)
+    sources: "list[RootSource]" = []
+    refs: "list[RootSource]" = []
+    try:
+        BASE = Path(opts.base)
+        mode = opts.mode.upper()
+        if mode not in ("DUP", "BIGFILE", "JOIN"):
+            raise ValueError(f"알 수 없는 모드: {opts.mode}")
+        ROOTS = normalize_roots([opts.root, *opts.extra_roots])
+        REFS = normalize_roots(opts.ref_roots) if mode == "JOIN" else []
+        if mode == "JOIN" and not REFS:
+            raise ValueError("JOIN 모드에는 참조 세트 폴더가 필요함")
+        for r in ROOTS + REFS:
+            if not r.is_dir():
+                raise FileNotFoundError(f"ROOT 폴더가 없음: {r}")
+        # 참조 세트와 겹치면 같은 파일이 자기 자신과 일치 → 삭제 후보가 됨
+        for r in ROOTS:
+            for ref in REFS:
+                a, b = (os.path.normcase(os.path.abspath(x)) for x in (r, ref))
+                if a == b or a.startswith(os.path.join(b, "")) or b.startswith(os.path.join(a, "")):
+                    raise ValueError(f"ROOT 와 참조 세트가 겹침: {r} / {ref}")
+        ROOT = ROOTS[0]
+        BASE.mkdir(parents=True, exist_ok=True)
+
+        # 모드에 따라 run 폴더 이름에 suffix 부여
+        #    예: run_20260126_0553_dup, run_20260126_0553_big, run_20260126_0553_join
+        if mode == "DUP":
+            mode_suffix = "dup"
+            review_sub = "01_review_dup"
+        elif mode == "JOIN":
+            mode_suffix = "join"
+            review_sub = "01_review_join"
+        else:
+            mode_suffix = "big"
+            review_sub = "01_review_big"
+
+        RUNS_ROOT = BASE / "Runs"
+        RUNS_ROOT.mkdir(parents=True, exist_ok=True)
+
+        # 이어하기: 같은 ROOT·모드·N 으로 중단된 최근 RUN_DIR 재사용
+        key = {"root": str(ROOT), "mode": mode, "top_n": opts.top_n}
+        if len(ROOTS) > 1:
+            key["roots"] = [str(r) for r in ROOTS]
+        if REFS:
+            key["refs"] = [str(r) for r in REFS]
+        RUN_DIR, state = _find_resumable_run(RUNS_ROOT, mode_suffix, key) \
+            if opts.resume else (None, None)
+        resuming = RUN_DIR is not None
+        if resuming:
+            RUN_ID = RUN_DIR.name[len("run_"):-len(mode_suffix) - 1]
+        else:
+            RUN_ID = datetime.now().strftime("%Y%m%d_%H%M")
+            RUN_DIR = RUNS_ROOT / f"run_{RUN_ID}_{mode_suffix}"
+            state = RunState(RUN_DIR / RUN_STATE_NAME, key)
+        REVIEW_DIR = RUN_DIR / review_sub
+
+        stamp(f"RUN_ID = {RUN_ID}")
+        for i, r in enumerate(ROOTS):
+            stamp(f"ROOT   = {r}" if i == 0 else f"       + {r}")
+        stamp(f"BASE   = {BASE}")
+        if resuming:
+            stamp(f"RESUME: 중단된 실행을 이어서 진행 (완료 단계: {', '.join(state.stages) or '없음'})")
+
+        RUN_DIR.mkdir(parents=True, exist_ok=True)
+        REVIEW_DIR.mkdir(parents=True, exist_ok=True)
+        if on_run_dir is not None:
+            on_run_dir(RUN_DIR)
+
+        # 기본 CSV 경로 (이름은 그대로)
+        CSV_DUP = RUN_DIR / "01_duplicate_result.csv"
+        CSV_JOIN = RUN_DIR / "01_join_result.csv"
+        CSV_LINKS = RUN_DIR / "01_hardlink_sets.csv"
+        small_bytes = opts.small_file_kb * 1024
+        CSV_GROUP = RUN_DIR / "02_grouped_report.csv"
+        TXT_GROUP = RUN_DIR / "02_grouped_report.txt"
+        CSV_COUNT3 = RUN_DIR / "03_count_3_plus.csv"
+        CSV_BIG = RUN_DIR / "04_big_dup_top.csv"
+        CSV_BIG_PATHS = RUN_DIR / "05_big_dup_top_paths.csv"
+
+        # run_meta.txt 기록
+        meta_path = RUN_DIR / "run_meta.txt"
+        try:
+            with meta_path.open("w", encoding="utf-8") as f:
+                f.write(f"ROOT={ROOT}\n")
+                if len(ROOTS) > 1:
+                    f.write(f"ROOTS={';'.join(str(r) for r in ROOTS)}\n")
+                if REFS:
+                    f.write(f"REFS={';'.join(str(r) for r in REFS)}\n")
+                f.write(f"BASE={BASE}\n")
+                f.write(f"RUN_ID={RUN_ID}\n")
+                f.write(f"MODE={mode}\n")
+                f.write(f"TOP_N={opts.top_n}\n")
+        except Exception as e:
+            stamp(f"[WARN] run_meta.txt 기록 실패: {e}")
+        state.save()
+
+        def stage(name: str, fn, *args):
+            """완료 기록이 있는 단계는 건너뛰고, 끝나면 완료로 기록"""
+            if state.done(name):
+                stamp(f"RESUME: {name} — 이전 실행에서 완료, 건너뜀")
+                return
+            fn(*args)
+            state.mark(name)
+
+        stamp(f"RUN_DIR = {RUN_DIR}")
+        stamp(f"MODE    = {mode}")
+        stamp(f"TOP_N   = {opts.top_n}")
+
+        # ROOT 별 해시 카탈로그 (GUI 폴더 스캔 체크포인트와 같은 파일) + 폴더 목록 캐시
+        for r in ROOTS:
+            sources.append(_open_source(r, BASE, opts.live_index))
+        for r in REFS:
+            stamp(f"REF     = {r}")
+            refs.append(_open_source(r, BASE, opts.live_index))
+
+        # ---------------- 실제 파이프라인 실행 ----------------
+        if mode == "DUP":
+            stamp("=== DUP 모드 파이프라인 시작 ===")
+            # 1) 전체 중복 탐지
+            stage("scan_duplicates", step1_scan_duplicates, sources, CSV_DUP, CSV_LINKS,
+                  small_bytes)
+            # 2) 그룹 리포트
+            stage("group_report", step2_group_report, CSV_DUP, CSV_GROUP, TXT_GROUP)
+            # 3) COUNT>=3 필터
+            stage("count_filter", step3_count_filter, CSV_GROUP, CSV_COUNT3)
+            # 4) wasted_bytes 기준 TOP N 그룹 선택
+            stage("top_analysis", step4_big_dup_analysis,
+                  CSV_COUNT3, CSV_BIG, CSV_BIG_PATHS, opts.top_n)
+            # 5) 리뷰 링크 생성
+            stage("review_links", step5_make_review_links, CSV_BIG_PATHS, REVIEW_DIR)
+        elif mode == "JOIN":
+            stamp("=== JOIN 모드 파이프라인 시작 ===")
+            # 참조 세트에 이미 있는 ROOT 파일 → 삭제 후보 (참조 파일은 mmm 보존)
+            stage("join_reference", step_join_reference, sources, refs,
+                  CSV_JOIN, CSV_BIG, CSV_BIG_PATHS, opts.top_n, small_bytes)
+            # 리뷰 링크 생성
+            stage("review_links", step5_make_review_links, CSV_BIG_PATHS, REVIEW_DIR)
+        else:
+            stamp("=== BIGFILE 모드 파이프라인 시작 ===")
+            # 대용량 중복 그룹 후보 수집 + TOP N
+            stage(
+                "bigfile_candidates",
+                step_bigfile_candidates,
+                sources,
+                CSV_BIG,
+                CSV_BIG_PATHS,
+                CSV_LINKS,
+                opts.big_min_size_mb,
+                opts.top_n,
+                opts.big_exts,
+                small_bytes,
+            )
+            # 리뷰 링크 생성
+            stage("review_links", step5_make_review_links, CSV_BIG_PATHS, REVIEW_DIR)
+
+        # 02 실행용 cmd / 텍스트 생성
+        write_next_02_cmd(BASE, RUN_DIR, sample_n=opts.sample_n)
+        state.finish()
+        return RUN_DIR
+    except PipelineStopped:
+        stamp("STOP: 중단됨 — 완료 단계와 해시는 저장됨. "
+              "같은 ROOT·BASE·모드·N 으로 다시 실행하면 이어서 진행합니다.")
+        raise
+    finally:
+        for src in sources + refs:
+            src.cat.flush()
+        _rep = prev
+
+
+def run_watch(opts: WatchOptions, log=None, stop=None):
+    """
+    ROOT 감시 데몬 — stop 이 설정될 때까지 카탈로그를 최신으로 유지 (dedup_watch).
+    바뀐 파일은 full_hashes 로 다시 해시 (blake3 + sha256 + 지문, 1회 읽기).
+    """
+    global _rep
+    prev, _rep = _rep, Reporter(log, None, stop)
+    cat = None
+    try:
+        ROOT, BASE = Path(opts.root), Path(opts.base)
+        if not ROOT.is_dir():
+            raise FileNotFoundError(f"ROOT 폴더가 없음: {ROOT}")
+        BASE.mkdir(parents=True, exist_ok=True)
+
+        cat = catalog.HashCatalog(
+            catalog.catalog_dir(SCRIPT_DIR) / catalog.catalog_name(ROOT),
+            BASE / catalog.catalog_name(ROOT),
+            warn=stamp,
+        )
+        n_cat = cat.load()
+        stamp(f"ROOT    = {ROOT}")
+        stamp(f"CATALOG = {cat.local} ({n_cat:,}개 항목)")
+
+        watch.lower_priority()
+        watcher = watch.CatalogWatcher(
+            ROOT, cat,
+            hash_file=lambda p: full_hashes(p, cat),
+            log=stamp,
+            stop=stop if stop is not None else threading.Event(),
+            use_inotify=opts.use_inotify,
+            poll_sec=opts.poll_sec,
+            settle_sec=opts.settle_sec,
+            beat=watch.heartbeat_path(cat.local),
+        )
+        watcher.run()
+    finally:
+        if cat is not None:
+            cat.flush()
+        _rep = prev
+
+
+# ---------------- EXPORT / MERGE: PC 간 색인 ----------------
+
+def run_export(opts: ExportOptions, log=None, progress=None, stop=None, pause=None) -> Path:
+    """
+    이 PC 의 ROOT(들) 전체를 해시해 이식 가능한 색인 파일로 내보냄 → 파일 경로 반환.
+    해시는 ROOT 카탈로그 재사용 (처음 한 번만 전체 읽기, 중지 후 다시 실행하면 이어서).
+    """
+    global _rep
+    prev, _rep = _rep, Reporter(log, progress, stop, pause)
+    sources: "list[RootSource]" = []
+    try:
+        BASE = Path(opts.base)
+        ROOTS = normalize_roots([opts.root, *opts.extra_roots])
+        for r in ROOTS:
+            if not r.is_dir():
+                raise FileNotFoundError(f"ROOT 폴더가 없음: {r}")
+        BASE.mkdir(parents=True, exist_ok=True)
+        out = BASE / "Exports" / catalog.export_name(datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+        for i, r in enumerate(ROOTS):
+            stamp(f"ROOT   = {r}" if i == 0 else f"       + {r}")
+        for r in ROOTS:
+            sources.append(_open_source(r, BASE, opts.live_index))
+
+        stamp("EXPORT: 파일 목록 수집 시작")
+        t0 = time.time()
+        per_src, scanned, failed = collect_sizes(sources, lambda p, sz: True, "EXPORT")
+        stamp(f"  scanned={scanned:,} failed={failed:,} (elapsed={time.time()-t0:.1f}s)")
+
+        stamp("EXPORT: 해시 시작 (카탈로그에 크기·mtime 이 같은 항목은 읽지 않음)")
+        _fg, sha_of, hashed, hits, _links = hash_candidates(sources, per_src, "EXPORT",
+                                                           opts.small_file_kb * 1024)
+        del _fg
+        stamp(f"EXPORT: 해시 {hashed:,}개 (카탈로그 재사용 {hits:,}개)")
+
+        def rows():
+            for src, files in zip(sources, per_src):
+                for p, _sz in files:
+                    if p not in sha_of:
+                        continue      # 읽기 실패
+                    ent = src.cat.index.get(p.lower())
+                    if ent is not None and ent[3] and ent[3].get("sha256") == sha_of[p]:
+                        yield p, ent[1], ent[2], sha_of[p], ent[3].get("b3", "")
+                        continue
+                    # 0바이트 파일 (읽지 않으므로 카탈로그에 없음) — blake3 는 빈 칸
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    yield p, st.st_size, st.st_mtime_ns, sha_of[p], ""
+
+        n = catalog.write_export(out, [str(r) for r in ROOTS], rows())
+        stamp(f"EXPORT: 완료 -> {out} files={n:,} ({human_bytes(out.stat().st_size)}) "
+              f"(total_elapsed={time.time()-t0:.1f}s)")
+        return out
+    except PipelineStopped:
+        stamp("STOP: 중단됨 — 해시는 카탈로그에 저장됨. 다시 실행하면 읽은 파일은 건너뜁니다.")
+        raise
+    finally:
+        for src in sources:
+            src.cat.flush()
+        _rep = prev
+
+
+def _merge_inputs(inputs: "list[Path]") -> "list[Path]":
+    """파일은 그대로, 폴더는 안의 index_*.jsonl.gz 전부"""
+    files = []
+    for x in inputs:
+        x = Path(x)
+        files.extend(sorted(x.glob("index_*.jsonl.gz")) if x.is_dir() else [x])
+    return files
+
+
+def step_merge_groups(indexes: "list[tuple[dict, list]]", CSV_DUP: Path, CSV_BIG: Path,
+                      CSV_BIG_PATHS: Path, top_n: int):
+    """
+    MERGE 모드: 여러 PC 의 색인 → (크기, sha256) 중복 그룹 + wasted_bytes TOP N.
+    원본 디스크를 읽지 않음 (크기·해시는 모두 색인 값).
+    같은 PC 의 같은 ROOT 를 더 최근(created)에 온전히 내보낸 색인이 있으면 이전 색인의
+    그 ROOT 아래 행은 모두 버림 (정리 후 다시 내보낸 경우 지운 파일이 되살아나지 않도록).
+    전송 중 잘린 색인은 ROOT 전체를 대신하지 못하므로 이전 색인을 버리지 않음.
+    그래도 같은 PC·경로가 여러 색인에 있으면 최근 색인의 값만 사용.
+    """
+    stamp("MERGE: 색인 병합 시작")
+    t0 = time.time()
+
+    def _host(head: dict) -> str:
+        return str(head.get("host") or "?")
+
+    def _created(head: dict) -> str:
+        return str(head.get("created", ""))
+
+    covers = defaultdict(list)   # PC 소문자 → [(created, ROOT 접두어들)]  잘리지 않은 색인만
+    for head, _rows in indexes:
+        if head.get("truncated"):
+            continue
+        prefixes = tuple(str(r).rstrip("\\/").lower() + sep
+                         for r in head.get("roots") or () for sep in ("\\", "/"))
+        covers[_host(head).lower()].append((_created(head), prefixes))
+
+    latest = {}    # (PC, 경로 소문자) → (PC, 경로, 크기, sha256)
+    n_dropped = 0
+    for head, rows in sorted(indexes, key=lambda x: _created(x[0])):
+        host, created = _host(head), _created(head)
+        newer = tuple(p for c, ps in covers[host.lower()] if c > created for p in ps)
+        for p, sz, _mt, sha, _b3 in rows:
+            key = p.lower()
+            if newer and key.startswith(newer):
+                n_dropped += 1
+                continue
+            latest[(host.lower(), key)] = (host, p, sz, sha)
+    if n_dropped:
+        stamp(f"  이전 색인 행 {n_dropped:,}개 제외 (같은 PC·ROOT 의 최근 색인으로 대체)")
+
+    groups = defaultdict(list)
+    for host, p, sz, sha in latest.values():
+        groups[(sz, sha)].append((host, p))
+    del latest
+    dup = {k: sorted(v) for k, v in groups.items() if len(v) > 1}
+    del groups
+    stamp(f"  files={sum(len(r) for _, r in indexes):,} duplicate groups(sha+size)={len(dup):,}")
+
+    with CSV_DUP.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["SIZE", "SHA256", "HOST", "FILE_PATH"])
+        for (size, sha), items in dup.items():
+            for host, p in items:
+                w.writerow([size, sha, host, p])
+
+    metrics = []
+    for (size, sha), items in dup.items():
+        if size <= 0:
+            continue          # 빈 파일 그룹은 TOP 대상 아님 (DUP STEP 4 와 동일)
+        metrics.append({
+            "sha256": sha,
+            "count": len(items),
+            "hosts": len({h.lower() for h, _ in items}),
+            "total_bytes": size * len(items),
+            "wasted_bytes": size * (len(items) - 1),
+            "keeper_candidate_host": items[0][0],
+            "keeper_candidate_path": items[0][1],
+        })
+    cross = [m for m in metrics if m["hosts"] > 1]
+    stamp(f"  PC 간 중복 그룹={len(cross):,} "
+          f"({human_bytes(sum(m['wasted_bytes'] for m in cross))} 절감 가능)")
+
+    metrics.sort(key=lambda x: x["wasted_bytes"], reverse=True)
+    top = metrics[:top_n]
+
+    with CSV_BIG.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=["sha256", "count", "hosts", "total_bytes", "wasted_bytes",
+                                          "keeper_candidate_host", "keeper_candidate_path"])
+        w.writeheader()
+        w.writerows(top)
+
+    with CSV_BIG_PATHS.open("w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=["sha256", "host", "path", "size_bytes"])
+        w.writeheader()
+        size_of = {sha: size for size, sha in dup}
+        for m in top:
+            size = size_of[m["sha256"]]
+            for host, p in dup[(size, m["sha256"])]:
+                w.writerow({"sha256": m["sha256"], "host": host, "path": p, "size_bytes": size})
+
+    stamp(
+        "MERGE: 완료 -> "
+        f"{CSV_BIG}, {CSV_BIG_PATHS} groups={len(top):,} (elapsed={time.time()-t0:.1f}s)"
+    )
+
+
+def run_merge(opts: MergeOptions, log=None, progress=None, stop=None, pause=None) -> Path:
+    """
+    여러 PC 에서 내보낸 색인을 합쳐 중복 그룹·TOP N 산출 → RUN_DIR 반환.
+    원본 디스크에 접근하지 않으므로 리뷰 링크 / 02 단계는 없음
+    (05 CSV 의 host·path 로 각 PC 에서 정리).
+    """
+    global _rep
+    prev, _rep = _rep, Reporter(log, progress, stop, pause)
+    try:
+        BASE = Path(opts.base)
+        files = _merge_inputs(opts.inputs)
+        if not files:
+            raise FileNotFoundError("병합할 색인 파일이 없음 (index_*.jsonl.gz)")
+
+        RUN_ID = datetime.now().strftime("%Y%m%d_%H%M")
+        RUN_DIR = BASE / "Runs" / f"run_{RUN_ID}_merge"
+        RUN_DIR.mkdir(parents=True, exist_ok=True)
+        stamp(f"RUN_ID = {RUN_ID}")
+        stamp(f"RUN_DIR = {RUN_DIR}")
+
+        indexes = []
+        meter = _rep.meter("load", len(files))
+        for f in files:
+            head, rows = catalog.read_export(f)
+            meter.update(1, f.stat().st_size)
+            stamp(f"INDEX  = {f.name} (PC={head.get('host')}, {head.get('created')}, "
+                  f"{len(rows):,}개 파일, ROOT={';'.join(head.get('roots') or [])})")
+            if head.get("truncated"):
+                stamp(f"[WARN] 잘린 색인 — 읽은 곳까지만 사용: {f}")
+            indexes.append((head, rows))
+        meter.close()
+
+        try:
+            with (RUN_DIR / "run_meta.txt").open("w", encoding="utf-8") as f:
+                f.write(f"INDEXES={';'.join(str(x) for x in files)}\n")
+                f.write(f"BASE={BASE}\n")
+                f.write(f"RUN_ID={RUN_ID}\n")
+                f.write("MODE=MERGE\n")
+                f.write(f"TOP_N={opts.top_n}\n")
+        except Exception as e:
+            stamp(f"[WARN] run_meta.txt 기록 실패: {e}")
+
+        step_merge_groups(indexes, RUN_DIR / "01_duplicate_result.csv",
+                          RUN_DIR / "04_big_dup_top.csv", RUN_DIR / "05_big_dup_top_paths.csv",
+                          opts.top_n)
+        stamp("MERGE: 원본이 다른 PC 에 있으므로 리뷰 링크는 만들지 않음 — "
+              "05_big_dup_top_paths.csv 의 host/path 로 각 PC 에서 정리")
+        return RUN_DIR
+    finally:
+        _rep = prev
 
 
 # ---------------- main ----------------
@@ -812,6 +1892,8 @@ def main():
         create_if_missing=False
     )
 
+    extra_roots = prompt_extra_roots()
+
     BASE = prompt_dir(
         prompt="결과 폴더(BASE)를 입력 (Enter=기본값, 없으면 생성)",
         default=DEFAULT_BASE,
@@ -819,96 +1901,40 @@ def main():
         create_if_missing=True
     )
 
-    # 1) 먼저 RUN_ID만 시간 기준으로 만든 뒤
-    RUN_ID = datetime.now().strftime("%Y%m%d_%H%M")
-
-    # 2) 모드/개수부터 선택
     print()
-    stamp(f"RUN_ID = {RUN_ID}")
     stamp(f"ROOT   = {ROOT}")
+    for r in extra_roots:
+        stamp(f"       + {r}")
     stamp(f"BASE   = {BASE}")
     print("위 경로/폴더 구성이 맞는지 확인하세요. (잘못되었으면 Ctrl+C로 중단)")
 
     mode = prompt_mode()
+    stop = threading.Event()
+    if mode == "WATCH":
+        install_stop_signal(stop)
+        run_watch(WatchOptions(ROOT, BASE), stop=stop)
+        return
+    if mode == "EXPORT":
+        install_stop_signal(stop)
+        try:
+            run_export(ExportOptions(ROOT, BASE, extra_roots), stop=stop)
+        except PipelineStopped:
+            pass
+        return
+    if mode == "MERGE":
+        inputs = prompt_merge_inputs(BASE)
+        run_merge(MergeOptions(inputs, BASE, prompt_top_n(default_n=50)))
+        return
+    ref_roots = prompt_ref_roots() if mode == "JOIN" else []
     top_n = prompt_top_n(default_n=50)
 
-    # 3) 모드에 따라 run 폴더 이름에 suffix 부여
-    #    예: run_20260126_0553_dup, run_20260126_0553_big
-    if mode == "DUP":
-        mode_suffix = "dup"
-        review_sub = "01_review_dup"
-    else:
-        mode_suffix = "big"
-        review_sub = "01_review_big"
-
-    RUNS_ROOT = BASE / "Runs"
-    RUNS_ROOT.mkdir(parents=True, exist_ok=True)
-
-    RUN_DIR = RUNS_ROOT / f"run_{RUN_ID}_{mode_suffix}"
-    REVIEW_DIR = RUN_DIR / review_sub
-
-    RUN_DIR.mkdir(parents=True, exist_ok=True)
-    REVIEW_DIR.mkdir(parents=True, exist_ok=True)
-
-    # 기본 CSV 경로 (이름은 그대로)
-    CSV_DUP = RUN_DIR / "01_duplicate_result.csv"
-    CSV_GROUP = RUN_DIR / "02_grouped_report.csv"
-    TXT_GROUP = RUN_DIR / "02_grouped_report.txt"
-    CSV_COUNT3 = RUN_DIR / "03_count_3_plus.csv"
-    CSV_BIG = RUN_DIR / "04_big_dup_top.csv"
-    CSV_BIG_PATHS = RUN_DIR / "05_big_dup_top_paths.csv"
-
-    # run_meta.txt 기록
-    meta_path = RUN_DIR / "run_meta.txt"
+    install_stop_signal(stop)
     try:
-        with meta_path.open("w", encoding="utf-8") as f:
-            f.write(f"ROOT={ROOT}\n")
-            f.write(f"BASE={BASE}\n")
-            f.write(f"RUN_ID={RUN_ID}\n")
-            f.write(f"MODE={mode}\n")
-            f.write(f"TOP_N={top_n}\n")
-    except Exception as e:
-        stamp(f"[WARN] run_meta.txt 기록 실패: {e}")
-
-    stamp(f"RUN_DIR = {RUN_DIR}")
-    stamp(f"MODE    = {mode}")
-    stamp(f"TOP_N   = {top_n}")
-    stamp(f"RUN_DIR = {RUN_DIR}")
-    stamp(f"MODE    = {mode}")
-    stamp(f"TOP_N   = {top_n}")
-
-    # ---------------- 실제 파이프라인 실행 ----------------
-    if mode == "DUP":
-        stamp("=== DUP 모드 파이프라인 시작 ===")
-        # 1) 전체 중복 탐지
-        step1_scan_duplicates(ROOT, CSV_DUP)
-        # 2) 그룹 리포트
-        step2_group_report(CSV_DUP, CSV_GROUP, TXT_GROUP)
-        # 3) COUNT>=3 필터
-        step3_count_filter(CSV_GROUP, CSV_COUNT3)
-        # 4) wasted_bytes 기준 TOP N 그룹 선택
-        step4_big_dup_analysis(CSV_COUNT3, CSV_BIG, CSV_BIG_PATHS, top_n)
-        # 5) 리뷰 링크 생성
-        step5_make_review_links(CSV_BIG_PATHS, REVIEW_DIR)
-    else:
-        stamp("=== BIGFILE 모드 파이프라인 시작 ===")
-        # 대용량 중복 그룹 후보 수집 + TOP N
-        step_bigfile_candidates(
-            ROOT,
-            CSV_BIG,
-            CSV_BIG_PATHS,
-            BIG_MIN_SIZE_MB,
-            top_n,
-            BIG_EXT_WHITELIST,
-        )
-        # 리뷰 링크 생성
-        step5_make_review_links(CSV_BIG_PATHS, REVIEW_DIR)
-
-    # 02 실행용 cmd / 텍스트 생성
-    write_next_02_cmd(BASE, RUN_DIR, sample_n=10)
-
+        run_pipeline(DedupOptions(ROOT, BASE, mode, top_n, extra_roots=extra_roots,
+                                  ref_roots=ref_roots), stop=stop)
+    except PipelineStopped:
+        pass
 
 
 if __name__ == "__main__":
     main()
-
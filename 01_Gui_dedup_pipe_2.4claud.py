@@ -7,6 +7,153 @@
 # 01_Gui_dedup_pipe_2.4.py
 # Mec_DB 통합 정리 시스템 v2.4
 # ─────────────────────────────────────────────────────────────────────────────
+# [v2.4 변경사항 — 대용량 성능 개선]
+#
+#  ⚡ Step3 폴더 집계를 정수 ID 디렉터리 트리로 재구성
+#     원인: 파일마다 direct 의 모든 폴더를 돌며 _path_key 문자열 비교
+#            → O(파일 × 폴더). 343k 파일 × 40k 폴더 = 사실상 종료 안 됨.
+#     수정: Step1 에서 폴더마다 정수 ID(전위 순회 순서) + 부모 ID 기록,
+#           파일은 부모 폴더 ID 를 함께 보관 → 직속 집계 1회 선형 패스.
+#           재귀 집계도 ID 역순(자식 → 부모)으로 합산, Path 비교 없음.
+#
+#  ⚡ Step4 후보쌍 생성에 MinHash + LSH 밴딩 도입 (엔진 "minhash")
+#     원인: combinations(후보, 2) 전체에 대해 교집합/합집합 계산 → O(n²·|집합|)
+#     수정: 폴더마다 k개 MinHash 서명(파일 단위 계산 → 부모로 원소별 min 합산),
+#           유사도 임계값에 맞춰 밴드 b × 행 r 자동 선택, 같은 버킷에 걸린
+#           쌍만 정확한 Jaccard 로 검증. 스케치 크기 k 는 GUI 에서 조정.
+#           로그에 임계값 탐지확률(재현율)·검증 쌍 비율(속도) 출력.
+#           "exact" 엔진 선택 시 기존 전체쌍 비교 유지.
+#
+#  ⚡ Step4 역색인 엔진 "index" 추가 (정확 계산, 기본값)
+#     원인: 대부분의 후보 쌍은 공유 지문이 0개인데도 매 쌍 합집합 계산
+#     수정: 지문 → 후보 폴더 역색인을 만들고 같은 목록에 함께 등장한
+#           쌍에만 공유 지문 수를 누적. Jaccard = 공유 / (|A|+|B|-공유)
+#           → 집합 연산 없이 실제 겹침 규모에 비례하는 비용.
+#
+#  ⚡ Step4 희소행렬 엔진 "sparse" 추가 (numpy + scipy 설치 시, 선택)
+#     폴더 × 지문 CSR 결합행렬 X 를 만들고 X·Xᵀ 를 행 블록 단위로 계산
+#     (메모리 상한) → 모든 쌍의 공유 지문 수·공유 바이트를 한 번에 산출,
+#     Jaccard 필터링을 벡터 연산으로 처리. 미설치 시 "index" 로 대체.
+#  ⚡ 지문/경로 정수 인터닝 — 100만+ 파일에서 GB 단위 메모리 사용 해소
+#     원인: 파일마다 40자 hex 문자열 + Path 객체, Step3 에서 조상 폴더마다
+#           hex 문자열 set 을 복사 → 같은 지문이 깊이 수만큼 중복 보관
+#     수정: 지문은 메모리에서 20바이트 digest (체크포인트 JSON 은 hex 유지),
+#           Step3 에서 지문 → 정수 ID 로 인터닝, 파일은 (폴더ID, 파일명) 으로만 보관.
+#           전위 순회 순서상 하위 트리의 파일이 연속 구간이므로
+#           폴더 지문 집합 = 파일 지문 ID 배열의 구간 → 정렬된 정수 array.
+#           재귀 집계에서 Python set 복사 없음 (후보 폴더만 배열 생성).
+#  ⚡ 체크포인트를 추가 전용 로그(JSON Lines, .jsonl)로 변경
+#     원인: 5,000개마다 file_index 전체를 JSON 으로 2번(로컬+BASE) 재작성
+#           → 100만 파일이면 커지는 파일을 200번 재작성 (I/O 제곱 증가)
+#     수정: 새 항목만 한 줄씩 append, 기록은 백그라운드 스레드가 담당
+#           (결과 루프는 큐에 넣기만 함). 로드 시 재생, 죽은 줄이 많으면
+#           스냅샷으로 자동 압축. 기존 .json 체크포인트는 첫 로드 시 변환.
+#  🐛 체크포인트 항목을 크기 + mtime 으로 검증 (수정/교체된 파일 자동 재계산)
+#     원인: key 가 소문자 경로뿐 → 내용이 바뀐 파일도 옛 지문을 영구 사용,
+#           해결하려면 캐시 삭제 후 드라이브 전체 재해싱 필요
+#     수정: Step1 을 os.scandir 기반 워크로 바꿔 크기/mtime_ns 를 함께 수집
+#           (Windows 는 추가 stat 호출 없음). 로그 줄에 mtime_ns 필드 추가.
+#           크기·mtime 이 다르거나 열람한 폴더에서 사라진 항목만 무효화 →
+#           로그에 [key, null, 사유] tombstone 기록 + 실행 폴더에 ckpt_evicted.csv.
+#           mtime 없는 구버전 항목은 크기가 같으면 현재 mtime 으로 보강.
+#  ⚡ Step2 지문 작업 제출을 슬라이딩 창 방식으로 변경
+#     원인: 미처리 파일 전부를 먼저 submit → 34만 개 Future + dict 가 결과
+#           처리 전에 생성되고, 중단 시에도 모두 취소해야 함
+#     수정: 진행 중 작업을 최대 2,000개로 유지, wait(FIRST_COMPLETED, 0.2초)
+#           로 끝난 만큼만 보충 → 메모리 일정, 중단 요청 즉시 반영.
+#  ✨ 완전 동일 폴더 트리 탐지 (Merkle 해시, 선형 시간)
+#     Jaccard 로는 완전 사본과 99% 유사를 구분할 수 없고 비용도 큼.
+#     폴더마다 하위 항목(이름·크기·지문 / 하위 폴더 해시)으로 상향식 해시,
+#     버킷팅 1패스로 동일 트리 그룹 산출. 중첩 사본은 최상위만 남김.
+#     깊이 제한·접근 불가·지문 실패가 섞인 폴더는 불완전으로 제외.
+#     GUI "동일 트리: 이름 무시" 선택 시 내용만 비교. 결과는
+#     folder_exact_groups.csv 로 퍼지 그룹과 별도 저장.
+#  ⚡ Step4 중첩 폴더 판정을 전위 순서 구간 라벨로 변경
+#     원인: 후보쌍마다 relative_to 를 양방향 호출 + ValueError 예외 처리
+#     수정: 재귀 집계 때 폴더마다 하위 트리 ID 구간 [id, end) 계산 →
+#           중첩 여부 = 정수 비교 2번. exact 엔진은 ID 순으로 돌며
+#           하위 트리 구간을 bisect 로 통째로 건너뜀.
+#  ⚡ Step4 크기 상한 필터 (Jaccard ≤ min(|A|,|B|) / max(|A|,|B|))
+#     exact 엔진: 후보를 지문 수 순으로 정렬, 상한 안의 창에서만 비교
+#                 (유사도 85% 면 대부분의 쌍이 크기만으로 탈락).
+#     다른 엔진: 공통 검증 루프 앞단에서 같은 상한으로 선별.
+#     집합 연산 없이 제외한 쌍 수를 로그에 출력.
+#  ⚡ UnionFind 를 정수 배열 기반으로 교체 (후보 번호 0..n-1)
+#     원인: 경로 문자열 dict + 재귀 find → 긴 체인에서 느리고 재귀 한도 위험
+#     수정: array 부모 + 랭크 합치기 + 반복식 경로 압축. 그룹 순서는 기존과 동일.
+#  ✨ 메타데이터 모드 (엔진 "meta") — 1.95gen Fast(Metadata) 를 현 엔진으로 이식
+#     1.95gen: 후보마다 get_folder_stats 로 하위 트리 재탐색 + combinations 전체쌍
+#     수정: Step1 워크의 크기/개수로 폴더 서명(총 용량·파일 수·log2 크기 분포)을
+#           상향식 1회 집계, 용량순 정렬 스윕으로 용량 비 하한 안의 쌍만 비교.
+#           Step2(파일 읽기) 생략 → 대용량 드라이브 1차 훑어보기용.
+#           결과 CSV 의 byte% = 용량 비, contain%/shared 는 빈칸.
+#  ⚡ CLI(01_Dedup_pipe) 와 ROOT 별 해시 카탈로그 공유 (dedup_catalog.py)
+#     원인: GUI 는 자체 지문 + 체크포인트, CLI 는 blake3/SHA256 를 계산 후 폐기
+#           → 같은 ROOT 에 두 도구를 쓰면 같은 파일을 두 번 이상 읽음
+#     수정: 체크포인트 로그 = 공용 카탈로그. CLI 는 파일을 끝까지 읽을 때
+#           앞뒤 64KB 지문도 함께 계산해 [key, 지문, 크기, mtime, {b3, sha256}]
+#           로 기록 → GUI 는 해당 파일을 다시 읽지 않음 (로그에 CLI 항목 수 표시).
+#           CLI 도 크기·mtime 이 같은 항목의 전체 해시를 재사용.
+#  ✨ 상위 우선 모드 (GUI "상위 일치 시 하위 쌍 생략")
+#     원인: 큰 상위 폴더 두 개가 95% 유사하면 그 하위 폴더 쌍이 대량으로
+#           다시 계산·보고되어 Top K 를 채우고 비교 예산 대부분을 소모
+#     수정: 후보쌍을 전위 ID 순으로 정렬해 상위 쌍부터 검증, 일치한 쌍의
+#           양쪽 하위 트리끼리의 쌍은 구간 라벨로 판정해 계산 생략.
+#           exact 전체쌍은 생성 순서가 이미 전위 ID 순 → 정렬 없이 스트리밍.
+#           meta 엔진은 적용 안 됨 (엔진이 meta 면 체크박스 비활성, 로그로 알림).
+#  ⚡ STEP 01/02 를 하위 프로세스 대신 같은 프로세스에서 모듈로 실행
+#     원인: 인터프리터를 새로 띄우고 stdin 에 ROOT/BASE/모드/N 을 흘려 넣은 뒤
+#           stdout 로그 문자열을 긁어 표시 → 진행률은 알 수 없고,
+#           02 의 y/N 확인 input() 은 GUI 에서 응답할 방법이 없었음
+#     수정: 01/02 에 옵션 dataclass + run_pipeline() 엔진 함수 추가
+#           (CLI main 은 입력만 받아 같은 함수 호출). 작업 스레드에서 직접 호출,
+#           로그는 append_log, 진행은 ProgressEvent(단계·파일·바이트·속도·ETA)
+#           → 진행 막대, 중지 버튼은 다음 파일에서 즉시 반영.
+#           02 의 확인은 메인 루프 팝업(예/아니오)으로 주고받음.
+#  ⚡ 로그 창을 틱당 1회 묶음 갱신 + 최근 줄 링 버퍼로 제한
+#     원인: log_queue 한 줄마다 Multiline.update(append=True) 호출,
+#           위젯 텍스트는 무한히 증가 → DUP 해시 단계처럼 로그가 많으면
+#           창이 멈추고 메모리 계속 증가
+#     수정: 100ms 틱마다 큐에서 꺼낸 줄을 한 번의 update 로 추가,
+#           화면에는 최근 LOG_VIEW_LINES 줄만 유지 (넘치면 링 버퍼로 다시 그림).
+#           전체 로그는 실행 폴더 run_log.txt 에 기록 (10MB × 5개 회전,
+#           실행 폴더가 정해지기 전 줄은 모아 두었다가 기록).
+#           폴더 스캔 실행 폴더는 시작 시각 기준으로 시작할 때 정함.
+#  ✨ 일시정지 / 재개 + 중지 후 이어하기 (STEP 01·02·폴더 스캔 공통)
+#     원인: 2.1codex 에만 pause_event 가 있었고, 이어서 실행할 수 있는 건
+#           폴더 스캔(체크포인트)뿐 → CLI DUP/BIGFILE 해시, 02 복사/이동은
+#           중지하면 처음부터 다시
+#     수정: ⏸ 버튼 = 파일 사이에서 대기 (열린 파일 없음, 드라이브 사용 중단).
+#           ⛔ 중지 = 현재 파일까지 마치고 상태 저장 후 종료. CLI 는 Ctrl+C.
+#           01: RUN_DIR\run_state.json 에 완료 단계, 해시는 카탈로그에 저장 →
+#               같은 조건으로 다시 실행하면 최근 미완료 RUN_DIR 에서 이어서.
+#           02: 확인 이후 복사/이동을 한 줄씩 기록 (copy/move_progress.jsonl) →
+#               같은 RunDir 로 다시 실행하면 짧은 확인 후 다음 파일부터.
+#           폴더 스캔: 일시정지 중 새 지문 작업 제출 중단 (진행 중 작업만 마무리).
+#  ⚡ Step1 증분 순회 — mtime 이 그대로인 폴더는 다시 나열하지 않음
+#     원인: 지문 캐시가 있어도 매번 ROOT 아래 모든 폴더를 나열 →
+#           NAS 첫 실행(디렉터리 캐시 없음)은 순회만 20분 이상
+#     수정: 카탈로그 옆 .dirs.jsonl 에 폴더별 mtime·항목 수·이름·크기·mtime 기록
+#           (dedup_catalog.DirIndex, CLI 파일 순회와 같은 형식).
+#           mtime 이 같은 폴더는 나열·파일 stat 없이 기록을 재사용 → Step2 체크포인트 검증에
+#           그대로 사용. 체크포인트에 없는(지문을 새로 만드는) 파일만 읽을 때 stat 해서
+#           실제 크기·mtime 으로 저장하고 폴더 기록도 고침.
+#           방금(2초 이내) 바뀐 폴더·파일은 기록하지 않아 같은 mtime 안의 변경도 놓치지 않음.
+#           ※ 폴더 mtime 은 그대로인데 내용만 바뀐 파일은 그 폴더가 다시 나열될 때 반영.
+#  ✨ STEP 01 여러 ROOT (ROOT 칸에 ; 로 구분)
+#     원인: ROOT 가 1개뿐이라 드라이브마다 따로 실행 → 드라이브 간 중복은 찾을 수 없음
+#           (D:\ 루트 직접 지정은 권한 오류 때문에 권장하지 않음)
+#     수정: 모든 ROOT 의 크기를 하나의 크기 색인으로 합쳐 한 번에 중복 그룹 산출.
+#           순회·해시는 디스크(st_dev)별 작업 스레드가 동시에, 카탈로그는 ROOT 별.
+#           폴더 스캔(03)은 첫 ROOT 만 사용.
+#  ✨ STEP 01 JOIN 모드 (참조 세트에 이미 있는 파일 찾기)
+#     원인: 새 반입 폴더가 아카이브와 겹치는지 보려면 합쳐서 DUP → 아카이브 전체 해시
+#     수정: "참조" 칸의 폴더는 크기만 수집, ROOT 는 참조 크기에 있는 파일만 해시.
+#           참조 해시는 카탈로그 값 사용, 없는 것만 필요할 때 계산.
+#           참조 파일 링크는 mmm 으로 미리 표시 → 02 는 ROOT 쪽 사본만 이동.
+#  ✨ 결과 CSV 에 포함도(contain% = 공유 / 작은 쪽) 와
+#     용량 가중 유사도(byte% = 공유 바이트 / 합집합 바이트) 열 추가
+#
 # [v2.3 변경사항 — 버그 수정]
 #
 #  🐛 BUG 1 (치명) — fast_fingerprint 대량 실패 → index 극소 문제
@@ -69,48 +216,39 @@ import os
 import csv
 import time
 import json
-import hashlib
-import socket
+import random
+import importlib.util
+from array import array
 from pathlib import Path
+from bisect import bisect_left
 from itertools import combinations
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import FreeSimpleGUI as sg
 
+import dedup_catalog as catalog   # ROOT 별 해시 카탈로그 (01_Dedup_pipe CLI 와 공유)
+from dedup_progress import PipelineStopped, ProgressEvent, RunLog, wait_while_paused
+
+try:
+    import numpy as np
+    from scipy import sparse as sp_sparse
+except ImportError:  # 선택 의존성 — 없으면 "sparse" 엔진만 비활성화
+    np = None
+    sp_sparse = None
+
 # ===== 설정 및 경로 관리 =====
 SCRIPT_DIR  = Path(__file__).resolve().parent
 CONFIG_FILE = SCRIPT_DIR / "gui_config.json"
 
-_HOSTNAME = socket.gethostname().upper()[:10]
-
-def _get_ckpt_dir() -> Path:
-    candidates = []
-    if sys.platform == "win32":
-        local_app = os.environ.get("LOCALAPPDATA", "")
-        if local_app:
-            candidates.append(Path(local_app) / "MecDBDedup")
-        candidates.append(Path("C:/Temp/MecDBDedup"))
-        candidates.append(Path("C:/MecDBDedup"))
-    candidates.append(SCRIPT_DIR / "_ckpt_cache")
-    for c in candidates:
-        try:
-            c.mkdir(parents=True, exist_ok=True)
-            test = c / ".write_test"
-            test.write_text("ok")
-            test.unlink()
-            return c
-        except Exception:
-            continue
-    return SCRIPT_DIR
-
-CKPT_DIR = _get_ckpt_dir()
+_HOSTNAME = catalog.HOSTNAME
+CKPT_DIR  = catalog.catalog_dir(SCRIPT_DIR)
 
 DEFAULT_ROOT = r"C:\Users\Meclaser\Desktop\Mec_DB"
 DEFAULT_BASE = r"C:\elice\Dedup"
 
 SCRIPT_01  = "01_Dedup_pipe_CI_2.7.py"
 SCRIPT_02  = "02_Full_pipe_CI_2.7.py"
-PYTHON_EXE = sys.executable
 
 
 def load_settings():
@@ -135,11 +273,42 @@ saved_cfg = load_settings()
 
 log_queue: "queue.Queue[str]" = queue.Queue()
 
+_DONE_TOKENS = {"__STEP01_DONE__", "__STEP02_DONE__", "__FOLDER_DONE__"}
+
+# 현재 작업의 전체 로그 파일 (start_thread 마다 새로 만듦, 실행 폴더가 정해지면 attach,
+# 작업 스레드가 끝날 때 닫음)
+_run_log = RunLog()
+
 def append_log(line: str):
     log_queue.put(line)
+    if line not in _DONE_TOKENS:
+        _run_log.write(line)
+
+
+_stop_event  = threading.Event()
+_pause_event = threading.Event()   # 설정된 동안 작업 스레드가 파일 사이에서 대기
 
 
-_stop_event = threading.Event()
+def _wait_if_paused():
+    wait_while_paused(_pause_event, _stop_event)
+
+# STEP 01/02 진행 이벤트 (작업 스레드 → 메인 루프, 최신 것만 표시)
+progress_queue: "queue.Queue[ProgressEvent]" = queue.Queue()
+
+# STEP 02 y/N 확인 요청 (통계 텍스트, 응답 큐) — 메인 루프가 팝업으로 응답
+confirm_queue: "queue.Queue[tuple[str, queue.Queue]]" = queue.Queue()
+
+
+def _confirm_in_gui(summary: str) -> bool:
+    """작업 스레드에서 호출 — 메인 루프 팝업의 예/아니오를 기다림 (중지 시 False)"""
+    reply: "queue.Queue[bool]" = queue.Queue(maxsize=1)
+    confirm_queue.put((summary, reply))
+    while not _stop_event.is_set():
+        try:
+            return reply.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return False
 
 
 # ====== 유틸 ======
@@ -187,71 +356,96 @@ def create_dir_shortcut(link_path: Path, target_dir: Path):
 # ====== Union-Find ======
 
 class UnionFind:
-    def __init__(self):
-        self._parent: dict = {}
-
-    def find(self, x):
-        self._parent.setdefault(x, x)
-        if self._parent[x] != x:
-            self._parent[x] = self.find(self._parent[x])
-        return self._parent[x]
-
-    def union(self, a, b):
+    """
+    정수 인덱스(0..n-1) Union-Find — union by rank + 반복식 경로 압축 (재귀 없음).
+    groups() 는 union 에 처음 등장한 순서대로 {대표: [멤버...]} 를 반환
+    (이전 경로 문자열 dict 버전과 그룹 순서 동일).
+    """
+    def __init__(self, n: int):
+        self._parent = array("i", range(n))
+        self._rank   = bytearray(n)     # 랭크 ≤ log2(n) → 1바이트로 충분
+        self._seen   = bytearray(n)
+        self._order  = array("i")       # union 에 처음 등장한 순서
+
+    def find(self, x: int) -> int:
+        parent = self._parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:        # 경로 압축: 지나온 노드를 모두 root 에 직접 연결
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        for x in (a, b):
+            if not self._seen[x]:
+                self._seen[x] = 1
+                self._order.append(x)
         ra, rb = self.find(a), self.find(b)
-        if ra != rb:
-            if ra < rb:
-                self._parent[rb] = ra
-            else:
-                self._parent[ra] = rb
-
-    def groups(self) -> "dict[str, list]":
+        if ra == rb:
+            return
+        rank = self._rank
+        if rank[ra] < rank[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        if rank[ra] == rank[rb]:
+            rank[ra] += 1
+
+    def groups(self) -> "dict[int, list[int]]":
         result: dict = {}
-        for x in self._parent:
-            root = self.find(x)
-            result.setdefault(root, []).append(x)
+        for x in self._order:
+            result.setdefault(self.find(x), []).append(x)
         return result
 
 
 # ====== 백그라운드 작업들 ======
 
-def run_step01(root: str, base: str, mode: str, top_n: int):
+_pipelines: dict = {}
+
+def _load_pipeline(script: str):
+    """
+    01/02 CLI 스크립트를 모듈로 로드 (파일명이 숫자로 시작 → importlib).
+    한 번 로드한 모듈은 재사용. blake3 미설치 등은 SystemExit 로 전달됨.
+    """
+    mod = _pipelines.get(script)
+    if mod is None:
+        name = "_pipe_" + script.split("_", 1)[0]
+        spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / script)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod          # dataclass 가 모듈을 조회하므로 실행 전에 등록
+        try:
+            spec.loader.exec_module(mod)
+        except BaseException:
+            sys.modules.pop(name, None)
+            raise
+        _pipelines[script] = mod
+    return mod
+
+
+def _split_roots(root: str, default: "str | None" = DEFAULT_ROOT) -> "list[Path]":
+    """ROOT / 참조 입력칸 — ; 로 여러 폴더 (STEP 01 전용). 비어 있으면 default (None = 빈 목록)"""
+    roots = [Path(x.strip().strip('"')) for x in root.split(";") if x.strip()]
+    return roots or ([Path(default)] if default else [])
+
+
+def run_step01(root: str, base: str, mode: str, top_n: int, ref: str = ""):
     _stop_event.clear()
     save_settings(root, base)
     try:
         append_log("[STEP 01] 시작합니다...")
-        cwd = str(SCRIPT_DIR)
-        cmd = [PYTHON_EXE, SCRIPT_01]
-        append_log(f"[CMD] {cmd}  (cwd={cwd})")
-
-        proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True, cwd=cwd, bufsize=1
-        )
-
-        answers = [
-            root.strip(),
-            base.strip(),
-            "1" if mode == "DUP" else "2",
-            str(top_n),
-        ]
-        for ans in answers:
-            proc.stdin.write(ans + "\n")
-            proc.stdin.flush()
-        proc.stdin.close()
-
-        for line in proc.stdout:
-            if _stop_event.is_set():
-                proc.terminate()
-                append_log("[STEP 01] ⛔ 사용자에 의해 중단되었습니다.")
-                break
-            append_log(line.rstrip("\n"))
-
-        rc = proc.wait()
-        if not _stop_event.is_set():
-            append_log(f"[STEP 01] 종료 (returncode={rc})")
+        pipe = _load_pipeline(SCRIPT_01)
+        roots = _split_roots(root)
+        opts = pipe.DedupOptions(roots[0], Path(base.strip()), mode, top_n,
+                                 extra_roots=roots[1:],
+                                 ref_roots=_split_roots(ref, default=None))
+        run_dir = pipe.run_pipeline(opts, log=append_log,
+                                    progress=progress_queue.put, stop=_stop_event,
+                                    on_run_dir=_run_log.attach, pause=_pause_event)
+        append_log(f"[STEP 01] 종료 → {run_dir}")
+    except PipelineStopped:
+        append_log("[STEP 01] ⛔ 사용자에 의해 중단되었습니다. (같은 설정으로 다시 실행하면 이어서 진행)")
+    except SystemExit as e:          # CLI 모듈 로드 시 필수 의존성 없음
+        append_log(f"[ERROR][STEP 01] {e}")
     except Exception as e:
         append_log(f"[ERROR][STEP 01] {type(e).__name__}: {e}")
     finally:
@@ -277,28 +471,20 @@ def run_step02(base: str, run_dir: "str | None", sample_n: int):
             append_log("__STEP02_DONE__")
             return
 
+        _run_log.attach(target_run)
         append_log(f"[STEP 02] RunDir = {target_run}")
         append_log(f"[STEP 02] SampleN = {sample_n}")
 
-        cwd = str(SCRIPT_DIR)
-        cmd = [PYTHON_EXE, SCRIPT_02, str(target_run), str(sample_n)]
-        append_log(f"[CMD] {cmd}  (cwd={cwd})")
-
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            text=True, cwd=cwd, bufsize=1
-        )
-        for line in proc.stdout:
-            if _stop_event.is_set():
-                proc.terminate()
-                append_log("[STEP 02] ⛔ 사용자에 의해 중단되었습니다.")
-                break
-            append_log(line.rstrip("\n"))
-
-        rc = proc.wait()
-        if not _stop_event.is_set():
-            append_log(f"[STEP 02] 종료 (returncode={rc})")
+        pipe = _load_pipeline(SCRIPT_02)
+        rc = pipe.run_pipeline(pipe.QuarantineOptions(target_run, sample_n),
+                               confirm=_confirm_in_gui, log=append_log,
+                               progress=progress_queue.put, stop=_stop_event,
+                               pause=_pause_event)
+        append_log(f"[STEP 02] 종료 (returncode={rc})")
+    except PipelineStopped:
+        append_log("[STEP 02] ⛔ 사용자에 의해 중단되었습니다. (같은 RunDir 로 다시 실행하면 이어서 진행)")
+    except SystemExit as e:
+        append_log(f"[ERROR][STEP 02] {e}")
     except Exception as e:
         append_log(f"[ERROR][STEP 02] {type(e).__name__}: {e}")
     finally:
@@ -307,8 +493,6 @@ def run_step02(base: str, run_dir: "str | None", sample_n: int):
 
 # ====== 폴더 해시 유사도 스캔 v2.3 ======
 
-_CHUNK = 64 * 1024  # 64KB
-
 # D:\ 루트 스캔 시 자동으로 건너뛸 시스템/프로그램 폴더 (소문자 비교)
 SKIP_DIRS: "set[str]" = {
     # Windows 시스템
@@ -323,36 +507,8 @@ SKIP_DIRS: "set[str]" = {
 }
 
 
-def _sha1_new():
-    """Python 3.8 이하 호환 SHA1 생성 (BUG FIX #1-a)"""
-    try:
-        return hashlib.sha1(usedforsecurity=False)
-    except TypeError:
-        return hashlib.sha1()
-
-
-def fast_fingerprint(fp: Path):
-    """
-    파일 앞 64KB + 뒤 64KB + 파일크기 → SHA1
-    반환: (hex_digest, size_bytes) 또는 (None, error_str)
-    (BUG FIX #1: 예외 시 None 대신 (None, reason) 반환 → 오류 집계 가능)
-    """
-    try:
-        sz = fp.stat().st_size
-        h = _sha1_new()
-        h.update(sz.to_bytes(8, "little"))
-        with open(fp, "rb") as f:
-            h.update(f.read(_CHUNK))
-            if sz > _CHUNK * 2:
-                f.seek(-_CHUNK, 2)
-                h.update(f.read(_CHUNK))
-        return h.hexdigest(), sz
-    except PermissionError as e:
-        return None, f"PermissionError({e.errno})"
-    except OSError as e:
-        return None, f"OSError({e.errno}): {e.strerror}"
-    except Exception as e:
-        return None, f"{type(e).__name__}: {e}"
+_sha1_new        = catalog.sha1_new          # BUG FIX #1-a: Python 3.8 이하 호환
+fast_fingerprint_stat = catalog.fast_fingerprint_stat  # 앞뒤 64KB + 크기 → SHA1 (CLI 와 같은 지문) + mtime
 
 
 def _path_key(fp: "Path | str") -> str:
@@ -360,29 +516,19 @@ def _path_key(fp: "Path | str") -> str:
     return str(Path(fp)).lower()
 
 
-def _save_ckpt(path: Path, data: dict):
-    try:
-        tmp = path.with_suffix(".tmp")
-        tmp.write_text(json.dumps(data), encoding="utf-8")
+def _ckpt_decode(raw: dict) -> dict:
+    """
+    구버전 체크포인트 JSON({경로: [hex, 크기]}) → 메모리 index
+    ({정규화 key: (digest, 크기, mtime_ns, 전체해시)}, 형식은 dedup_catalog.replay 와 동일).
+    구버전에는 mtime 이 없으므로 None — Step2 에서 크기로 검증 후 현재 mtime 으로 보강.
+    """
+    out: dict = {}
+    for k, v in raw.items():
         try:
-            tmp.replace(path)
-        except Exception:
-            path.write_text(json.dumps(data), encoding="utf-8")
-            try:
-                tmp.unlink(missing_ok=True)
-            except Exception:
-                pass
-    except Exception:
-        pass
-
-
-def _save_ckpt_both(local: Path, backup: Path, data: dict):
-    _save_ckpt(local, data)
-    try:
-        backup.parent.mkdir(parents=True, exist_ok=True)
-        _save_ckpt(backup, data)
-    except Exception:
-        pass
+            out[_path_key(k)] = (bytes.fromhex(v[0]), int(v[1]), None, None)
+        except (TypeError, ValueError, IndexError, AttributeError):
+            continue   # 손상/구버전 항목은 재계산 대상
+    return out
 
 
 def _load_ckpt(path: Path) -> dict:
@@ -394,6 +540,564 @@ def _load_ckpt(path: Path) -> dict:
     return {}
 
 
+# ====== 체크포인트 추가 전용 로그 ======
+
+CKPT_FLUSH_EVERY   = 2_000   # 이만큼 쌓이면 즉시 기록
+CKPT_FLUSH_SEC     = 5.0     # 또는 마지막 기록 후 이 시간이 지나면 기록
+CKPT_COMPACT_RATIO = 2.0     # 로그 줄 수 > 살아있는 항목 × 비율 → 스냅샷 압축
+_CKPT_CLOSE        = object()
+
+
+class CkptLog:
+    """
+    폴더 스캔 체크포인트 = ROOT 별 해시 카탈로그 (추가 전용 JSON Lines 로그, 로컬 + BASE 백업).
+    줄 형식·재생·압축은 dedup_catalog 공용 함수 사용 → CLI(01) 가 기록한 항목도 그대로 읽힘.
+      load()  : 로컬 → 백업 → 구버전 .json 순으로 재생, 필요 시 압축
+      start() : 백그라운드 기록 스레드 시작
+      add()   : 해싱 결과 루프에서 호출 — 큐에 넣기만 하고 즉시 반환
+      evict() : 크기/mtime 이 바뀐 항목의 무효화 기록 (압축 전까지 로그에 남음)
+      close() : 남은 항목 기록 후 스레드 종료, 죽은 줄이 많으면 압축
+    """
+
+    def __init__(self, local: Path, backup: Path):
+        self.local   = local
+        self.backup  = backup
+        self.source  = ""       # 로드 출처 (로그 표시용)
+        self.n_lines = 0        # 로컬 로그의 현재 줄 수 (압축 판단용)
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread: "threading.Thread | None" = None
+        self._warned = False
+
+    def load(self) -> dict:
+        index, n_lines, torn = catalog.replay(self.local)
+        if index:
+            self.source, self.n_lines = "로컬", n_lines
+            if torn or n_lines > len(index) * CKPT_COMPACT_RATIO:
+                self.compact(index)
+            elif not self.backup.exists():
+                # 백업이 없으면 이후 append 만으로는 불완전 → 스냅샷부터 작성
+                catalog.write_snapshot(self.backup, index)
+            return index
+
+        index, _, _ = catalog.replay(self.backup)
+        if index:
+            self.source = "백업"
+        else:
+            for legacy in (self.local.with_suffix(".json"), self.backup.with_suffix(".json")):
+                index = _ckpt_decode(_load_ckpt(legacy))
+                if index:
+                    self.source = f"구버전 {legacy.name}"
+                    break
+        if index:
+            self.compact(index)
+        return index
+
+    def compact(self, index: dict):
+        if catalog.write_snapshot(self.local, index):
+            self.n_lines = len(index)
+        catalog.write_snapshot(self.backup, index)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, key: str, digest: bytes, sz: int, mtime_ns: "int | None",
+            extra: "dict | None" = None):
+        self._q.put(catalog.entry_line(key, digest, sz, mtime_ns, extra))
+
+    def evict(self, key: str, reason: str):
+        self._q.put(catalog.evict_line(key, reason))
+
+    def close(self, index: "dict | None" = None):
+        if self._thread is not None:
+            self._q.put(_CKPT_CLOSE)
+            self._thread.join()
+            self._thread = None
+        if index is not None and self.n_lines > len(index) * CKPT_COMPACT_RATIO:
+            self.compact(index)
+
+    def _append(self, lines: "list[str]"):
+        chunk = "".join(lines)
+        for i, path in enumerate((self.local, self.backup)):
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(chunk)
+                if i == 0:
+                    self.n_lines += len(lines)
+            except Exception as e:
+                if not self._warned:
+                    self._warned = True
+                    append_log(f"[FOLDER][WARN] 체크포인트 기록 실패: {path}"
+                               f" ({type(e).__name__}: {e})")
+
+    def _run(self):
+        buf: "list[str]" = []
+        last = time.time()
+        while True:
+            try:
+                item = self._q.get(timeout=CKPT_FLUSH_SEC)
+            except queue.Empty:
+                item = None
+            if item is _CKPT_CLOSE:
+                if buf:
+                    self._append(buf)
+                return
+            if item is not None:
+                buf.append(item)
+            if buf and (len(buf) >= CKPT_FLUSH_EVERY
+                        or time.time() - last >= CKPT_FLUSH_SEC):
+                self._append(buf)
+                buf = []
+                last = time.time()
+
+
+# ====== MinHash + LSH (Step4 후보쌍 생성) ======
+
+_MH_PRIME    = (1 << 61) - 1   # 메르센 소수 — (a·x + b) mod p 유니버설 해시
+_MH_SEED     = 20240601        # 실행마다 같은 서명이 나오도록 고정
+_LSH_RECALL  = 0.95            # 임계 유사도에서 목표로 하는 최소 탐지확률
+SIM_ENGINES  = ("index", "minhash", "sparse", "exact", "meta")
+_SPARSE_BLOCK_CELLS = 4_000_000   # sparse 엔진 블록당 (행 × 후보수) 상한
+
+
+def _minhash_perms(k: int) -> "list[tuple[int, int]]":
+    rnd = random.Random(_MH_SEED)
+    return [(rnd.randrange(1, _MH_PRIME), rnd.randrange(0, _MH_PRIME))
+            for _ in range(k)]
+
+
+def _minhash_dir_signatures(n_dirs: int, dir_parent: "list[int]",
+                            file_items, k: int) -> list:
+    """
+    폴더별 재귀 MinHash 서명 계산.
+    file_items: (폴더ID, 지문 ID) 반복자
+    - 파일 지문마다 k개 해시값을 한 번만 계산해 직속 폴더 서명에 원소별 min
+    - 집합 합집합의 MinHash = 서명의 원소별 min 이므로 ID 역순으로 부모에 합산
+    반환: 폴더 ID → array('Q') 서명 (파일이 없는 폴더는 None)
+    """
+    perms = _minhash_perms(k)
+    sigs: list = [None] * n_dirs
+    for did, x in file_items:
+        vals = array("Q", [(a * x + b) % _MH_PRIME for a, b in perms])
+        cur = sigs[did]
+        sigs[did] = vals if cur is None else array("Q", map(min, cur, vals))
+
+    for did in range(n_dirs - 1, 0, -1):
+        pid = dir_parent[did]
+        sig = sigs[did]
+        if pid < 0 or sig is None:
+            continue
+        cur = sigs[pid]
+        sigs[pid] = array("Q", sig) if cur is None else array("Q", map(min, cur, sig))
+    return sigs
+
+
+def _lsh_detect_prob(sim: float, bands: int, rows: int) -> float:
+    """Jaccard=sim 인 쌍이 적어도 한 밴드에서 같은 버킷에 걸릴 확률"""
+    return 1.0 - (1.0 - sim ** rows) ** bands
+
+
+def _lsh_params(k: int, threshold: float) -> "tuple[int, int]":
+    """
+    k = b × r 분할 중 임계값에서 탐지확률 ≥ _LSH_RECALL 을 만족하는
+    가장 큰 r(= 가장 적은 오탐 후보)을 선택
+    """
+    best = (k, 1)
+    for rows in range(1, k + 1):
+        if k % rows:
+            continue
+        bands = k // rows
+        if _lsh_detect_prob(threshold, bands, rows) >= _LSH_RECALL:
+            best = (bands, rows)
+    return best
+
+
+def _lsh_candidate_pairs(sigs: list, bands: int, rows: int) -> "list[tuple[int, int]]":
+    """밴드별 버킷팅 → 같은 버킷을 한 번이라도 공유한 (i, j) 쌍 (i < j)"""
+    found: "set[tuple[int, int]]" = set()
+    for bi in range(bands):
+        lo = bi * rows
+        buckets: "dict[tuple, list]" = {}
+        for i, sig in enumerate(sigs):
+            buckets.setdefault(tuple(sig[lo:lo + rows]), []).append(i)
+        for members in buckets.values():
+            if len(members) > 1:
+                found.update(combinations(members, 2))
+    return sorted(found)
+
+
+def _index_pair_counts(hash_sets: list) -> "dict[int, int] | None":
+    """
+    지문 → 후보 폴더 역색인으로 쌍별 공유 지문 수를 희소 누적.
+    반환: key = i * n + j (i < j) → 공유 지문 수
+          (한 번이라도 같은 지문을 가진 쌍만 포함 / 중단 요청 시 None)
+    """
+    n = len(hash_sets)
+    postings: "dict[int, list]" = {}
+    for i, hs in enumerate(hash_sets):
+        for h in hs:
+            postings.setdefault(h, []).append(i)   # i 오름차순으로 쌓임
+
+    counts: "dict[int, int]" = {}
+    get = counts.get
+    for done, members in enumerate(postings.values(), 1):
+        if done % 10_000 == 0 and _stop_event.is_set():
+            return None
+        m = len(members)
+        if m < 2:
+            continue
+        for x in range(m - 1):
+            base = members[x] * n
+            for j in members[x + 1:]:
+                key = base + j
+                counts[key] = get(key, 0) + 1
+    return counts
+
+
+def _sparse_pair_scores(hash_sets: list, hid_size: "array",
+                        threshold: float) -> "list[tuple] | None":
+    """
+    폴더 × 지문 희소 결합행렬 X (CSR, 열 = 인터닝된 지문 ID) 로
+    쌍별 공유 지문 수 / 공유 바이트 계산.
+      G  = X · Xᵀ            → 공유 지문 수
+      Gw = X · diag(w+1) · Xᵀ → 공유 바이트 + G (w+1 > 0 이라 G 와 희소 패턴 동일)
+    행 블록 단위로 곱해 블록당 메모리를 _SPARSE_BLOCK_CELLS 로 제한하고,
+    Jaccard ≥ threshold 필터를 벡터 연산으로 적용.
+    반환: [(i, j, 공유 지문 수, 공유 바이트), ...] (i < j) / 중단 요청 시 None
+    """
+    n, m   = len(hash_sets), len(hid_size)
+    sizes  = np.fromiter((len(hs) for hs in hash_sets), dtype=np.int64, count=n)
+    indptr = np.concatenate(([0], np.cumsum(sizes)))
+    X = sp_sparse.csr_matrix(
+        (np.ones(int(indptr[-1]), dtype=np.float64),
+         np.concatenate([np.frombuffer(hs, dtype=np.int32) for hs in hash_sets]),
+         indptr),
+        shape=(n, m),
+    )
+    w = np.frombuffer(hid_size, dtype=np.int64).astype(np.float64)
+
+    sizes = sizes.astype(np.float64)
+    XT    = X.T.tocsr()
+    Xw    = (X @ sp_sparse.diags(w + 1.0)).tocsr()
+    block = max(1, _SPARSE_BLOCK_CELLS // max(1, n))
+
+    out: "list[tuple]" = []
+    for r0 in range(0, n, block):
+        if _stop_event.is_set():
+            return None
+        r1 = min(n, r0 + block)
+        G  = (X[r0:r1] @ XT).tocsr()
+        Gw = (Xw[r0:r1] @ XT).tocsr()
+        G.sort_indices()
+        Gw.sort_indices()
+
+        rows = np.repeat(np.arange(r0, r1), np.diff(G.indptr))
+        cols = G.indices
+        inter = G.data
+        inter_bytes = Gw.data - inter
+        keep = cols > rows
+        rows, cols, inter, inter_bytes = rows[keep], cols[keep], inter[keep], inter_bytes[keep]
+
+        jacc = inter / (sizes[rows] + sizes[cols] - inter)
+        keep = jacc >= threshold
+        out.extend(zip(rows[keep].tolist(), cols[keep].tolist(),
+                       inter[keep].astype(np.int64).tolist(),
+                       inter_bytes[keep].astype(np.int64).tolist()))
+    return out
+
+
+def _rollup_tree(dir_parent: "list[int]", dir_file0: "list[int]", n_files: int,
+                 d_bytes: "list[int]", d_files: "list[int]") -> "tuple[list[int], list[int]]":
+    """
+    직속 집계(d_bytes, d_files)를 하위 트리 합계로 제자리 갱신 → (file_end, dir_end).
+    전위 순서 ID 의 역순 = 항상 자식이 부모보다 먼저 처리됨.
+      file_end: 하위 트리 파일 구간의 끝 → 파일 번호 [dir_file0, file_end)
+      dir_end : 하위 트리 폴더 구간의 끝 → 폴더 ID [did, dir_end)
+                (조상/자손 판정이 경로 비교 없이 정수 비교로 끝남)
+    """
+    n_dirs   = len(dir_parent)
+    file_end = dir_file0[1:] + [n_files]   # 우선 직속 파일 구간의 끝
+    dir_end  = list(range(1, n_dirs + 1))  # 우선 자기 자신만
+    for did in range(n_dirs - 1, 0, -1):
+        pid = dir_parent[did]
+        if pid < 0:
+            continue
+        d_bytes[pid] += d_bytes[did]
+        d_files[pid] += d_files[did]
+        if file_end[did] > file_end[pid]:
+            file_end[pid] = file_end[did]
+        if dir_end[did] > dir_end[pid]:
+            dir_end[pid] = dir_end[did]
+    return file_end, dir_end
+
+
+def _merkle_dir_hashes(dir_paths: "list[Path]", dir_parent: "list[int]",
+                       dir_file0: "list[int]", dir_nsub: "list[int]",
+                       file_name: "list[str]", file_hid: "array",
+                       hid_digest: "list[bytes]", hid_size: "array",
+                       use_names: bool = True) -> "list[bytes | None]":
+    """
+    폴더별 상향식 Merkle 해시 (전위 순서 ID 역순 = 항상 자식 먼저 계산).
+    항목 = 직속 파일 (이름, 크기, 지문) + 하위 폴더 (이름, 하위 Merkle 해시),
+    정렬 후 SHA1 → 같은 해시 = 구조·내용이 완전히 같은 트리.
+    use_names=False 면 이름을 빼고 내용만으로 계산 (이름만 바뀐 사본도 일치).
+    불완전 폴더는 None 이며 상위로 전파됨:
+      - 지문 실패 파일 포함
+      - 목록상 하위 폴더 수 ≠ 워크에 등록된 수 (깊이 제한·접근 불가·SKIP_DIRS)
+    """
+    n_dirs   = len(dir_paths)
+    children: "list[list[int]]" = [[] for _ in range(n_dirs)]
+    for did in range(1, n_dirs):
+        pid = dir_parent[did]
+        if pid >= 0:
+            children[pid].append(did)
+
+    def _name(s: str) -> bytes:
+        return s.lower().encode("utf-8", "surrogatepass") + b"\0" if use_names else b""
+
+    out: "list[bytes | None]" = [None] * n_dirs
+    for did in range(n_dirs - 1, -1, -1):
+        kids = children[did]
+        if len(kids) != dir_nsub[did] or any(out[c] is None for c in kids):
+            continue
+        f_end = dir_file0[did + 1] if did + 1 < n_dirs else len(file_name)
+        hids  = file_hid[dir_file0[did]:f_end]
+        if -1 in hids:
+            continue
+        entries = [b"d" + _name(dir_paths[c].name) + out[c] for c in kids]
+        entries.extend(
+            b"f" + _name(file_name[fi]) + hid_size[hid].to_bytes(8, "little") + hid_digest[hid]
+            for fi, hid in zip(range(dir_file0[did], f_end), hids)
+        )
+        entries.sort()
+        h = _sha1_new()
+        for e in entries:
+            h.update(len(e).to_bytes(4, "little"))
+            h.update(e)
+        out[did] = h.digest()
+    return out
+
+
+def _exact_tree_groups(merkle: "list[bytes | None]", dir_parent: "list[int]",
+                       d_bytes: "list[int]", d_files: "list[int]",
+                       min_bytes: int) -> "list[list[int]]":
+    """
+    Merkle 해시 버킷팅 1패스 → 완전 동일 트리 그룹 (폴더 ID 목록, 중복 용량 큰 순).
+    중첩 정리: 멤버의 부모가 모두 서로 다른 폴더이고 전부 같은 동일 그룹 1개에 속하면
+    그 상위 그룹으로 이미 설명되므로 제외 → 최상위 동일 트리만 남음.
+    (부모가 서로 다른 그룹이거나, 한 부모 안에 같은 하위가 2개 이상이면 상위로 설명 안 됨)
+    """
+    buckets: "dict[bytes, list[int]]" = {}
+    for did, h in enumerate(merkle):
+        if h is not None and d_files[did] and d_bytes[did] >= min_bytes:
+            buckets.setdefault(h, []).append(did)
+    dups     = [ids for ids in buckets.values() if len(ids) > 1]
+    group_of = {did: gi for gi, ids in enumerate(dups) for did in ids}
+
+    def _explained(ids: "list[int]") -> bool:
+        parents = {dir_parent[did] for did in ids}
+        if len(parents) != len(ids):
+            return False
+        owners = {group_of.get(pd) for pd in parents}
+        return len(owners) == 1 and None not in owners
+
+    groups = [ids for ids in dups if not _explained(ids)]
+    groups.sort(key=lambda ids: d_bytes[ids[0]] * (len(ids) - 1), reverse=True)
+    return groups
+
+
+# ====== 메타데이터 모드 (파일 읽기 없음) ======
+
+META_W_BYTES = 0.6   # 점수 = 용량 비 × 0.6 + 파일 수 비 × 0.2 + 크기 분포 유사도 × 0.2
+META_W_FILES = 0.2
+META_W_HIST  = 0.2
+
+
+def _meta_hist(file_bin: bytearray, f0: int, f1: int) -> "dict[int, int]":
+    """파일 구간의 크기 분포 (log2 구간 → 파일 수). 구간 0 = stat 실패 파일 → 제외"""
+    hist = Counter(file_bin[f0:f1])
+    hist.pop(0, None)
+    return hist
+
+
+def _meta_score(a: dict, b: dict) -> "tuple[float, float]":
+    """메타데이터 서명 유사도 → (점수 0~1, 용량 비)"""
+    s_ratio = (min(a["bytes"], b["bytes"]) / max(a["bytes"], b["bytes"])
+               if a["bytes"] or b["bytes"] else 1.0)
+    c_ratio = min(a["files"], b["files"]) / max(a["files"], b["files"])
+    ha, hb  = a["hist"], b["hist"]
+    h_min   = sum(min(n, hb.get(k, 0)) for k, n in ha.items())
+    h_max   = a["files"] + b["files"] - h_min
+    h_sim   = h_min / h_max if h_max else 1.0
+    return (META_W_BYTES * s_ratio + META_W_FILES * c_ratio + META_W_HIST * h_sim,
+            s_ratio)
+
+
+def _meta_sweep_pairs(candidates: list, min_similarity: float):
+    """
+    용량 오름차순 정렬 스윕 → (개수, (i, j) 생성기).
+    다른 항목이 모두 1 이어도 용량 비가 s_min 미만이면 임계값 불가
+      → s_min = (임계값 - 나머지 가중치) / 용량 가중치
+    각 폴더는 용량이 자신 / s_min 이하인 뒤쪽 폴더까지만 비교 (투 포인터).
+    """
+    s_min = max(0.0, (min_similarity / 100 - (1 - META_W_BYTES)) / META_W_BYTES)
+    order = sorted(range(len(candidates)), key=lambda i: candidates[i]["bytes"])
+    sizes = [candidates[i]["bytes"] for i in order]
+    stops: "list[int]" = []
+    q = 0
+    for p, sa in enumerate(sizes):
+        q = max(q, p + 1)
+        while q < len(sizes) and sizes[q] * s_min <= sa:
+            q += 1
+        stops.append(q)
+    n = sum(q - p - 1 for p, q in enumerate(stops))
+
+    def _gen():
+        for p, q in enumerate(stops):
+            ia = order[p]
+            for ib in order[p + 1:q]:
+                yield ia, ib
+    return n, _gen()
+
+
+def _unique_bytes(cand: dict, hid_size: "array") -> int:
+    """후보 폴더의 고유 지문 용량 합 (용량 가중 유사도 분모용, 1회 계산 후 캐시)"""
+    ub = cand.get("ubytes")
+    if ub is None:
+        ub = cand["ubytes"] = sum(hid_size[h] for h in cand["hashes"])
+    return ub
+
+
+def _is_nested(a: dict, b: dict) -> bool:
+    """
+    두 후보 폴더 중 한쪽이 다른 쪽의 하위 폴더인지.
+    전위 순서 구간 [id, end) 는 서로 포함되거나 완전히 떨어져 있으므로
+    구간이 겹치면 곧 중첩 → 정수 비교 2번.
+    """
+    return a["id"] < b["end"] and b["id"] < a["end"]
+
+
+def _size_bound_ok(la: int, lb: int, min_similarity: float) -> bool:
+    """Jaccard ≤ 작은 집합 / 큰 집합 → 크기만으로 임계값 도달 가능 여부 (집합 연산 없음)"""
+    return min(la, lb) * 100 >= min_similarity * max(la, lb)
+
+
+def _size_window_pairs(candidates: list, min_similarity: float):
+    """
+    exact 엔진용 크기 창 쌍 생성 → (개수, (i, j, None, None) 생성기).
+    지문 수(|A|) 오름차순 정렬 후, 각 폴더는 |B| ≤ |A| × 100 / 유사도 인
+    뒤쪽 폴더까지만 비교 (prefix-filtering 유사도 조인의 크기 필터).
+    창 끝은 |A| 에 대해 단조 증가 → 투 포인터로 선형 계산.
+    """
+    order = sorted(range(len(candidates)), key=lambda i: len(candidates[i]["hashes"]))
+    sizes = [len(candidates[i]["hashes"]) for i in order]
+    stops: "list[int]" = []
+    q = 0
+    for p, la in enumerate(sizes):
+        q = max(q, p + 1)
+        while q < len(sizes) and _size_bound_ok(la, sizes[q], min_similarity):
+            q += 1
+        stops.append(q)
+    n = sum(q - p - 1 for p, q in enumerate(stops))
+
+    def _gen():
+        for p, q in enumerate(stops):
+            ia = order[p]
+            for ib in order[p + 1:q]:
+                yield ia, ib, None, None
+    return n, _gen()
+
+
+def _exact_pair_iter(candidates: list):
+    """
+    exact 엔진용 전체쌍 생성 → (개수, (i, j, None, None) 생성기).
+    전위 ID 순으로 돌면서 바깥 폴더의 하위 트리 구간(ID ∈ [id, end))은
+    bisect 로 통째로 건너뜀 → 중첩 쌍은 만들지도 않음.
+    """
+    by_id = sorted(range(len(candidates)), key=lambda i: candidates[i]["id"])
+    ids   = [candidates[i]["id"] for i in by_id]
+    start = [bisect_left(ids, candidates[ia]["end"], p + 1) for p, ia in enumerate(by_id)]
+    n     = sum(len(by_id) - q for q in start)
+
+    def _gen():
+        for ia, q in zip(by_id, start):
+            for ib in by_id[q:]:
+                yield ia, ib, None, None
+    return n, _gen()
+
+
+# 폴더 목록 캐시(DirIndex) 를 쓰는 증분 순회 — CLI(01) 파일 순회와 공용
+_walk_with_stat = catalog.walk_with_stat
+
+
+def _write_folder_results(run_dir: Path, candidates: list, pairs: list,
+                          uf: "UnionFind", top_k: int,
+                          min_similarity: float) -> list:
+    """
+    Step4 공통 마무리: Union-Find 그룹 정리 → 로그 요약 →
+    run 폴더에 folder_similarity_groups.csv + 그룹별 .lnk 검토 폴더 생성.
+    반환: groups — 경로 문자열 목록의 목록
+    """
+    raw_groups = uf.groups()
+    groups = [
+        sorted(str(candidates[i]["path"]) for i in members)
+        for members in raw_groups.values()
+        if len(members) >= 2
+    ]
+    groups.sort(key=lambda g: len(g), reverse=True)
+
+    path_to_gid: dict = {}
+    for gid, members in enumerate(groups, 1):
+        for m in members:
+            path_to_gid[m] = gid
+
+    pairs_with_gid = [
+        {**p, "group_id": path_to_gid.get(str(p["dir_a"]), "-")}
+        for p in pairs
+    ]
+    pairs_with_gid.sort(key=lambda x: (
+        x["group_id"] if isinstance(x["group_id"], int) else 9999,
+        -x["score"]
+    ))
+    top_pairs = pairs_with_gid[:top_k]
+
+    append_log(f"[4/4] 완료 | {len(pairs)}쌍 / {len(groups)}그룹 발견 (≥{min_similarity}%)")
+
+    if groups:
+        summary = ", ".join(f"G{i}:{len(g)}폴더" for i, g in enumerate(groups[:10], 1))
+        append_log(f"[4/4] 그룹 요약: {summary}" + (" ..." if len(groups) > 10 else ""))
+
+    # ── 결과 저장 ─────────────────────────────────────────────────────────
+    review_dir = run_dir / "01_review_fol"
+    review_dir.mkdir(parents=True, exist_ok=True)
+
+    csv_path = run_dir / "folder_similarity_groups.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["rank", "group_id", "score%", "contain%", "byte%", "shared",
+                    "files_a", "files_b", "MB_a", "MB_b", "dir_a", "dir_b"])
+        for i, p in enumerate(top_pairs, 1):
+            w.writerow([i, p["group_id"], p["score"], p["containment"], p["byte_score"],
+                        p["shared_files"],
+                        p["files_a"], p["files_b"],
+                        p["mb_a"], p["mb_b"],
+                        str(p["dir_a"]), str(p["dir_b"])])
+
+    for gid, members in enumerate(groups[:top_k], 1):
+        labels = [chr(ord("A") + i) for i in range(len(members))]
+        folder_names = "__".join(
+            safe_filename(Path(m).name, max_len=30) for m in members[:4]
+        )
+        suffix  = f"(+{len(members)-4}개)" if len(members) > 4 else ""
+        grp_dir = review_dir / f"{gid:02d}_G{gid}_{len(members)}폴더_{folder_names}{suffix}"
+        grp_dir.mkdir(parents=True, exist_ok=True)
+        for idx, member in enumerate(members):
+            lnk_name = f"{idx+1:02d}_폴더{labels[idx] if idx < 26 else str(idx+1)}"
+            create_dir_shortcut(grp_dir / lnk_name, Path(member))
+    return groups
+
+
 def _normalize_base(base_path: Path) -> Path:
     """BUG FIX #4: BASE 끝에 Runs 또는 runs 가 붙어있으면 제거"""
     if base_path.name.lower() == "runs":
@@ -402,20 +1106,32 @@ def _normalize_base(base_path: Path) -> Path:
 
 
 def run_folder_scan(root: str, base: str, depth_limit: int,
-                    min_dir_mb: int, min_similarity: float, top_k: int):
+                    min_dir_mb: int, min_similarity: float, top_k: int,
+                    engine: str = "index", sketch_size: int = 128,
+                    merkle_names: bool = True, hierarchical: bool = False):
     """
-    폴더 유사도 스캔 v2.3
+    폴더 유사도 스캔 v2.4
     BUG FIX 목록:
       #1 fast_fingerprint 대량 실패 → 오류 카운터 + 샘플 로그
       #2 os.walk 깊이 제한 로직 오류 수정
       #3 체크포인트 key 대소문자 정규화
       #4 BASE 경로 이중 Runs 완전 제거
+    engine: "index"   (지문 역색인으로 공유 지문이 있는 쌍만 정확 계산)
+          | "minhash" (MinHash+LSH 후보쌍만 검증)
+          | "sparse"  (numpy/scipy 희소행렬 곱, 블록 단위 일괄 계산)
+          | "exact"   (전체쌍 비교)
+          | "meta"    (파일을 읽지 않음 — 용량·파일 수·크기 분포 서명만 비교, Step2 생략)
+    sketch_size: MinHash 서명 길이 k (클수록 재현율↑ / 서명 계산 시간↑)
+    merkle_names: 완전 동일 트리(Merkle) 판정에 파일/폴더 이름 포함 여부
+    hierarchical: 상위 폴더 쌍이 먼저 일치하면 그 하위끼리의 쌍은 계산 생략
+                  (해시 엔진 전용, 후보쌍을 전위 ID 순으로 정렬해 상위부터 처리)
     """
     _stop_event.clear()
     save_settings(root, base)
     t0 = time.time()
 
-    root_path = Path(root.strip() or DEFAULT_ROOT)
+    roots     = _split_roots(root)
+    root_path = roots[0]
     base_path = _normalize_base(Path(base.strip() or DEFAULT_BASE))  # BUG FIX #4
 
     # ── ROOT 존재 확인 (개선) ────────────────────────────────────────────
@@ -423,19 +1139,27 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
         append_log(f"[ERROR][FOLDER] ROOT 경로가 존재하지 않습니다: {root_path}")
         append_log("__FOLDER_DONE__")
         return
+    if len(roots) > 1:
+        append_log(f"[FOLDER] ⚠ 폴더 스캔은 ROOT 1개만 지원 — 첫 번째만 사용: {root_path}")
 
     min_bytes = min_dir_mb * 1024 * 1024
 
-    ckpt_hash = hashlib.md5(str(root_path).lower().encode()).hexdigest()[:8]
-    ckpt_id   = f"{_HOSTNAME}_{ckpt_hash}"
-    ckpt_path = CKPT_DIR / f"_ckpt_{ckpt_id}.json"
-    ckpt_bak  = base_path / f"_ckpt_{ckpt_id}.json"
+    # 실행 폴더는 시작 시각 기준 — run_log.txt 를 처음부터 기록
+    run_dir = base_path / "Runs" / f"run_{time.strftime('%Y%m%d_%H%M')}_fol"
+    _run_log.attach(run_dir)
+
+    ckpt_path = CKPT_DIR / catalog.catalog_name(root_path)
+    ckpt_bak  = base_path / catalog.catalog_name(root_path)
 
     append_log(f"[FOLDER] ▶ 스캔 시작: {root_path}")
     append_log(f"[FOLDER]   PC: {_HOSTNAME} | 깊이≤{depth_limit} | 최소 {min_dir_mb}MB"
                f" | 유사도≥{min_similarity}% | Top {top_k}")
-    append_log(f"[FOLDER]   체크포인트(주): {ckpt_path}")
-    append_log(f"[FOLDER]   체크포인트(백업): {ckpt_bak}")
+    append_log(f"[FOLDER]   비교 엔진: {engine}"
+               + (f" (k={sketch_size})" if engine == "minhash" else "")
+               + (" — 파일 읽기 없음, 체크포인트 미사용" if engine == "meta" else ""))
+    if engine != "meta":
+        append_log(f"[FOLDER]   체크포인트(주): {ckpt_path}")
+        append_log(f"[FOLDER]   체크포인트(백업): {ckpt_bak}")
 
     # ── Step 1: 파일 목록 수집 ───────────────────────────────────────────
     # BUG FIX #2: 깊이 제한 로직 정정
@@ -446,30 +1170,45 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
     append_log("[1/4] 파일 목록 수집 중...")
     append_log(f"    깊이 제한: {depth_limit}단계 (root=0단계 기준)")
 
-    scan_dirs: "set[Path]" = set()
-    all_files: "list[Path]" = []
+    # 폴더는 전위 순회 순서대로 정수 ID 부여 → 부모 ID < 자식 ID 항상 성립
+    dir_paths:  "list[Path]" = []
+    dir_parent: "list[int]"  = []     # 루트는 -1
+    dir_id_of:  "dict[str, int]" = {}  # 워크 문자열 경로 → ID (워크 중에만 사용)
+    dir_file0:  "list[int]"  = []     # 폴더의 첫 직속 파일 번호
+    dir_nsub:   "list[int]"  = []     # 목록상 하위 폴더 수 (Merkle 완전성 판정용)
+    # 파일은 Path 대신 (부모 폴더 ID, 파일명) 으로 보관 → 폴더 경로 문자열 공유.
+    # 전위 순회로 쌓으므로 한 폴더의 하위 트리 파일은 항상 연속 구간.
+    file_name:  "list[str]"  = []
+    file_dir:   "list[int]"  = []     # file_name[i] 의 부모 폴더 ID
+    # 워크에서 본 크기/mtime — Step2 에서 체크포인트 항목 검증에 사용
+    # (폴더 목록 캐시를 재사용한 폴더는 기록된 값)
+    file_size   = array("q")
+    file_mtime  = array("q")
     last_report = time.time()
 
-    def _walk_onerror(e):
-        pass  # PermissionError 등 조용히 무시
+    # 폴더 목록 캐시 — mtime 이 그대로인 폴더는 나열·파일 stat 없이 기록된 크기·mtime 사용
+    dindex = catalog.DirIndex(catalog.dirs_path(ckpt_path))
+    n_dcache = dindex.load()
+    if n_dcache:
+        append_log(f"    폴더 목록 캐시: {n_dcache:,}개 폴더")
 
-    for cur_root, dirs, files in os.walk(root_path, topdown=True, onerror=_walk_onerror):
+    for cur_root, depth, dirs, files in _walk_with_stat(str(root_path), dindex):
+        _wait_if_paused()
         if _stop_event.is_set():
+            dindex.save()
             append_log("[1/4] ⛔ 중단 요청 — 파일 목록 수집 중단")
             append_log("__FOLDER_DONE__")
             return
 
         cur = Path(cur_root)
-        try:
-            depth = len(cur.relative_to(root_path).parts)
-        except ValueError:
-            depth = 0
 
         # 깊이 초과 시 skip
         if depth >= depth_limit:
             dirs[:] = []
             continue
 
+        n_listed = len(dirs)   # 제외 전 개수 — 건너뛴 하위가 있으면 Merkle 불완전
+
         # ★ 시스템/프로그램 폴더 제외 (depth=1 에서만 적용)
         if depth == 0:
             before = len(dirs)
@@ -479,16 +1218,24 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
                 append_log(f"    [제외] 시스템 폴더 {skipped}개 스킵 "
                            f"(SKIP_DIRS 목록 기준)")
 
-        scan_dirs.add(cur)
-        for fname in files:
-            all_files.append(cur / fname)
+        did = len(dir_paths)
+        dir_paths.append(cur)
+        dir_parent.append(dir_id_of.get(os.path.dirname(cur_root), -1))
+        dir_id_of[cur_root] = did
+        dir_file0.append(len(file_name))
+        dir_nsub.append(n_listed)
+        for name, sz, mt in files:
+            file_name.append(name)
+            file_size.append(sz)
+            file_mtime.append(mt)
+        file_dir.extend([did] * len(files))
 
         now = time.time()
         if now - last_report >= 60:
             elapsed = now - t0
             append_log(f"    [진행중] {elapsed/60:.1f}분 경과"
-                       f" | 폴더 {len(scan_dirs):,}개"
-                       f" | 파일 {len(all_files):,}개"
+                       f" | 폴더 {len(dir_paths):,}개"
+                       f" | 파일 {len(file_name):,}개"
                        f" | 현재: ...{str(cur)[-60:]}")
             last_report = now
 
@@ -496,86 +1243,235 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
         append_log("__FOLDER_DONE__")
         return
 
+    dir_id_of.clear()
+    dindex.save()
+    n_files = len(file_name)
     append_log(f"[1/4] 완료 ({(time.time()-t0)/60:.1f}분)"
-               f" | 폴더 {len(scan_dirs):,}개 | 파일 {len(all_files):,}개")
+               f" | 폴더 {len(dir_paths):,}개 | 파일 {n_files:,}개"
+               f" | 목록 재사용 {dindex.reused:,} / 다시 나열 {dindex.listed:,}")
 
-    if not all_files:
+    if not file_name:
         append_log("[FOLDER] ⚠ 수집된 파일이 없습니다. ROOT 경로·깊이 설정을 확인하세요.")
         append_log("__FOLDER_DONE__")
         return
 
+    # ── 메타데이터 모드: Step1 의 크기 정보만으로 1차 훑어보기 (파일 읽기 없음) ──
+    if engine == "meta":
+        append_log("[2/4] 메타데이터 모드 — 지문 계산 생략")
+        if hierarchical:
+            append_log("    ⚠ '상위 일치 시 하위 쌍 생략' 은 meta 엔진에 적용되지 않음 (옵션 무시)")
+        n_dirs   = len(dir_paths)
+        d_bytes: "list[int]" = [0] * n_dirs
+        d_files: "list[int]" = [0] * n_dirs
+        file_bin = bytearray(n_files)   # 파일 크기의 log2 구간 + 1 (0 = stat 실패)
+        for fi, (did, sz) in enumerate(zip(file_dir, file_size)):
+            if sz < 0:
+                continue
+            d_bytes[did] += sz
+            d_files[did] += 1
+            file_bin[fi] = sz.bit_length() + 1
+        file_end, dir_end = _rollup_tree(dir_parent, dir_file0, n_files, d_bytes, d_files)
+
+        candidates = [
+            {"id": did, "end": dir_end[did], "path": dir_paths[did],
+             "bytes": d_bytes[did], "files": d_files[did],
+             "hist": _meta_hist(file_bin, dir_file0[did], file_end[did])}
+            for did in range(n_dirs)
+            if d_bytes[did] >= min_bytes and d_files[did]
+        ]
+        del file_bin
+        candidates.sort(key=lambda x: x["bytes"], reverse=True)
+        n_cands = len(candidates)
+        append_log(f"[3/4] 완료 ({(time.time()-t0)/60:.1f}분)"
+                   f" | 후보 {n_cands}개 (≥{min_dir_mb}MB) — 용량·파일 수·크기 분포 서명")
+        if n_cands < 2:
+            append_log("[FOLDER] 비교할 후보 폴더가 2개 미만입니다.")
+            append_log("__FOLDER_DONE__")
+            return
+
+        total_pairs = n_cands * (n_cands - 1) // 2
+        n_eval, sweep = _meta_sweep_pairs(candidates, min_similarity)
+        append_log(f"[4/4] 용량 정렬 스윕: 검증 {n_eval:,} / 전체 {total_pairs:,}쌍"
+                   f" (용량 비 하한 밖은 비교 생략)")
+        uf    = UnionFind(n_cands)
+        pairs = []
+        for ia, ib in sweep:
+            if _stop_event.is_set():
+                append_log("[4/4] ⛔ 중단 요청 — 유사도 계산 중단")
+                append_log("__FOLDER_DONE__")
+                return
+            a, b = candidates[ia], candidates[ib]
+            if _is_nested(a, b):
+                continue
+            score, s_ratio = _meta_score(a, b)
+            if score * 100 >= min_similarity:
+                pairs.append({
+                    "dir_a":        a["path"],
+                    "dir_b":        b["path"],
+                    "score":        round(score * 100, 1),
+                    "containment":  "",
+                    "byte_score":   round(s_ratio * 100, 1),
+                    "shared_files": "",
+                    "files_a":      a["files"],
+                    "files_b":      b["files"],
+                    "mb_a":         round(a["bytes"] / 1024 / 1024, 1),
+                    "mb_b":         round(b["bytes"] / 1024 / 1024, 1),
+                })
+                uf.union(ia, ib)
+
+        groups = _write_folder_results(run_dir, candidates, pairs, uf,
+                                       top_k, min_similarity)
+        append_log("")
+        append_log(f"[FOLDER] ✅ 완료! 총 소요: {(time.time()-t0)/60:.1f}분 (메타데이터 모드)")
+        append_log(f"[FOLDER] 유사 쌍: {len(pairs)}쌍 → {len(groups)}그룹"
+                   f" — 내용 미확인 후보이므로 index 엔진으로 재확인 권장")
+        append_log(f"[FOLDER] 결과 → {run_dir}")
+        append_log("__FOLDER_DONE__")
+        return
+
     # ── Step 2: 지문 계산 (BUG FIX #1 #3) ──────────────────────────────
     append_log("[2/4] 빠른 지문 계산 중 (앞뒤 64KB)...")
 
     # BUG FIX #3: key 를 _path_key() 로 정규화하여 로드
-    raw_ckpt   = _load_ckpt(ckpt_path)
-    file_index: dict = {_path_key(k): v for k, v in raw_ckpt.items()}
-
-    if not file_index:
-        raw_bak = _load_ckpt(ckpt_bak)
-        if raw_bak:
-            file_index = {_path_key(k): v for k, v in raw_bak.items()}
-            append_log(f"    체크포인트 백업에서 로드 → {len(file_index):,}개")
-            _save_ckpt(ckpt_path, file_index)
-    else:
-        append_log(f"    체크포인트(로컬) 발견 → {len(file_index):,}개 이어서 진행")
+    ckpt = CkptLog(ckpt_path, ckpt_bak)
+    file_index: dict = ckpt.load()
+    if file_index:
+        append_log(f"    체크포인트({ckpt.source}) 발견 → {len(file_index):,}개 이어서 진행")
+
+    # BUG FIX #3: pending 판단도 _path_key() 로 비교 (key 는 Step3 에서 재사용)
+    file_keys = [os.path.join(str(dir_paths[did]), name).lower()
+                 for did, name in zip(file_dir, file_name)]
+    ckpt.start()   # 기록은 백그라운드 스레드 — 아래 루프들은 add()/evict() 만 호출
+
+    # 캐시 검증: 워크에서 본 크기·mtime 과 다르면 그 항목만 무효화 후 재계산.
+    # 구버전 항목(mtime 없음)은 크기가 같으면 현재 mtime 으로 보강해 유지.
+    pending:  "list[int]" = []
+    evicted:  list = []   # (사유, key, 이전 크기, 이전 mtime, 현재 크기, 현재 mtime)
+    n_upgraded = 0
+    for i, key in enumerate(file_keys):
+        ent = file_index.get(key)
+        if ent is None:
+            pending.append(i)
+            continue
+        sz_now, mt_now = file_size[i], file_mtime[i]
+        if ent[1] != sz_now:
+            reason = "size"
+        elif ent[2] is None:
+            file_index[key] = (ent[0], ent[1], mt_now, ent[3])
+            ckpt.add(key, ent[0], ent[1], mt_now, ent[3])
+            n_upgraded += 1
+            continue
+        elif ent[2] != mt_now:
+            reason = "mtime"
+        else:
+            continue
+        evicted.append((reason, key, ent[1], ent[2], sz_now, mt_now))
+        del file_index[key]
+        ckpt.evict(key, reason)
+        pending.append(i)
+
+    # 삭제된 파일: 이번 워크가 실제로 열람한 폴더의 항목인데 파일이 없으면 무효화
+    # (깊이 제한·SKIP_DIRS 로 건너뛴 폴더의 항목은 확인 불가 → 그대로 둠)
+    walked_dirs = {str(d).lower() for d in dir_paths}
+    seen_keys   = set(file_keys)
+    for key in [k for k in file_index
+                if k not in seen_keys and os.path.dirname(k) in walked_dirs]:
+        ent = file_index.pop(key)
+        evicted.append(("gone", key, ent[1], ent[2], "", ""))
+        ckpt.evict(key, "gone")
+    del walked_dirs, seen_keys
 
-    # BUG FIX #3: pending 판단도 _path_key() 로 비교
-    pending   = [fp for fp in all_files if _path_key(fp) not in file_index]
     n_pending = len(pending)
-    n_cached  = len(all_files) - n_pending
-    append_log(f"    캐시 히트 {n_cached:,}개 | 미처리 {n_pending:,}개 계산 시작 (스레드 6개)...")
+    n_cached  = n_files - n_pending
+    if evicted or n_upgraded:
+        n_by = {r: 0 for r in ("size", "mtime", "gone")}
+        for e in evicted:
+            n_by[e[0]] += 1
+        append_log(f"    캐시 검증: 무효화 {len(evicted):,}개"
+                   f" (크기 변경 {n_by['size']:,} / 수정시각 변경 {n_by['mtime']:,}"
+                   f" / 삭제 {n_by['gone']:,})"
+                   + (f" | 구버전 항목 mtime 보강 {n_upgraded:,}개" if n_upgraded else ""))
+        for e in evicted[:5]:
+            append_log(f"      [{e[0]}] {e[1]}")
+    n_from_cli = sum(1 for k in file_keys if k in file_index and file_index[k][3])
+    append_log(f"    캐시 히트 {n_cached:,}개"
+               + (f" (CLI 전체 해시 카탈로그 {n_from_cli:,}개 포함)" if n_from_cli else "")
+               + f" | 미처리 {n_pending:,}개 계산 시작 (스레드 6개)...")
 
     processed   = 0
     err_count   = 0
     err_samples: list = []   # BUG FIX #1: 오류 샘플 저장
-    SAVE_EVERY  = 5_000
     LOG_EVERY   = 10_000     # 개선: 로그 출력 주기 조정
-
+    FP_INFLIGHT = 2_000      # 동시에 제출해 두는 최대 지문 작업 수 (제출 창)
+    FP_POLL_SEC = 0.2        # 완료 대기 주기 — 중단 요청 반영 간격
+
+    # 제출 창: 미완료 작업을 FP_INFLIGHT 개 이하로 유지하고 끝난 만큼만 보충
+    #   → Future 가 파일 수만큼 쌓이지 않아 메모리 일정, 중단 시 취소할 작업도 적음.
+    #   wait() 가 FP_POLL_SEC 마다 깨어나므로 중단 요청이 1초 안에 반영됨.
+    next_pending = iter(pending)
+    inflight: dict = {}   # Future → 파일 번호
     with ThreadPoolExecutor(max_workers=6) as ex:
-        fmap = {ex.submit(fast_fingerprint, fp): fp for fp in pending}
-        for fut in as_completed(fmap):
+        while True:
+            # 일시정지 중에는 새 작업을 넣지 않음 → 진행 중 작업이 끝나면 대기
+            while len(inflight) < FP_INFLIGHT and not _pause_event.is_set():
+                fi = next(next_pending, None)
+                if fi is None:
+                    break
+                inflight[ex.submit(fast_fingerprint_stat,
+                                   dir_paths[file_dir[fi]] / file_name[fi])] = fi
+            if not inflight:
+                if not _pause_event.is_set():
+                    break
+                _wait_if_paused()       # 재개 또는 중지까지 대기 → 아래 중지 확인으로
+
+            done, _ = wait(inflight, timeout=FP_POLL_SEC, return_when=FIRST_COMPLETED)
             if _stop_event.is_set():
                 ex.shutdown(wait=False, cancel_futures=True)
-                _save_ckpt_both(ckpt_path, ckpt_bak, file_index)
+                ckpt.close()
+                dindex.save()
                 append_log(f"[2/4] ⛔ 중단 — 체크포인트 저장됨 ({len(file_index):,}개)")
                 append_log("__FOLDER_DONE__")
                 return
 
-            res = fut.result()
-            fp  = fmap[fut]
-
-            # BUG FIX #1: (None, reason) 또는 (hex, sz) 두 가지 반환값 처리
-            if isinstance(res, tuple) and len(res) == 2:
-                h, sz_or_err = res
-                if h is not None:
-                    # 성공
-                    file_index[_path_key(fp)] = [h, sz_or_err]
+            for fut in done:
+                fi  = inflight.pop(fut)
+                res = fut.result()
+
+                # BUG FIX #1: (None, reason, None) 또는 (digest, sz, mtime) 두 가지 반환값 처리
+                if isinstance(res, tuple) and len(res) == 3:
+                    h, sz_or_err, mt = res
+                    if h is not None:
+                        # 성공
+                        # 읽을 때 본 크기·mtime 으로 저장. 폴더 목록 캐시 값과 다르면
+                        # (내용만 바뀐 파일) 캐시도 고쳐 다음 실행의 워크 결과와 일치시킴
+                        if sz_or_err != file_size[fi] or mt != file_mtime[fi]:
+                            file_size[fi], file_mtime[fi] = sz_or_err, mt
+                            dindex.refresh(str(dir_paths[file_dir[fi]]), file_name[fi],
+                                           sz_or_err, mt)
+                        file_index[file_keys[fi]] = (h, sz_or_err, file_mtime[fi], None)
+                        ckpt.add(file_keys[fi], h, sz_or_err, file_mtime[fi])
+                    else:
+                        # 실패
+                        err_count += 1
+                        if len(err_samples) < 5:
+                            err_samples.append(f"  {file_name[fi]}: {sz_or_err}")
                 else:
-                    # 실패
+                    # 예상치 못한 반환값 — 무시
                     err_count += 1
-                    if len(err_samples) < 5:
-                        err_samples.append(f"  {fp.name}: {sz_or_err}")
-            else:
-                # 예상치 못한 반환값 — 무시
-                err_count += 1
-
-            processed += 1
 
-            # 저장
-            if processed % SAVE_EVERY == 0:
-                _save_ckpt_both(ckpt_path, ckpt_bak, file_index)
+                processed += 1
 
-            # 로그
-            if processed % LOG_EVERY == 0:
-                elapsed = time.time() - t0
-                rate    = processed / elapsed if elapsed > 0 else 1
-                eta     = (n_pending - processed) / rate
-                append_log(f"    {processed:,}/{n_pending:,}"
-                           f" | 성공 {len(file_index):,} | 실패 {err_count:,}"
-                           f" | 경과 {elapsed/60:.1f}분 | 잔여 약 {eta/60:.1f}분")
+                # 로그
+                if processed % LOG_EVERY == 0:
+                    elapsed = time.time() - t0
+                    rate    = processed / elapsed if elapsed > 0 else 1
+                    eta     = (n_pending - processed) / rate
+                    append_log(f"    {processed:,}/{n_pending:,}"
+                               f" | 성공 {len(file_index):,} | 실패 {err_count:,}"
+                               f" | 경과 {elapsed/60:.1f}분 | 잔여 약 {eta/60:.1f}분")
 
-    _save_ckpt_both(ckpt_path, ckpt_bak, file_index)
+    ckpt.close(file_index)
+    dindex.save()
 
     # BUG FIX #1: 오류 요약 출력
     if err_count > 0:
@@ -607,43 +1503,69 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
     # ── Step 3: 폴더별 재귀 해시셋 구성 ─────────────────────────────────
     append_log("[3/4] 폴더 해시셋 집계 중...")
 
-    direct: "dict[Path, dict]" = {
-        d: {"hashes": set(), "bytes": 0, "files": 0} for d in scan_dirs
-    }
-
-    for path_key_str, (h, sz) in file_index.items():
-        # BUG FIX #3: key 가 정규화된 소문자이므로 Path 로 복원
-        parent = Path(path_key_str).parent
-        # scan_dirs 도 소문자 key 로 비교
-        matched = None
-        for d in direct:
-            if _path_key(d) == _path_key(parent):
-                matched = d
-                break
-        if matched is not None:
-            direct[matched]["hashes"].add(h)
-            direct[matched]["bytes"] += sz
-            direct[matched]["files"] += 1
-
-    n_matched = sum(len(v["hashes"]) for v in direct.values())
-    append_log(f"[3/4] 직속 파일 집계: {n_matched:,}개 해시 매칭됨")
-
-    recursive: "dict[Path, dict]" = {
-        d: {"hashes": set(v["hashes"]), "bytes": v["bytes"], "files": v["files"]}
-        for d, v in direct.items()
-    }
-
-    for d in sorted(scan_dirs, key=lambda p: len(p.parts), reverse=True):
-        parent = d.parent
-        if parent in recursive:
-            recursive[parent]["hashes"] |= recursive[d]["hashes"]
-            recursive[parent]["bytes"]  += recursive[d]["bytes"]
-            recursive[parent]["files"]  += recursive[d]["files"]
+    # 직속 집계: 파일마다 Step1 에서 기록한 부모 ID 로 바로 누적 (선형 1패스)
+    #   - file_index 가 아닌 이번 워크의 파일 목록을 기준으로 돌기 때문에
+    #     외부경로/삭제된 파일의 체크포인트 항목은 자연히 제외됨
+    #   - 지문은 처음 본 순서대로 정수 ID 로 인터닝 (hid_size[ID] = 파일 크기)
+    n_dirs    = len(dir_paths)
+    d_bytes:  "list[int]" = [0] * n_dirs
+    d_files:  "list[int]" = [0] * n_dirs
+    hid_of:   "dict[bytes, int]" = {}
+    hid_size  = array("q")                    # 지문 ID → 파일 크기 (지문에 크기 포함, 1:1)
+    file_hid  = array("i", [-1]) * n_files    # 파일 번호 → 지문 ID (-1 = 지문 없음)
+
+    for fi, (key, did) in enumerate(zip(file_keys, file_dir)):
+        ent = file_index.get(key)
+        if ent is None:
+            continue
+        h, sz = ent[0], ent[1]
+        hid = hid_of.get(h)
+        if hid is None:
+            hid = hid_of[h] = len(hid_size)
+            hid_size.append(sz)
+        file_hid[fi] = hid
+        d_bytes[did] += sz
+        d_files[did] += 1
+
+    hid_digest = list(hid_of)   # 삽입 순서 = 지문 ID 순서 (Merkle 해시 입력용)
+    del hid_of, file_keys, file_size, file_mtime
+    append_log(f"[3/4] 직속 파일 집계: {sum(d_files):,}개 파일 지문 매칭됨"
+               f" (고유 지문 {len(hid_size):,}개)")
+
+    # 재귀 집계 + 하위 트리 파일 구간 [dir_file0, file_end) / 폴더 구간 [did, dir_end)
+    file_end, dir_end = _rollup_tree(dir_parent, dir_file0, n_files, d_bytes, d_files)
+
+    # 완전 동일 트리: 상향식 Merkle 해시 → 버킷팅 1패스 (퍼지 그룹과 별도 보고)
+    t_mk   = time.time()
+    merkle = _merkle_dir_hashes(dir_paths, dir_parent, dir_file0, dir_nsub,
+                                file_name, file_hid, hid_digest, hid_size,
+                                use_names=merkle_names)
+    exact_groups = _exact_tree_groups(merkle, dir_parent, d_bytes, d_files, min_bytes)
+    n_incomplete = sum(1 for h in merkle if h is None)
+    del merkle, hid_digest
+    exact_waste  = sum(d_bytes[ids[0]] * (len(ids) - 1) for ids in exact_groups)
+    append_log(f"[3/4] 완전 동일 폴더 트리 (Merkle{', 이름 무시' if not merkle_names else ''}):"
+               f" {len(exact_groups)}그룹 / {sum(len(g) for g in exact_groups)}폴더"
+               f" | 중복 {exact_waste/1024**2:,.1f}MB | {time.time()-t_mk:.1f}초")
+    if n_incomplete:
+        append_log(f"    ※ 불완전 폴더 {n_incomplete:,}개는 판정 제외"
+                   f" (깊이 제한·접근 불가·지문 실패 포함)")
+    for ids in exact_groups[:5]:
+        append_log(f"    [동일] {len(ids)}개 × {d_bytes[ids[0]]/1024**2:,.1f}MB: "
+                   + " = ".join(str(dir_paths[did]) for did in ids[:3])
+                   + (" ..." if len(ids) > 3 else ""))
+
+    def _subtree_hids(did: int) -> "array":
+        """하위 트리 파일 구간의 고유 지문 ID → 정렬된 정수 배열"""
+        ids = set(file_hid[dir_file0[did]:file_end[did]])
+        ids.discard(-1)
+        return array("i", sorted(ids))
 
     candidates = [
-        {"path": d, **v}
-        for d, v in recursive.items()
-        if v["bytes"] >= min_bytes and v["hashes"]
+        {"id": did, "end": dir_end[did], "path": dir_paths[did], "hashes": _subtree_hids(did),
+         "bytes": d_bytes[did], "files": d_files[did]}
+        for did in range(n_dirs)
+        if d_bytes[did] >= min_bytes and d_files[did]
     ]
     candidates.sort(key=lambda x: x["bytes"], reverse=True)
 
@@ -661,117 +1583,204 @@ def run_folder_scan(root: str, base: str, depth_limit: int,
     total_pairs = n_cands * (n_cands - 1) // 2
     append_log(f"[4/4] 유사도 계산 + 그룹핑 중... ({n_cands}개 폴더, {total_pairs:,}쌍)")
 
-    uf       = UnionFind()
+    if engine == "sparse" and np is None:
+        append_log("    ⚠ numpy/scipy 미설치 → sparse 대신 index 엔진으로 계산")
+        engine = "index"
+    preordered = False   # cand_pairs 가 이미 (ia 의 ID < ib 의 ID) 전위 ID 순인지
+
+    if engine == "minhash" and min_similarity > 0:
+        t_mh = time.time()
+        threshold = min_similarity / 100
+        dir_sigs = _minhash_dir_signatures(
+            n_dirs, dir_parent,
+            ((did, hid) for did, hid in zip(file_dir, file_hid) if hid >= 0),
+            sketch_size,
+        )
+        sigs = [dir_sigs[c["id"]] for c in candidates]
+        del dir_sigs
+        bands, rows = _lsh_params(sketch_size, threshold)
+        lsh_pairs   = _lsh_candidate_pairs(sigs, bands, rows)
+        del sigs
+        n_eval     = len(lsh_pairs)
+        cand_pairs = ((ia, ib, None, None) for ia, ib in lsh_pairs)
+        append_log(f"    MinHash k={sketch_size} = {bands}밴드 × {rows}행"
+                   f" | 서명+버킷 {time.time()-t_mh:.1f}초")
+        append_log(f"    재현율(탐지확률): J={threshold:.2f} → "
+                   f"{_lsh_detect_prob(threshold, bands, rows)*100:.1f}%"
+                   f" | J={min(1.0, threshold+0.05):.2f} → "
+                   f"{_lsh_detect_prob(min(1.0, threshold+0.05), bands, rows)*100:.1f}%"
+                   f" | J={max(0.0, threshold-0.1):.2f} → "
+                   f"{_lsh_detect_prob(max(0.0, threshold-0.1), bands, rows)*100:.1f}%")
+        append_log(f"    속도: 검증 대상 {n_eval:,}쌍 / 전체 {total_pairs:,}쌍"
+                   f" ({(n_eval / total_pairs * 100) if total_pairs else 0:.2f}%)"
+                   f" — 나머지는 Jaccard 계산 생략")
+    elif engine == "index":
+        t_ix   = time.time()
+        counts = _index_pair_counts([c["hashes"] for c in candidates])
+        if counts is None:
+            append_log("[4/4] ⛔ 중단 요청 — 역색인 집계 중단")
+            append_log("__FOLDER_DONE__")
+            return
+        n_eval     = len(counts)
+        cand_pairs = ((key // n_cands, key % n_cands, n_inter, None)
+                      for key, n_inter in sorted(counts.items()))
+        append_log(f"    역색인 집계 {time.time()-t_ix:.1f}초"
+                   f" | 공유 지문이 있는 쌍 {n_eval:,} / 전체 {total_pairs:,}쌍"
+                   f" ({(n_eval / total_pairs * 100) if total_pairs else 0:.2f}%)")
+    elif engine == "sparse":
+        t_sp   = time.time()
+        scored = _sparse_pair_scores([c["hashes"] for c in candidates], hid_size,
+                                     min_similarity / 100)
+        if scored is None:
+            append_log("[4/4] ⛔ 중단 요청 — 희소행렬 계산 중단")
+            append_log("__FOLDER_DONE__")
+            return
+        n_eval     = len(scored)
+        cand_pairs = iter(scored)
+        append_log(f"    희소행렬 X·Xᵀ {time.time()-t_sp:.1f}초"
+                   f" | 임계값 통과 {n_eval:,} / 전체 {total_pairs:,}쌍")
+    elif min_similarity > 0:
+        n_eval, cand_pairs = _size_window_pairs(candidates, min_similarity)
+        append_log(f"    크기 창: 지문 수 상한(|B| ≤ |A|×100/{min_similarity:g})"
+                   f" 밖의 {total_pairs - n_eval:,}쌍 집합 연산 없이 제외"
+                   f" | 검증 {n_eval:,} / 전체 {total_pairs:,}쌍")
+    else:
+        n_eval, cand_pairs = _exact_pair_iter(candidates)
+        preordered = True
+        append_log(f"    전체쌍 {total_pairs:,} 중 상하위(중첩) 쌍 {total_pairs - n_eval:,}개"
+                   f" 구간 라벨로 일괄 제외")
+
+    if hierarchical:
+        # 상위 우선: 쌍을 (작은 ID, 큰 ID) 로 맞춘 뒤 전위 ID 순 정렬.
+        # 하위 쌍 (x ⊂ X, y ⊂ Y) 는 min(x, y) > min(X, Y) → 항상 상위 쌍이 먼저 처리됨.
+        # 바깥 폴더(ia) 가 연속으로 묶이므로 직접 계산 시 집합 캐시도 그대로 유효.
+        # 전체쌍(_exact_pair_iter) 은 이미 이 순서로 생성 → 정렬 없이 스트리밍 (쌍 목록을 쌓지 않음).
+        def _by_id(t):
+            ia, ib = t[0], t[1]
+            if candidates[ia]["id"] > candidates[ib]["id"]:
+                ia, ib = ib, ia
+            return ia, ib, t[2], t[3]
+        if not preordered:
+            cand_pairs = sorted((_by_id(t) for t in cand_pairs),
+                                key=lambda t: (candidates[t[0]]["id"], candidates[t[1]]["id"]))
+        cand_of_dir = {c["id"]: i for i, c in enumerate(candidates)}
+        matched: "dict[int, list[int]]" = {}   # 후보 번호 → 일치한 상대 후보 번호들
+
+        def _explained(ia: int, ib: int) -> bool:
+            """a 의 조상(자신 포함) 중 하나가, b 를 하위에 둔 폴더와 이미 일치했는지"""
+            b_id = candidates[ib]["id"]
+            did  = candidates[ia]["id"]
+            while did >= 0:
+                ci = cand_of_dir.get(did)
+                if ci is not None:
+                    for pj in matched.get(ci, ()):
+                        if candidates[pj]["id"] <= b_id < candidates[pj]["end"]:
+                            return True
+                did = dir_parent[did]
+            return False
+
+    uf       = UnionFind(n_cands)
     pairs    = []
     compared = 0
+    n_nested = 0
+    n_sized  = 0   # 크기 상한으로 제외 (엔진이 만든 후보 중)
+    n_explained = 0   # 상위 쌍 일치로 설명되어 생략 (hierarchical)
+    set_ia, set_a = -1, set()   # 직접 계산 시 바깥쪽 폴더 집합 1개만 캐시
 
-    for a, b in combinations(candidates, 2):
+    # cand_pairs: (i, j, 공유 지문 수, 공유 바이트) — None 이면 여기서 직접 계산
+    for ia, ib, n_inter, inter_bytes in cand_pairs:
         if _stop_event.is_set():
             append_log("[4/4] ⛔ 중단 요청 — 유사도 계산 중단")
             append_log("__FOLDER_DONE__")
             return
 
-        try:
-            a["path"].relative_to(b["path"])
+        a, b = candidates[ia], candidates[ib]
+        if not _size_bound_ok(len(a["hashes"]), len(b["hashes"]), min_similarity):
+            n_sized += 1
             compared += 1
             continue
-        except ValueError:
-            pass
-        try:
-            b["path"].relative_to(a["path"])
+        if _is_nested(a, b):
+            n_nested += 1
+            compared += 1
+            continue
+        if hierarchical and _explained(ia, ib):
+            n_explained += 1
             compared += 1
             continue
-        except ValueError:
-            pass
 
-        inter = a["hashes"] & b["hashes"]
-        union = a["hashes"] | b["hashes"]
-        if not union:
+        if n_inter is None:
+            if ia != set_ia:
+                set_ia, set_a = ia, set(a["hashes"])
+            n_inter = len(set_a.intersection(b["hashes"]))
+        n_union = len(a["hashes"]) + len(b["hashes"]) - n_inter
+        if not n_union:
             compared += 1
             continue
 
-        score = len(inter) / len(union) * 100
+        score = n_inter / n_union * 100
 
         if score >= min_similarity:
-            pa, pb = str(a["path"]), str(b["path"])
+            if inter_bytes is None:
+                inter_bytes = sum(hid_size[h]
+                                  for h in set(a["hashes"]).intersection(b["hashes"]))
+            u_bytes = _unique_bytes(a, hid_size) + _unique_bytes(b, hid_size) - inter_bytes
             pairs.append({
                 "dir_a":        a["path"],
                 "dir_b":        b["path"],
                 "score":        round(score, 1),
-                "shared_files": len(inter),
+                "containment":  round(n_inter / min(len(a["hashes"]), len(b["hashes"])) * 100, 1),
+                "byte_score":   round(inter_bytes / u_bytes * 100, 1) if u_bytes else 100.0,
+                "shared_files": n_inter,
                 "files_a":      a["files"],
                 "files_b":      b["files"],
                 "mb_a":         round(a["bytes"] / 1024 / 1024, 1),
                 "mb_b":         round(b["bytes"] / 1024 / 1024, 1),
             })
-            uf.union(pa, pb)
+            uf.union(ia, ib)
+            if hierarchical:
+                matched.setdefault(ia, []).append(ib)
+                matched.setdefault(ib, []).append(ia)
 
         compared += 1
         if compared % 100_000 == 0:
-            append_log(f"    {compared:,}/{total_pairs:,}쌍 | 현재 {len(pairs)}쌍 발견")
-
-    raw_groups = uf.groups()
-    groups = [
-        sorted(members)
-        for members in raw_groups.values()
-        if len(members) >= 2
-    ]
-    groups.sort(key=lambda g: len(g), reverse=True)
-
-    path_to_gid: dict = {}
-    for gid, members in enumerate(groups, 1):
-        for m in members:
-            path_to_gid[m] = gid
-
-    pairs_with_gid = [
-        {**p, "group_id": path_to_gid.get(str(p["dir_a"]), "-")}
-        for p in pairs
-    ]
-    pairs_with_gid.sort(key=lambda x: (
-        x["group_id"] if isinstance(x["group_id"], int) else 9999,
-        -x["score"]
-    ))
-    top_pairs = pairs_with_gid[:top_k]
-
-    append_log(f"[4/4] 완료 | {len(pairs)}쌍 / {len(groups)}그룹 발견 (≥{min_similarity}%)")
-
-    if groups:
-        summary = ", ".join(f"G{i}:{len(g)}폴더" for i, g in enumerate(groups[:10], 1))
-        append_log(f"[4/4] 그룹 요약: {summary}" + (" ..." if len(groups) > 10 else ""))
-
-    # ── 결과 저장 ─────────────────────────────────────────────────────────
-    run_id     = time.strftime("%Y%m%d_%H%M")
-    run_dir    = base_path / "Runs" / f"run_{run_id}_fol"
-    review_dir = run_dir / "01_review_fol"
-    review_dir.mkdir(parents=True, exist_ok=True)
-
-    csv_path = run_dir / "folder_similarity_groups.csv"
-    with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.writer(f)
-        w.writerow(["rank", "group_id", "score%", "shared", "files_a", "files_b",
-                    "MB_a", "MB_b", "dir_a", "dir_b"])
-        for i, p in enumerate(top_pairs, 1):
-            w.writerow([i, p["group_id"], p["score"], p["shared_files"],
-                        p["files_a"], p["files_b"],
-                        p["mb_a"], p["mb_b"],
-                        str(p["dir_a"]), str(p["dir_b"])])
-
-    for gid, members in enumerate(groups[:top_k], 1):
-        labels = [chr(ord("A") + i) for i in range(len(members))]
-        folder_names = "__".join(
-            safe_filename(Path(m).name, max_len=30) for m in members[:4]
-        )
-        suffix  = f"(+{len(members)-4}개)" if len(members) > 4 else ""
-        grp_dir = review_dir / f"{gid:02d}_G{gid}_{len(members)}폴더_{folder_names}{suffix}"
-        grp_dir.mkdir(parents=True, exist_ok=True)
-        for idx, member in enumerate(members):
-            lnk_name = f"{idx+1:02d}_폴더{labels[idx] if idx < 26 else str(idx+1)}"
-            create_dir_shortcut(grp_dir / lnk_name, Path(member))
+            append_log(f"    {compared:,}/{n_eval:,}쌍 | 현재 {len(pairs)}쌍 발견")
+
+    if n_nested:
+        append_log(f"    상하위(중첩) 쌍 {n_nested:,}개 제외")
+    if n_sized:
+        append_log(f"    크기 상한(Jaccard ≤ 작은쪽/큰쪽) 으로 {n_sized:,}쌍 집합 연산 없이 제외")
+    if hierarchical:
+        append_log(f"    상위 우선: 상위 폴더 쌍 일치로 설명되는 하위 쌍 {n_explained:,}개 계산 생략")
+
+    groups = _write_folder_results(run_dir, candidates, pairs, uf,
+                                   top_k, min_similarity)
+
+    # 완전 동일 트리 그룹 (Merkle) — 퍼지 그룹과 별도 파일
+    if exact_groups:
+        with open(run_dir / "folder_exact_groups.csv", "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(["group_id", "members", "files", "MB", "wasted_MB", "dir"])
+            for gid, ids in enumerate(exact_groups, 1):
+                mb = round(d_bytes[ids[0]] / 1024**2, 1)
+                for did in ids:
+                    w.writerow([gid, len(ids), d_files[did], mb,
+                                round(mb * (len(ids) - 1), 1), str(dir_paths[did])])
+
+    # 이번 실행에서 무효화한 체크포인트 항목 (체크포인트 로그에도 tombstone 으로 남음)
+    if evicted:
+        with open(run_dir / "ckpt_evicted.csv", "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(["reason", "path_key", "old_size", "old_mtime_ns",
+                        "new_size", "new_mtime_ns"])
+            w.writerows(evicted)
+        append_log(f"[FOLDER] 캐시 무효화 내역 {len(evicted):,}개 → ckpt_evicted.csv")
 
     total_t = time.time() - t0
     append_log("")
     append_log(f"[FOLDER] ✅ 완료! 총 소요: {total_t/60:.1f}분")
     append_log(f"[FOLDER] 유사 쌍: {len(pairs)}쌍 → {len(groups)}그룹")
+    append_log(f"[FOLDER] 완전 동일 트리: {len(exact_groups)}그룹"
+               + (" → folder_exact_groups.csv" if exact_groups else ""))
     append_log(f"[FOLDER] 결과 → {run_dir}")
     append_log(f"[FOLDER] 체크포인트(주): {ckpt_path}")
     append_log(f"[FOLDER] 체크포인트(백업): {ckpt_bak}")
@@ -786,19 +1795,31 @@ sg.set_options(font=("맑은 고딕", 10))
 
 BTN_STOP = sg.Button("⛔ 중지", key="-STOP-",
                       button_color=("white", "#8B0000"), size=(10, 1))
+BTN_PAUSE = sg.Button("⏸ 일시정지", key="-PAUSE-", size=(10, 1))
 
 _TAB_FONT_BOLD = ("맑은 고딕", 10, "bold")
 
+PROG_MAX = 1000   # 진행 막대 눈금 (ProgressEvent.fraction × PROG_MAX)
+
 layout_tab_01 = [
     [sg.Text("파일 내용/이름 기반 중복 스캔", key="-T01_TITLE-",
              font=_TAB_FONT_BOLD, text_color="cyan")],
     [sg.Text("모드:"),
      sg.Radio("DUP", "M1", key="-MODE_DUP-", default=True),
      sg.Radio("BIG", "M1", key="-MODE_BIG-"),
+     sg.Radio("JOIN", "M1", key="-MODE_JOIN-"),
      sg.Text("  TOP N:"), sg.Input("50", size=(5, 1), key="-TOPN-"),
      sg.Push(),
      sg.Button("중복 스캔 실행", key="-RUN01-",
                button_color="firebrick", size=(18, 1))],
+    [sg.Text("* ROOT 에 ; 로 여러 폴더 지정 가능 (예: D:\\Data;E:\\Backup)"
+             " → 드라이브 간 중복까지 한 번에, 드라이브별 동시 스캔",
+             text_color="#AAAAAA", font=("맑은 고딕", 9))],
+    [sg.Text("JOIN 참조:"), sg.Input("", key="-REF-", expand_x=True),
+     sg.FolderBrowse("찾기", target="-REF-")],
+    [sg.Text("* JOIN = 참조(아카이브, ; 로 여러 개)에 이미 있는 ROOT 파일 → 삭제 후보"
+             " (참조 파일은 mmm 보존, 아카이브 재해시 없음)",
+             text_color="#AAAAAA", font=("맑은 고딕", 9))],
 ]
 
 layout_tab_02 = [
@@ -820,6 +1841,15 @@ layout_tab_03 = [
      sg.Push(),
      sg.Button("폴더 유사도 스캔 시작", key="-RUN_FOL-",
                button_color="darkgreen", size=(20, 1))],
+    [sg.Text("비교 엔진:"),
+     sg.Combo(list(SIM_ENGINES), default_value="index", key="-F_ENGINE-",
+              readonly=True, size=(9, 1), enable_events=True),
+     sg.Text(" 스케치 k:"),  sg.Input("128",  size=(5, 1), key="-F_SKETCH-"),
+     sg.Checkbox("동일 트리: 이름 무시", default=False, key="-F_MK_NONAME-"),
+     sg.Checkbox("상위 일치 시 하위 쌍 생략", default=False, key="-F_HIER-"),
+     sg.Text("(index: 정확·희소 / minhash: k↑ 재현율↑ / sparse: numpy 필요"
+             " / exact: 전체쌍 / meta: 파일 읽기 없이 빠른 훑어보기)",
+             text_color="#AAAAAA", font=("맑은 고딕", 9))],
     [sg.Text("* 3개 이상 폴더는 자동으로 그룹(A-B-C...)으로 묶입니다",
              text_color="yellow", font=("맑은 고딕", 9))],
     [sg.Text("* D:\\ 등 루트 직접 지정 시 권한 오류 다수 → 하위 폴더 지정 권장",
@@ -850,7 +1880,9 @@ layout = [
     )],
     [sg.Text("대기 중", key="-STATUS-", text_color="lime",
              font=("맑은 고딕", 9), expand_x=True),
-     BTN_STOP],
+     BTN_PAUSE, BTN_STOP],
+    [sg.ProgressBar(PROG_MAX, orientation="h", size=(30, 12), key="-PROG-"),
+     sg.Text("", key="-PROG_TXT-", font=("Consolas", 9), expand_x=True)],
     [sg.Multiline(size=(95, 20), key="-LOG-",
                   autoscroll=True, disabled=True,
                   font=("Consolas", 9),
@@ -869,25 +1901,90 @@ window = sg.Window(
 window.set_min_size((700, 500))
 
 
+# ====== 로그 창 (틱당 1회 갱신, 최근 줄만 유지) ======
+
+LOG_VIEW_LINES = 5000      # 화면에 유지할 최근 로그 줄 수
+LOG_DRAIN_MAX  = 20000     # 틱(100ms)당 큐에서 꺼낼 최대 줄 수 (나머지는 다음 틱)
+
+
+class LogView:
+    """
+    -LOG- Multiline 을 링 버퍼로 관리.
+    add() 는 묶음 단위로 append 1회, 위젯 줄 수가 LOG_VIEW_LINES 의 1.25배를
+    넘으면 링 버퍼(최근 LOG_VIEW_LINES 줄)로 다시 그림 → 위젯 크기 상한 유지.
+    """
+    def __init__(self, elem):
+        self.elem  = elem
+        self.lines: deque = deque(maxlen=LOG_VIEW_LINES)
+        self.shown = 0                  # 위젯에 현재 들어 있는 줄 수
+
+    def add(self, batch: "list[str]"):
+        self.lines.extend(batch)
+        if self.shown + len(batch) > LOG_VIEW_LINES * 5 // 4:
+            self.elem.update("\n".join(self.lines) + "\n")
+            self.shown = len(self.lines)
+        else:
+            self.elem.update("\n".join(batch) + "\n", append=True)
+            self.shown += len(batch)
+
+    def clear(self):
+        self.lines.clear()
+        self.shown = 0
+        self.elem.update("")
+
+
+log_view = LogView(window["-LOG-"])
+
+
 # ====== 스레드 헬퍼 ======
 current_thread: "threading.Thread | None" = None
 _start_time_str: str = ""
 
-_DONE_TOKENS = {"__STEP01_DONE__", "__STEP02_DONE__", "__FOLDER_DONE__"}
-
 def start_thread(target, *args):
-    global current_thread, _start_time_str
+    global current_thread, _start_time_str, _run_log
     if current_thread and current_thread.is_alive():
         sg.popup("이미 작업이 실행 중입니다.\n중지하려면 ⛔ 중지 버튼을 눌러주세요.")
         return
     _stop_event.clear()
-    window["-LOG-"].update("")
+    _pause_event.clear()
+    window["-PAUSE-"].update("⏸ 일시정지")
+    _run_log.close()
+    _run_log = run_log = RunLog()
+    log_view.clear()
+    window["-PROG-"].update(0)
+    window["-PROG_TXT-"].update("")
     _start_time_str = time.strftime("%H:%M:%S")
     window["-STATUS-"].update(f"🔄 실행 중...  (시작 {_start_time_str})", text_color="yellow")
-    current_thread = threading.Thread(target=target, args=args, daemon=True)
+
+    def _run():
+        # 로그 파일은 작업 스레드가 직접 닫음 — 메인 루프가 완료 토큰을 늦게 꺼내도
+        # 그사이 시작된 다음 작업의 로그를 닫지 않도록 (is_alive() 는 여기까지 끝나야 False)
+        try:
+            target(*args)
+        finally:
+            run_log.close()
+
+    current_thread = threading.Thread(target=_run, daemon=True)
     current_thread.start()
 
 
+def _fmt_eta(sec: "float | None") -> str:
+    if sec is None:
+        return "--:--"
+    m, s = divmod(int(sec), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def show_progress(ev: ProgressEvent):
+    frac = 1.0 if ev.done else (ev.fraction or 0.0)
+    window["-PROG-"].update(int(frac * PROG_MAX))
+    files = f"{ev.files:,}" + (f"/{ev.total_files:,}" if ev.total_files else "")
+    window["-PROG_TXT-"].update(
+        f"{ev.stage} {files}개 · {ev.bytes / 1048576:,.0f} MB · "
+        f"{ev.rate:,.0f}개/s {ev.byte_rate / 1048576:,.1f} MB/s · ETA {_fmt_eta(ev.eta)}")
+
+
 # ====== 메인 이벤트 루프 ======
 while True:
     event, values = window.read(timeout=100)
@@ -905,22 +2002,44 @@ while True:
         window["-T03_TITLE-"].update(
             text_color="cyan" if " 03.Folder "   in tab else "#888888")
 
+    elif event == "-PAUSE-":
+        if current_thread and current_thread.is_alive():
+            if _pause_event.is_set():
+                _pause_event.clear()
+                window["-PAUSE-"].update("⏸ 일시정지")
+                append_log("▶ 재개")
+                window["-STATUS-"].update(f"🔄 실행 중...  (시작 {_start_time_str})",
+                                          text_color="yellow")
+            else:
+                _pause_event.set()
+                window["-PAUSE-"].update("▶ 재개")
+                append_log("⏸ 일시정지 — 현재 파일을 마친 뒤 대기합니다")
+                window["-STATUS-"].update("⏸ 일시정지됨", text_color="orange")
+        else:
+            sg.popup("현재 실행 중인 작업이 없습니다.")
+
     elif event == "-STOP-":
         if current_thread and current_thread.is_alive():
             _stop_event.set()
+            _pause_event.clear()
+            window["-PAUSE-"].update("⏸ 일시정지")
             append_log("⛔ 중지 요청됨 — 현재 작업 완료 후 종료됩니다...")
             window["-STATUS-"].update("⛔ 중지 요청됨...", text_color="orange")
         else:
             sg.popup("현재 실행 중인 작업이 없습니다.")
 
     elif event == "-CLEAR-":
-        window["-LOG-"].update("")
+        log_view.clear()
 
     elif event == "-RUN01-":
-        mode = "DUP" if values["-MODE_DUP-"] else "BIGFILE"
+        mode = "DUP" if values["-MODE_DUP-"] else \
+            "JOIN" if values["-MODE_JOIN-"] else "BIGFILE"
+        if mode == "JOIN" and not values["-REF-"].strip():
+            sg.popup("JOIN 모드는 참조 폴더를 지정해야 합니다.")
+            continue
         start_thread(run_step01,
                      values["-ROOT-"], values["-BASE-"],
-                     mode, int(values["-TOPN-"]))
+                     mode, int(values["-TOPN-"]), values["-REF-"])
 
     elif event == "-RUN02_LATEST-":
         start_thread(run_step02,
@@ -934,16 +2053,42 @@ while True:
                          values["-BASE-"], run_dir,
                          int(values["-SAMPLEN-"]))
 
+    elif event == "-F_ENGINE-":
+        # meta 엔진은 상위 우선 생략을 쓰지 않음
+        window["-F_HIER-"].update(disabled=values["-F_ENGINE-"] == "meta")
+
     elif event == "-RUN_FOL-":
         start_thread(run_folder_scan,
                      values["-ROOT-"], values["-BASE-"],
                      int(values["-F_DEPTH-"]),
                      int(values["-F_MINMB-"]),
                      float(values["-F_MINSIM-"]),
-                     int(values["-F_TOPK-"]))
+                     int(values["-F_TOPK-"]),
+                     values["-F_ENGINE-"] or "index",
+                     int(values["-F_SKETCH-"]),
+                     not values["-F_MK_NONAME-"],
+                     values["-F_HIER-"])
+
+    try:
+        summary, reply = confirm_queue.get_nowait()
+        reply.put(sg.popup_yes_no(
+            summary + "\n\nquarantine 복사 및 원본 이동을 진행할까요?",
+            title="STEP 02 확인", font=("Consolas", 9)) == "Yes")
+    except queue.Empty:
+        pass
 
+    ev = None
     try:
         while True:
+            ev = progress_queue.get_nowait()
+    except queue.Empty:
+        pass
+    if ev is not None:
+        show_progress(ev)
+
+    batch = []
+    try:
+        while len(batch) < LOG_DRAIN_MAX:
             line = log_queue.get_nowait()
             if line in _DONE_TOKENS:
                 end_time = time.strftime("%H:%M:%S")
@@ -956,8 +2101,10 @@ while True:
                         f"✅ 완료  ({_start_time_str} → {end_time})",
                         text_color="lime")
             else:
-                window["-LOG-"].update(line + "\n", append=True)
+                batch.append(line)
     except queue.Empty:
         pass
+    if batch:
+        log_view.add(batch)
 
 window.close()
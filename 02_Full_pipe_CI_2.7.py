@@ -9,13 +9,14 @@
 #
 # 전제:
 #   - 01_Dedup_pipe_CI_new.py 실행으로
-#       BASE\Runs\run_...\01_review_dup 또는 01_review_big 생성됨
+#       BASE\Runs\run_...\01_review_dup / 01_review_big / 01_review_join 생성됨
+#     (JOIN 모드는 참조 세트(아카이브) 파일 링크가 이미 mmm 으로 표시됨)
 #   - 각 그룹 폴더에서 "남길 파일"만 mmm...lnk 로 이름 변경
-#   - run_...\run_meta.txt 에 ROOT/BASE/RUN_ID/MODE/TOP_N 기록됨
+#   - run_...\run_meta.txt 에 ROOT/BASE/RUN_ID/MODE/TOP_N 기록됨 (여러 ROOT 실행이면 ROOTS=a;b 추가)
 #
 # 동작 요약:
 #   0) 리뷰 디렉터리 자동 탐색:
-#        01_review_dup → 01_review_big → 01_review 순서로 존재 여부 확인
+#        01_review_dup → 01_review_big → 01_review_join → 01_review 순서로 존재 여부 확인
 #   1) REVIEW STATS / GROUP STATS / DISK CHECK / ROOT STATS 출력
 #        - 총 링크 수, mmm/후보 개수, 실제 존재하는 대상 용량
 #        - remove 시 예상 감소 용량, ROOT 기준 % 감소
@@ -43,6 +44,29 @@
 #          해당 파일이 선택된 Explorer 창 열리는 .lnk 생성
 #
 #   삭제/이동 대상은 "mmm 표시 안 된 링크들의 대상 파일" 뿐이다.
+#
+# 모듈로 사용 (GUI 가 같은 프로세스에서 실행):
+#   rc = run_pipeline(QuarantineOptions(run_dir, sample_n),
+#                     confirm=..., log=..., progress=..., stop=...)
+#   - confirm(통계 텍스트) -> bool : y/N 확인 대체 (기본 콘솔 input)
+#   - log / progress / stop       : 01_Dedup_pipe 의 run_pipeline 과 동일
+#   - 반환값 = CLI 종료 코드 (0 정상/취소, 3 리뷰 폴더 없음, 5 해시 불일치, 6 mmm 문제 …)
+#   - 이동 중 중지 요청 시 finalize_move_log.csv 까지 기록한 뒤 PipelineStopped
+#   - pause (threading.Event) 가 설정된 동안 파일 사이에서 대기
+#
+# 중지 / 이어하기:
+#   - CLI 는 Ctrl+C (Windows Ctrl+Break) → 현재 파일까지 마치고 종료
+#   - 확인(y) 이후 진행 상태를 02_post_review 에 기록
+#       run_state.json      : 완료 단계 (confirmed / copy / verify / move)
+#       copy_progress.jsonl : 복사 끝난 링크 (한 줄 = 1개, 줄마다 flush)
+#       move_progress.jsonl : 이동 끝난 링크
+#     두 파일 모두 작업 전에 목적지 경로(INTENT) 를 먼저 기록 →
+#     복사/이동은 끝났는데 완료 줄을 쓰기 전에 끊긴 경우도 이어하기에서 판별
+#       복사: 목적지가 같은 크기로 있으면 그대로 완료 처리 (name__DUP__1 로 다시 복사하지 않음),
+#             남은 .part 는 삭제
+#       이동: 원본이 없고 04_removed_originals 의 목적지가 있으면 MOVED (MISSING_SRC 아님)
+#   - 같은 RunDir 로 다시 실행하면 통계 재계산 없이 짧은 확인 후
+#     마지막 완료 파일 다음부터 이어서 복사/이동 (remove_candidates.csv 재사용)
 # ============================================================
 
 import os
@@ -51,13 +75,27 @@ import csv
 import shutil
 import random
 import hashlib
+import threading
 from pathlib import Path
+from dataclasses import dataclass
+
+from dedup_progress import (Reporter, PipelineStopped, RunState, RUN_STATE_NAME,
+                            DoneJournal, install_stop_signal)
 
 try:
+    import pythoncom        # pywin32 — 작업 스레드마다 COM 초기화
     import win32com.client  # pywin32
-except ImportError:
-    print("ERROR: pywin32 not installed. Run: python -m pip install pywin32")
-    sys.exit(1)
+except ImportError:  # import 는 허용 (GUI 에서 로드), 실행 시 PYWIN32_MSG 로 중단
+    pythoncom = win32com = None
+
+PYWIN32_MSG = "ERROR: pywin32 not installed. Run: python -m pip install pywin32"
+
+# 출력 대상 — CLI 는 print, run_pipeline() 호출 중에는 호출 측 log/progress/stop
+_rep = Reporter()
+
+
+def say(msg: str = ""):
+    _rep.log(msg)
 
 
 # ---------------- 공통 유틸 ----------------
@@ -89,6 +127,20 @@ def next_free_path(root: Path, name: str) -> Path:
     return candidate
 
 
+def split_journal(journal: "DoneJournal | None", status_field: str):
+    """
+    진행 기록 → (완료 행 목록, {LINK_PATH: 작업 전에 기록한 목적지 경로}).
+    완료 행은 status_field 가 있는 행, 목적지 기록은 {"LINK_PATH", "INTENT"} 행.
+    """
+    if journal is None:
+        return [], {}
+    done = [r for r in journal.rows if status_field in r]
+    finished = {r.get("LINK_PATH") for r in done}
+    intent = {r["LINK_PATH"]: r["INTENT"] for r in journal.rows
+              if r.get("INTENT") and r.get("LINK_PATH") not in finished}
+    return done, intent
+
+
 def human_bytes(n: int) -> str:
     units = ["B", "KB", "MB", "GB", "TB"]
     f = float(n)
@@ -106,24 +158,26 @@ def find_review_root(run_dir: Path) -> Path | None:
     우선순위:
       1) 01_review_dup
       2) 01_review_big
-      3) 01_review  (레거시 호환)
+      3) 01_review_join
+      4) 01_review  (레거시 호환)
     """
-    for name in ("01_review_dup", "01_review_big", "01_review"):
+    for name in ("01_review_dup", "01_review_big", "01_review_join", "01_review"):
         p = run_dir / name
         if p.exists() and p.is_dir():
             return p
     return None
 
 
-def resolve_root_from_meta(run_dir: Path) -> Path | None:
+def resolve_roots_from_meta(run_dir: Path) -> "list[Path]":
     """
-    run_...\run_meta.txt 에서 ROOT=... 라인을 찾아 Path로 리턴.
-    없으면 None.
+    run_...\run_meta.txt 에서 ROOTS=a;b (여러 ROOT 실행) 또는 ROOT=... 라인을 찾아
+    Path 목록으로 리턴. 없으면 빈 목록.
     """
     meta = run_dir / "run_meta.txt"
     if not meta.exists():
-        return None
+        return []
 
+    found = {}
     try:
         for line in meta.read_text(encoding="utf-8").splitlines():
             line = line.strip()
@@ -134,12 +188,14 @@ def resolve_root_from_meta(run_dir: Path) -> Path | None:
             key, val = line.split("=", 1)
             key = key.strip().upper()
             val = val.strip()
-            if key == "ROOT" and val:
-                return Path(val)
+            if key in ("ROOT", "ROOTS") and val:
+                found[key] = val
     except Exception:
-        return None
+        return []
 
-    return None
+    if "ROOTS" in found:
+        return [Path(x) for x in found["ROOTS"].split(";") if x.strip()]
+    return [Path(found["ROOT"])] if "ROOT" in found else []
 
 
 def scan_review_links(review_root: Path) -> dict:
@@ -163,8 +219,10 @@ def scan_review_links(review_root: Path) -> dict:
     bytes_total = 0
     bytes_keep = 0
     bytes_remove = 0
+    meter = _rep.meter("review")
 
     for lnk in review_root.rglob("*.lnk"):
+        meter.update(1)
         total_links += 1
         name = lnk.name
         keep_flag = is_mmm(name)
@@ -197,6 +255,7 @@ def scan_review_links(review_root: Path) -> dict:
             exist_remove += 1
             bytes_remove += sz
 
+    meter.close()
     return {
         "total_links": total_links,
         "mmm_links": mmm_links,
@@ -210,27 +269,33 @@ def scan_review_links(review_root: Path) -> dict:
     }
 
 
-def scan_root_stats(root_path: Path) -> dict | None:
+def scan_root_stats(root_paths: "list[Path]") -> dict | None:
     """
-    ROOT 전체 파일 개수 / 총 용량 계산.
+    ROOT 전체 파일 개수 / 총 용량 계산 (여러 ROOT 실행이면 합산).
     """
-    if not root_path.exists() or not root_path.is_dir():
+    root_paths = [r for r in root_paths if r.exists() and r.is_dir()]
+    if not root_paths:
         return None
 
     total_files = 0
     total_bytes = 0
+    meter = _rep.meter("root")
 
-    for r, _, files in os.walk(str(root_path)):
-        for name in files:
-            p = os.path.join(r, name)
-            try:
-                total_files += 1
-                total_bytes += os.path.getsize(p)
-            except OSError:
-                continue
-
+    for root_path in root_paths:
+        for r, _, files in os.walk(str(root_path)):
+            for name in files:
+                p = os.path.join(r, name)
+                try:
+                    total_files += 1
+                    sz = os.path.getsize(p)
+                except OSError:
+                    continue
+                total_bytes += sz
+                meter.update(1, sz)
+
+    meter.close()
     return {
-        "root_path": str(root_path),
+        "root_path": "; ".join(str(r) for r in root_paths),
         "total_files": total_files,
         "total_bytes": total_bytes,
     }
@@ -254,15 +319,31 @@ def get_disk_usage_for_path(p: Path) -> dict:
     }
 
 
+def confirm_stdin(summary: str) -> bool:
+    """콘솔 y/N 확인 (통계는 이미 출력됨)"""
+    ans = input(
+        "위 정보를 확인했습니다. quarantine 복사 및 원본 이동을 진행할까요? [y/N]: "
+    ).strip().lower()
+    return ans in ("y", "yes", "ㅛ")
+
+
 def print_stats_and_confirm(
     review_stats: dict,
     root_stats: dict | None,
     disk_stats: dict,
+    confirm=None,
 ) -> bool:
     """
     통계 출력 후 사용자에게 y/N 확인.
+    confirm(통계 텍스트) -> bool 을 주면 콘솔 input 대신 사용 (GUI 팝업 등).
     True면 계속 진행, False면 중단.
     """
+    lines = []
+
+    def say(msg: str = ""):
+        lines.append(msg)
+        _rep.log(msg)
+
     total_links = review_stats["total_links"]
     mmm_links = review_stats["mmm_links"]
     non_mmm_links = review_stats["non_mmm_links"]
@@ -275,33 +356,33 @@ def print_stats_and_confirm(
     bytes_remove = review_stats["bytes_remove"]
 
     # REVIEW STATS
-    print()
-    print("[REVIEW STATS]")
-    print(f"  총 리뷰 링크 수               : {total_links:,} 개")
-    print(f"  mmm(보존 체크) 링크 수        : {mmm_links:,} 개")
-    print(f"  미체크(후보) 링크 수          : {non_mmm_links:,} 개")
-    print(
+    say()
+    say("[REVIEW STATS]")
+    say(f"  총 리뷰 링크 수               : {total_links:,} 개")
+    say(f"  mmm(보존 체크) 링크 수        : {mmm_links:,} 개")
+    say(f"  미체크(후보) 링크 수          : {non_mmm_links:,} 개")
+    say(
         f"  실제 존재하는 대상 파일(keep+remove) : {exist_total:,} 개"
         f" ({human_bytes(bytes_total)})"
     )
-    print(
+    say(
         f"    └ 그 중 보존(mmm)          : {exist_keep:,} 개"
         f" ({human_bytes(bytes_keep)})"
     )
-    print(
+    say(
         f"    └ 그 중 remove 후보         : {exist_remove:,} 개"
         f" ({human_bytes(bytes_remove)})"
     )
 
     # GROUP STATS (이번 run이 실제로 다루는 대상 기준)
-    print()
-    print("[GROUP STATS] 이번 run에서 다루는 대상 기준")
-    print(f"  대상 파일 수 (keep+remove)   : {exist_total:,} 개")
-    print(f"  대상 파일 총 용량            : {human_bytes(bytes_total)}")
-    print(f"  리무브 후 예상 남는 용량      : {human_bytes(bytes_keep)}")
+    say()
+    say("[GROUP STATS] 이번 run에서 다루는 대상 기준")
+    say(f"  대상 파일 수 (keep+remove)   : {exist_total:,} 개")
+    say(f"  대상 파일 총 용량            : {human_bytes(bytes_total)}")
+    say(f"  리무브 후 예상 남는 용량      : {human_bytes(bytes_keep)}")
     reduced_bytes = bytes_total - bytes_keep
     reduced_pct = (reduced_bytes / bytes_total * 100.0) if bytes_total > 0 else 0.0
-    print(
+    say(
         f"  예상 용량 감소               : {human_bytes(reduced_bytes)}"
         f" ({reduced_pct:.2f}%)"
     )
@@ -312,22 +393,22 @@ def print_stats_and_confirm(
     free = disk_stats["free"]
 
     free_after_copy = free - bytes_remove
-    print()
-    print("[DISK CHECK] quarantine 복사 예상 용량")
-    print(f"  remove 후보 파일 수          : {exist_remove:,} 개")
-    print(f"  총 예상 복사 용량            : {human_bytes(bytes_remove)}")
-    print(f"  현재 드라이브 총 용량        : {human_bytes(total)}")
-    print(f"  현재 사용 중인 용량          : {human_bytes(used)}")
-    print(f"  현재 남은 여유 공간          : {human_bytes(free)}")
-    print(
+    say()
+    say("[DISK CHECK] quarantine 복사 예상 용량")
+    say(f"  remove 후보 파일 수          : {exist_remove:,} 개")
+    say(f"  총 예상 복사 용량            : {human_bytes(bytes_remove)}")
+    say(f"  현재 드라이브 총 용량        : {human_bytes(total)}")
+    say(f"  현재 사용 중인 용량          : {human_bytes(used)}")
+    say(f"  현재 남은 여유 공간          : {human_bytes(free)}")
+    say(
         f"  [이론상] 복사 후 남을 여유 공간 : {human_bytes(max(0, free_after_copy))}"
     )
 
     # ROOT DATASET STATS (run_meta에서 ROOT가 잡혀 있을 때만)
     if root_stats is None:
-        print()
-        print("[DATASET (ROOT) STATS]")
-        print("  run_meta.txt에서 ROOT 정보를 찾지 못해 전체 통계를 생략합니다.")
+        say()
+        say("[DATASET (ROOT) STATS]")
+        say("  run_meta.txt에서 ROOT 정보를 찾지 못해 전체 통계를 생략합니다.")
     else:
         root_total_bytes = root_stats["total_bytes"]
         root_total_files = root_stats["total_files"]
@@ -337,25 +418,22 @@ def print_stats_and_confirm(
             if root_total_bytes > 0 else 0.0
         )
 
-        print()
-        print("[DATASET (ROOT) STATS]")
-        print(f"  ROOT 경로                    : {root_stats['root_path']}")
-        print(f"  ROOT 전체 파일 수           : {root_total_files:,} 개")
-        print(f"  ROOT 전체 용량              : {human_bytes(root_total_bytes)}")
-        print(f"  이번 run remove 후보 용량   : {human_bytes(bytes_remove)}")
-        print(f"  제거 후 ROOT 예상 용량      : {human_bytes(root_after_bytes)}")
-        print(
+        say()
+        say("[DATASET (ROOT) STATS]")
+        say(f"  ROOT 경로                    : {root_stats['root_path']}")
+        say(f"  ROOT 전체 파일 수           : {root_total_files:,} 개")
+        say(f"  ROOT 전체 용량              : {human_bytes(root_total_bytes)}")
+        say(f"  이번 run remove 후보 용량   : {human_bytes(bytes_remove)}")
+        say(f"  제거 후 ROOT 예상 용량      : {human_bytes(root_after_bytes)}")
+        say(
             f"  ROOT 기준 예상 용량 감소    : {human_bytes(bytes_remove)}"
             f" ({root_reduced_pct:.2f}%)"
         )
 
     # 사용자 확인
-    print()
-    ans = input(
-        "위 정보를 확인했습니다. quarantine 복사 및 원본 이동을 진행할까요? [y/N]: "
-    ).strip().lower()
-    if ans not in ("y", "yes", "ㅛ"):
-        print("사용자 취소: 아무 작업도 수행하지 않습니다.")
+    say()
+    if not (confirm or confirm_stdin)("\n".join(lines).strip("\n")):
+        say("사용자 취소: 아무 작업도 수행하지 않습니다.")
         return False
 
     return True
@@ -415,42 +493,69 @@ def extract_candidates(run_dir: Path, review_root: Path):
         w.writeheader()
         w.writerows(broken)
 
-    print(f"OK: {len(items)} rows -> {remove_csv}")
-    print(f"OK: {len(broken)} broken rows -> {broken_csv}")
+    say(f"OK: {len(items)} rows -> {remove_csv}")
+    say(f"OK: {len(broken)} broken rows -> {broken_csv}")
 
     return items, broken
 
 
 # ---------------- 2단계: quarantine(flat) 빌드 ----------------
 
-def build_quarantine(run_dir: Path, items):
+def build_quarantine(run_dir: Path, items, total_bytes: int = 0,
+                     journal: "DoneJournal | None" = None):
+    """
+    TARGET_EXISTS=True 후보를 03_quarantine 에 flat 복사.
+    journal 이 있으면 복사 전에 목적지, 끝난 뒤 결과를 한 줄씩 기록하고
+    이미 끝난 링크는 건너뜀 (이어하기). 목적지만 기록된 링크는 같은 목적지로 다시 시도.
+    """
     post_review = run_dir / "02_post_review"
     q_root = run_dir / "03_quarantine"
     q_root.mkdir(parents=True, exist_ok=True)
 
-    q_items = []
-    copy_log = []
-
-    for r in items:
-        exists = str(r.get("TARGET_EXISTS", "")).strip().lower() == "true"
-        if not exists:
-            continue
+    q_items, intent = split_journal(journal, "Q_STATUS")
+    done = {q.get("LINK_PATH") for q in q_items}
+    # 이전 실행이 남긴 반쪽 사본 정리 (목적지가 기록된 것만 — 원래 이름이 .part 인 사본은 보존)
+    for dst in intent.values():
+        try:
+            Path(dst + ".part").unlink()
+        except OSError:
+            pass
+    todo = [
+        r for r in items
+        if str(r.get("TARGET_EXISTS", "")).strip().lower() == "true"
+        and r.get("LINK_PATH") not in done
+    ]
+    if q_items:
+        say(f"RESUME: 이전 실행에서 복사 완료 {len(q_items)}개 건너뜀")
+    meter = _rep.meter("copy", len(todo), 0 if q_items else total_bytes)
 
+    for r in todo:
         src = r.get("TARGET_PATH", "")
-        sha_group = r.get("SHA_GROUP", "UNKNOWN")
-        link_name = r.get("LINK_NAME", "UNKNOWN.lnk")  # 로그용으로만 사용
 
+        sz = 0
         if not src:
             status = "FAILED:NO_SRC"
             dst_path = q_root / "NO_SRC"
         else:
             src_path = Path(src)
-            base_name = src_path.name
-            dst_path = next_free_path(q_root, base_name)
+            lp = r.get("LINK_PATH", "")
+            if lp in intent:
+                dst_path = Path(intent[lp])
+            else:
+                dst_path = next_free_path(q_root, src_path.name)
+                if journal is not None:
+                    journal.add({"LINK_PATH": lp, "INTENT": str(dst_path)})
 
+            # .part 로 복사 후 이름 변경 → 중간에 끊겨도 반쪽 사본이 최종 이름으로 남지 않음
+            part_path = dst_path.with_name(dst_path.name + ".part")
             status = "COPIED"
             try:
-                shutil.copy2(src_path, dst_path)
+                sz = src_path.stat().st_size
+                if lp in intent and dst_path.is_file() and dst_path.stat().st_size == sz:
+                    pass   # 이름 변경 후 완료 기록 전에 끊김 — 이미 끝난 사본
+                else:
+                    shutil.copy2(src_path, part_path)
+                    os.replace(part_path, dst_path)
             except Exception as e:
                 status = f"FAILED:{type(e).__name__}"
 
@@ -458,15 +563,20 @@ def build_quarantine(run_dir: Path, items):
         q_row["Q_PATH"] = str(dst_path)
         q_row["Q_STATUS"] = status
         q_items.append(q_row)
-
-        copy_log.append(
-            {
-                "SHA_GROUP": sha_group,
-                "SRC": src,
-                "DST": str(dst_path),
-                "STATUS": status,
-            }
-        )
+        if journal is not None:
+            journal.add(q_row)
+        meter.update(1, sz)
+
+    meter.close()
+    copy_log = [
+        {
+            "SHA_GROUP": q.get("SHA_GROUP", "UNKNOWN"),
+            "SRC": q.get("TARGET_PATH", ""),
+            "DST": q.get("Q_PATH", ""),
+            "STATUS": q.get("Q_STATUS", ""),
+        }
+        for q in q_items
+    ]
 
     q_csv = post_review / "quarantine_candidates.csv"
     q_fields = [
@@ -492,8 +602,8 @@ def build_quarantine(run_dir: Path, items):
 
     copied = sum(1 for r in copy_log if r["STATUS"] == "COPIED")
     failed = sum(1 for r in copy_log if r["STATUS"].startswith("FAILED"))
-    print(f"OK: COPIED={copied} FAILED={failed} -> {log_csv}")
-    print(f"OK: {len(q_items)} rows -> {q_csv}")
+    say(f"OK: COPIED={copied} FAILED={failed} -> {log_csv}")
+    say(f"OK: {len(q_items)} rows -> {q_csv}")
 
     return q_items
 
@@ -512,18 +622,20 @@ def verify_hash_sample(q_items, sample_n: int) -> bool:
     ]
 
     if not q_items:
-        print("WARN: no quarantine candidates. Nothing to verify.")
+        say("WARN: no quarantine candidates. Nothing to verify.")
         return True
 
     if not valid:
-        print("ABORT: no valid (SRC, DST) pairs for hash check.")
+        say("ABORT: no valid (SRC, DST) pairs for hash check.")
         return False
 
     sample_count = min(sample_n, len(valid))
     sample_rows = random.sample(valid, sample_count)
     bad = 0
+    meter = _rep.meter("verify", sample_count)
 
     for r in sample_rows:
+        meter.update(1)
         src_path = Path(r["TARGET_PATH"])
         dst_path = Path(r["Q_PATH"])
 
@@ -537,75 +649,109 @@ def verify_hash_sample(q_items, sample_n: int) -> bool:
         if h1 != h2:
             bad += 1
 
+    meter.close()
     if bad != 0:
-        print(
+        say(
             f"ABORT: hash sample mismatch or errors. "
             f"BAD={bad} / SAMPLE={sample_count}"
         )
         return False
 
-    print(f"OK: hash sample verified. SAMPLE={sample_count}")
+    say(f"OK: hash sample verified. SAMPLE={sample_count}")
     return True
 
 
 # ---------------- 4단계: 원본 이동(평탄화) ----------------
 
-def move_originals(run_dir: Path, q_items):
+def move_originals(run_dir: Path, q_items, journal: "DoneJournal | None" = None):
+    """
+    quarantine 대상 원본을 04_removed_originals 로 flat 이동.
+    journal 이 있으면 이동 전에 목적지, 끝난 뒤 결과를 한 줄씩 기록하고
+    이미 끝난 링크는 건너뜀 (이어하기). 목적지만 기록된 링크는 그 목적지와 대조.
+    """
     post_review = run_dir / "02_post_review"
     removed_root = run_dir / "04_removed_originals"
     removed_root.mkdir(parents=True, exist_ok=True)
 
-    log_rows = []
-    moved = 0
-    failed = 0
-    missing = 0
+    log_rows, intent = split_journal(journal, "STATUS")
+    done = {r.get("LINK_PATH") for r in log_rows}
+    todo = [r for r in q_items if r.get("LINK_PATH") not in done]
+    if log_rows:
+        say(f"RESUME: 이전 실행에서 이동 완료 {len(log_rows)}개 건너뜀")
+    meter = _rep.meter("move", len(todo))
+    stopped = None
 
-    for r in q_items:
+    for r in todo:
         src = r.get("TARGET_PATH", "")
         sha_group = r.get("SHA_GROUP", "")
 
         if not src:
             status = "MISSING_SRC"
             dst = ""
-            missing += 1
         else:
             src_path = Path(src)
-            if not src_path.exists():
+            lp = r.get("LINK_PATH", "")
+            intended = Path(intent[lp]) if lp in intent else None
+            if not src_path.exists() and intended is not None and intended.exists():
+                status = "MOVED"     # 이동 후 완료 기록 전에 끊김
+                dst = str(intended)
+            elif not src_path.exists():
                 status = "MISSING_SRC"
                 dst = ""
-                missing += 1
             else:
-                dst_path = next_free_path(removed_root, src_path.name)
+                if intended is not None:
+                    # 원본이 남아 있음 = 다른 드라이브로 복사 도중 끊김 → 반쪽 사본 지우고 다시
+                    dst_path = intended
+                    try:
+                        dst_path.unlink()
+                    except OSError:
+                        pass
+                else:
+                    dst_path = next_free_path(removed_root, src_path.name)
+                    if journal is not None:
+                        journal.add({"LINK_PATH": lp, "INTENT": str(dst_path)})
                 try:
                     shutil.move(str(src_path), str(dst_path))
                     status = "MOVED"
                     dst = str(dst_path)
-                    moved += 1
                 except Exception as e:
                     status = f"FAILED:{type(e).__name__}"
                     dst = ""
-                    failed += 1
-
-        log_rows.append(
-            {
-                "SHA_GROUP": sha_group,
-                "SRC": src,
-                "DST": dst,
-                "STATUS": status,
-            }
-        )
+
+        row = {
+            "SHA_GROUP": sha_group,
+            "SRC": src,
+            "DST": dst,
+            "STATUS": status,
+        }
+        log_rows.append(row)
+        if journal is not None:
+            journal.add({**row, "LINK_PATH": r.get("LINK_PATH", "")})
+        try:
+            meter.update(1)
+        except PipelineStopped as e:   # 이동 로그는 반드시 남기고 중단
+            stopped = e
+            break
+
+    moved = sum(1 for r in log_rows if r["STATUS"] == "MOVED")
+    failed = sum(1 for r in log_rows if r["STATUS"].startswith("FAILED"))
+    missing = sum(1 for r in log_rows if r["STATUS"] == "MISSING_SRC")
 
     log_csv = post_review / "finalize_move_log.csv"
     log_fields = ["SHA_GROUP", "SRC", "DST", "STATUS"]
     with log_csv.open("w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=log_fields)
+        w = csv.DictWriter(f, fieldnames=log_fields, extrasaction="ignore")
         w.writeheader()
         w.writerows(log_rows)
 
-    print(
+    say(
         f"OK: MOVED={moved} FAILED={failed} MISSING_SRC={missing} -> {log_csv}"
     )
-    print(f"REMOVED_DIR: {removed_root}")
+    say(f"REMOVED_DIR: {removed_root}")
+    if stopped is not None:
+        say(f"WARN: 중지 요청으로 이동 중단 — 남은 {len(q_items) - len(log_rows)}개는 이동하지 않음")
+        raise stopped
+    meter.close()
 
 
 # ---------------- 5+6단계: mmm KEEP 검증 + confirm 폴더 생성 ----------------
@@ -673,9 +819,9 @@ def check_mmm_integrity_and_build_confirm(run_dir: Path, review_root: Path):
         w.writeheader()
         w.writerows(problem_rows)
 
-    print(f"MMM KEEP CHECK: OK={len(ok_rows)} PROBLEM={len(problem_rows)}")
-    print(f"  OK CSV     : {ok_csv}")
-    print(f"  PROBLEM CSV: {prob_csv}")
+    say(f"MMM KEEP CHECK: OK={len(ok_rows)} PROBLEM={len(problem_rows)}")
+    say(f"  OK CSV     : {ok_csv}")
+    say(f"  PROBLEM CSV: {prob_csv}")
 
     # 05_confirm_keep: Explorer /select 링크 생성
     created_links = 0
@@ -713,14 +859,149 @@ def check_mmm_integrity_and_build_confirm(run_dir: Path, review_root: Path):
         except Exception:
             continue
 
-    print(f"CONFIRM KEEP LINKS: {created_links} -> {confirm_root}")
+    say(f"CONFIRM KEEP LINKS: {created_links} -> {confirm_root}")
 
     return len(ok_rows), len(problem_rows)
 
 
+# ---------------- 엔진 API ----------------
+
+@dataclass
+class QuarantineOptions:
+    run_dir: Path
+    sample_n: int = 10      # 해시 샘플 검증 개수
+
+
+def _read_candidates(post_review: Path) -> list:
+    """이어하기용: 이전 실행이 기록한 remove_candidates.csv 를 그대로 다시 읽음"""
+    with (post_review / "remove_candidates.csv").open("r", encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def run_pipeline(opts: QuarantineOptions, confirm=None,
+                 log=None, progress=None, stop=None, pause=None) -> int:
+    """
+    리뷰 결과 → quarantine 복사 → 샘플 검증 → 원본 이동 → mmm 검증.
+    반환값은 CLI 종료 코드와 같음. pywin32 가 없으면 RuntimeError.
+    확인 후 중단된 RunDir 이면 마지막 완료 파일 다음부터 이어서 진행.
+    호출 스레드에서 COM 을 초기화/해제 (GUI 는 실행마다 새 작업 스레드 — import 시의
+    초기화는 처음 import 한 스레드에만 적용됨).
+    """
+    if win32com is None:
+        raise RuntimeError(PYWIN32_MSG)
+
+    global _rep
+    prev, _rep = _rep, Reporter(log, progress, stop, pause)
+    journals = []
+    pythoncom.CoInitialize()
+    try:
+        run_dir = Path(opts.run_dir).resolve()
+        review_root = find_review_root(run_dir)
+        if review_root is None:
+            say("ERROR: 리뷰 폴더를 찾지 못했습니다. (01_review_dup / 01_review_big / 01_review 없음)")
+            return 3
+
+        say(f"RUN_DIR   : {run_dir}")
+        say(f"REVIEW_DIR: {review_root}")
+
+        post_review = run_dir / "02_post_review"
+        key = {"run_dir": str(run_dir)}
+        state = RunState.load(post_review / RUN_STATE_NAME, key)
+        resuming = (state is not None and state.done("confirmed")
+                    and (post_review / "remove_candidates.csv").exists())
+
+        if resuming:
+            # 이미 확인(y) 후 중단된 실행 — 후보 목록 재사용, 통계 재계산 없이 짧은 확인
+            items = _read_candidates(post_review)
+            lines = [
+                "[RESUME] 확인 후 중단된 실행이 있습니다.",
+                f"  완료 단계          : {', '.join(state.stages)}",
+                f"  remove 후보        : {len(items):,} 개",
+            ]
+            for line in lines:
+                say(line)
+            if not (confirm or confirm_stdin)("\n".join(lines)):
+                say("사용자 취소: 아무 작업도 수행하지 않습니다.")
+                return 0
+            bytes_remove = 0
+        else:
+            state = RunState(post_review / RUN_STATE_NAME, key)
+
+            # 리뷰 전체 통계
+            review_stats = scan_review_links(review_root)
+
+            # 삭제/이동 후보 목록 추출
+            items, broken = extract_candidates(run_dir, review_root)
+            if not any(r.get("TARGET_EXISTS", "").strip().lower() == "true" for r in items):
+                say("OK: 삭제/이동 가능한 대상이 없습니다. (존재하는 TARGET_PATH 없음)")
+                return 0
+
+            # 디스크 사용량: remove 후보 중 첫 번째 실제 대상 기준 드라이브
+            disk_path = None
+            for r in items:
+                if r.get("TARGET_EXISTS", "").strip().lower() == "true":
+                    tp = r.get("TARGET_PATH", "")
+                    if tp:
+                        disk_path = Path(tp)
+                        break
+
+            if disk_path is None:
+                say("ERROR: 디스크 사용량을 계산할 대상 경로를 찾지 못했습니다.")
+                return 4
+
+            disk_stats = get_disk_usage_for_path(disk_path)
+
+            # ROOT 통계: run_meta.txt에서 ROOT 찾기
+            root_stats = scan_root_stats(resolve_roots_from_meta(run_dir))
+
+            # 통계 출력 + 사용자 확인
+            if not print_stats_and_confirm(review_stats, root_stats, disk_stats, confirm):
+                return 0
+            state.mark("confirmed")
+            bytes_remove = review_stats["bytes_remove"]
+
+        # 실제 작업 시작 (새 실행이면 이전 진행 기록은 비움)
+        copy_journal = DoneJournal(post_review / "copy_progress.jsonl", reset=not resuming)
+        move_journal = DoneJournal(post_review / "move_progress.jsonl", reset=not resuming)
+        journals = [copy_journal, move_journal]
+
+        q_items = build_quarantine(run_dir, items, bytes_remove, copy_journal)
+        state.mark("copy")
+
+        if state.done("verify"):
+            say("RESUME: 해시 샘플 검증은 이전 실행에서 통과 — 건너뜀")
+        else:
+            if not verify_hash_sample(q_items, opts.sample_n):
+                return 5
+            state.mark("verify")
+
+        move_originals(run_dir, q_items, move_journal)
+        state.mark("move")
+
+        ok_cnt, bad_cnt = check_mmm_integrity_and_build_confirm(run_dir, review_root)
+        state.finish()
+        if bad_cnt > 0:
+            say("WARN: 일부 mmm keep 타깃이 누락되었거나 04_removed_originals 안에 들어갔습니다.")
+            say("      mmm_check_problem.csv를 확인하세요.")
+            return 6
+        return 0
+    except PipelineStopped:
+        say("STOP: 중단됨 — 같은 RunDir 로 다시 실행하면 마지막 완료 파일 다음부터 이어서 진행합니다.")
+        raise
+    finally:
+        for j in journals:
+            j.close()
+        pythoncom.CoUninitialize()
+        _rep = prev
+
+
 # ---------------- main ----------------
 
 def main():
+    if win32com is None:
+        print(PYWIN32_MSG)
+        sys.exit(1)
+
     if len(sys.argv) < 2 or len(sys.argv) > 3:
         script = Path(sys.argv[0]).name
         print(
@@ -742,59 +1023,13 @@ def main():
         except ValueError:
             print(f"WARN: invalid SampleN '{sys.argv[2]}', fallback to 10")
 
-    review_root = find_review_root(run_dir)
-    if review_root is None:
-        print("ERROR: 리뷰 폴더를 찾지 못했습니다. (01_review_dup / 01_review_big / 01_review 없음)")
-        sys.exit(3)
-
-    print(f"RUN_DIR   : {run_dir}")
-    print(f"REVIEW_DIR: {review_root}")
-
-    # 리뷰 전체 통계
-    review_stats = scan_review_links(review_root)
-
-    # 삭제/이동 후보 목록 추출
-    items, broken = extract_candidates(run_dir, review_root)
-    if not any(r.get("TARGET_EXISTS", "").strip().lower() == "true" for r in items):
-        print("OK: 삭제/이동 가능한 대상이 없습니다. (존재하는 TARGET_PATH 없음)")
-        sys.exit(0)
-
-    # 디스크 사용량: remove 후보 중 첫 번째 실제 대상 기준 드라이브
-    disk_path = None
-    for r in items:
-        if r.get("TARGET_EXISTS", "").strip().lower() == "true":
-            tp = r.get("TARGET_PATH", "")
-            if tp:
-                disk_path = Path(tp)
-                break
-
-    if disk_path is None:
-        print("ERROR: 디스크 사용량을 계산할 대상 경로를 찾지 못했습니다.")
-        sys.exit(4)
-
-    disk_stats = get_disk_usage_for_path(disk_path)
-
-    # ROOT 통계: run_meta.txt에서 ROOT 찾기
-    root_path = resolve_root_from_meta(run_dir)
-    root_stats = scan_root_stats(root_path) if root_path is not None else None
-
-    # 통계 출력 + 사용자 확인
-    if not print_stats_and_confirm(review_stats, root_stats, disk_stats):
-        sys.exit(0)
-
-    # 실제 작업 시작
-    q_items = build_quarantine(run_dir, items)
-
-    if not verify_hash_sample(q_items, sample_n):
-        sys.exit(5)
-
-    move_originals(run_dir, q_items)
-
-    ok_cnt, bad_cnt = check_mmm_integrity_and_build_confirm(run_dir, review_root)
-    if bad_cnt > 0:
-        print("WARN: 일부 mmm keep 타깃이 누락되었거나 04_removed_originals 안에 들어갔습니다.")
-        print("      mmm_check_problem.csv를 확인하세요.")
-        sys.exit(6)
+    stop = threading.Event()
+    install_stop_signal(stop)
+    try:
+        rc = run_pipeline(QuarantineOptions(run_dir, sample_n), stop=stop)
+    except PipelineStopped:
+        rc = 130
+    sys.exit(rc)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,484 @@
+# ============================================================
+# dedup_catalog.py
+# ============================================================
+# ROOT 별 파일 해시 카탈로그 — GUI 폴더 스캔과 CLI(01_Dedup_pipe) 가 공유.
+#
+#   위치: <로컬 캐시 폴더>/_ckpt_<PC명>_<ROOT md5 8자리>.jsonl
+#         (+ BASE 폴더에 같은 이름의 백업)
+#   형식: 추가 전용 JSON Lines, 같은 key 는 뒤 줄이 우선
+#     [key, fp_hex, 크기, mtime_ns]                          GUI 폴더 스캔 (앞뒤 64KB 지문)
+#     [key, fp_hex, 크기, mtime_ns, {"b3": .., "sha256": ..}] CLI 전체 읽기 (지문 + 전체 해시)
+#     [key, null, 사유]                                      무효화 기록 (tombstone)
+#   key : os.path.join(폴더, 파일명).lower()
+#         (원래 경로와 다르면 전체 해시 dict 에 "path" 로 원래 경로도 기록 —
+#          감시 데몬 카탈로그로 바로 리포트를 만들 때 사용)
+#
+# CLI 는 blake3/sha256 를 계산하며 파일을 끝까지 읽을 때 앞뒤 64KB 지문도
+# 함께 만들어 기록 → 같은 ROOT 를 GUI 로 스캔하면 그 파일은 다시 읽지 않음.
+# 반대로 CLI 는 크기·mtime 이 같은 카탈로그 항목의 전체 해시를 재사용.
+#
+# 폴더 목록 캐시 (<카탈로그>.dirs.jsonl, DirIndex):
+#   폴더 mtime·항목 수·이름 목록 — mtime 이 그대로인 폴더는 다시 나열하지 않음.
+#   GUI 폴더 스캔 Step1 과 CLI 파일 순회가 같은 walk_with_stat() 사용.
+#
+# 호스트 간 색인 (index_<PC명>_<실행ID>.jsonl.gz, write_export / read_export):
+#   PC 마다 경로·크기·mtime·해시를 내보내고, 한 PC 에서 여러 파일을 병합해 중복 그룹 산출.
+# ============================================================
+
+import os
+import sys
+import gzip
+import json
+import time
+import socket
+import hashlib
+from pathlib import Path
+
+HOSTNAME = socket.gethostname().upper()[:10]
+FP_CHUNK = 64 * 1024   # 지문에 쓰는 앞/뒤 구간 크기
+DIR_MTIME_SLACK_NS = 2 * 10**9   # 이보다 최근에 바뀐 폴더는 목록을 캐시하지 않음 (같은 mtime 안의 추가 변경 대비)
+
+
+def sha1_new():
+    """Python 3.8 이하 호환 SHA1 생성"""
+    try:
+        return hashlib.sha1(usedforsecurity=False)
+    except TypeError:
+        return hashlib.sha1()
+
+
+def fingerprint_digest(size: int, head: bytes, tail: "bytes | None") -> bytes:
+    """파일크기 + 앞 64KB (+ 크기가 128KB 초과면 뒤 64KB) → SHA1 digest"""
+    h = sha1_new()
+    h.update(size.to_bytes(8, "little"))
+    h.update(head)
+    if size > FP_CHUNK * 2 and tail is not None:
+        h.update(tail)
+    return h.digest()
+
+
+def fast_fingerprint(fp: Path):
+    """
+    파일 앞 64KB + 뒤 64KB + 파일크기 → SHA1
+    반환: (20바이트 digest, size_bytes) 또는 (None, error_str)
+    """
+    return fast_fingerprint_stat(fp)[:2]
+
+
+def fast_fingerprint_stat(fp: Path):
+    """fast_fingerprint + 읽을 때 본 mtime_ns → (digest, size_bytes, mtime_ns) 또는 (None, error_str, None)"""
+    try:
+        st = fp.stat()
+        sz = st.st_size
+        with open(fp, "rb") as f:
+            head = f.read(FP_CHUNK)
+            tail = None
+            if sz > FP_CHUNK * 2:
+                f.seek(-FP_CHUNK, 2)
+                tail = f.read(FP_CHUNK)
+        return fingerprint_digest(sz, head, tail), sz, st.st_mtime_ns
+    except PermissionError as e:
+        return None, f"PermissionError({e.errno})", None
+    except OSError as e:
+        return None, f"OSError({e.errno}): {e.strerror}", None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", None
+
+
+# ---------------- 위치 ----------------
+
+def catalog_dir(script_dir: Path) -> Path:
+    """쓰기 가능한 로컬 캐시 폴더 (LOCALAPPDATA → C:/Temp → C:/ → 스크립트 폴더)"""
+    candidates = []
+    if sys.platform == "win32":
+        local_app = os.environ.get("LOCALAPPDATA", "")
+        if local_app:
+            candidates.append(Path(local_app) / "MecDBDedup")
+        candidates.append(Path("C:/Temp/MecDBDedup"))
+        candidates.append(Path("C:/MecDBDedup"))
+    candidates.append(script_dir / "_ckpt_cache")
+    for c in candidates:
+        try:
+            c.mkdir(parents=True, exist_ok=True)
+            test = c / ".write_test"
+            test.write_text("ok")
+            test.unlink()
+            return c
+        except Exception:
+            continue
+    return script_dir
+
+
+def catalog_name(root: Path) -> str:
+    """ROOT 별 카탈로그 파일명 (PC명 + ROOT 경로 md5 앞 8자리)"""
+    root_hash = hashlib.md5(str(root).lower().encode()).hexdigest()[:8]
+    return f"_ckpt_{HOSTNAME}_{root_hash}.jsonl"
+
+
+def dirs_path(catalog_path: Path) -> Path:
+    """카탈로그 옆 폴더 목록 캐시 파일"""
+    return catalog_path.with_name(catalog_path.stem + ".dirs.jsonl")
+
+
+# ---------------- 로그 형식 ----------------
+
+def entry_line(key: str, digest: bytes, sz: int, mtime_ns: "int | None",
+               extra: "dict | None" = None) -> str:
+    rec = [key, digest.hex(), sz, mtime_ns]
+    if extra:
+        rec.append(extra)
+    return json.dumps(rec) + "\n"
+
+
+def evict_line(key: str, reason: str) -> str:
+    """무효화 기록 (tombstone) — [key, null, 사유]. 재생 시 해당 key 제거"""
+    return json.dumps([key, None, reason]) + "\n"
+
+
+def replay(path: Path) -> "tuple[dict, int, bool]":
+    """
+    .jsonl 로그 재생 → (index, 로그 줄 수, 마지막 줄 잘림 여부).
+    index: {key: (digest, 크기, mtime_ns | None, 전체해시 dict | None)}
+    비정상 종료로 잘린 줄 등 파싱 불가 줄은 건너뜀
+    (잘린 채로 append 하면 다음 줄까지 깨지므로 호출 측에서 압축해 정리).
+    v2.4 초기 3필드 줄은 mtime=None.
+    """
+    index: dict = {}
+    n_lines = 0
+    torn = False
+    if not path.exists():
+        return index, 0, False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                n_lines += 1
+                torn = not line.endswith("\n")
+                try:
+                    rec = json.loads(line)
+                    k, hx = rec[0], rec[1]
+                    if hx is None:
+                        index.pop(k, None)
+                        continue
+                    mt    = rec[3] if len(rec) > 3 else None
+                    extra = rec[4] if len(rec) > 4 and isinstance(rec[4], dict) else None
+                    index[k] = (bytes.fromhex(hx), int(rec[2]),
+                                None if mt is None else int(mt), extra)
+                except (ValueError, TypeError, IndexError):
+                    continue
+    except OSError:
+        pass
+    return index, n_lines, torn
+
+
+def write_snapshot(path: Path, index: dict) -> bool:
+    """살아있는 항목만으로 로그를 다시 씀 (tmp → replace, 원자적 교체)"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for k, (h, sz, mt, extra) in index.items():
+                f.write(entry_line(k, h, sz, mt, extra))
+        tmp.replace(path)
+        return True
+    except Exception:
+        return False
+
+
+def append_lines(path: Path, lines: "list[str]"):
+    """줄 묶음을 한 번에 append (예외는 호출 측에서 처리)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+# ---------------- CLI 용 ----------------
+
+class HashCatalog:
+    """
+    CLI 파이프라인용 카탈로그 (단일 스레드).
+      get()   : 크기·mtime 이 일치하고 전체 해시가 있는 항목만 반환
+      put()   : 새 항목을 버퍼에 쌓고 flush_every 개마다 로컬 + 백업에 append
+      evict() : 사라진 파일의 무효화 기록 (dedup_watch)
+      flush() : 남은 항목 기록
+    기록 실패는 warn(메시지) 로 1회만 알림.
+    read_only=True : 감시 데몬이 같은 파일에 기록 중일 때 — put / evict 는 메모리 색인만 갱신,
+                     파일에는 아무것도 쓰지 않음 (load 의 정리/복원도 생략)
+    """
+
+    def __init__(self, local: Path, backup: "Path | None" = None,
+                 flush_every: int = 500, warn=None, read_only: bool = False):
+        self.local  = local
+        self.backup = backup
+        self.flush_every = flush_every
+        self.warn   = warn
+        self.read_only = read_only
+        self.index: dict = {}
+        self.hits  = 0
+        self._buf: "list[str]" = []
+        self._warned = False
+
+    def load(self, rewrite: bool = True) -> int:
+        """
+        rewrite=False : 감시 데몬이 같은 파일에 기록 중일 때 — 읽기만 하고 정리/복원 생략
+        (잘린 마지막 줄은 데몬이 쓰는 중인 줄)
+        """
+        self.index, _, torn = replay(self.local)
+        if not rewrite or self.read_only:
+            return len(self.index)
+        if torn:
+            write_snapshot(self.local, self.index)   # 잘린 줄 뒤에 이어 쓰지 않도록 정리
+        if not self.index and self.backup is not None:
+            self.index, _, _ = replay(self.backup)
+            if self.index:
+                write_snapshot(self.local, self.index)
+        return len(self.index)
+
+    @property
+    def buffered(self) -> int:
+        """아직 기록하지 않은 줄 수"""
+        return len(self._buf)
+
+    def get(self, key: str, sz: int, mtime_ns: int) -> "dict | None":
+        ent = self.index.get(key)
+        if ent is None or ent[1] != sz or ent[2] != mtime_ns or not ent[3]:
+            return None
+        self.hits += 1
+        return ent[3]
+
+    def put(self, key: str, digest: bytes, sz: int, mtime_ns: int, extra: dict):
+        self.index[key] = (digest, sz, mtime_ns, extra)
+        if self.read_only:
+            return
+        self._buf.append(entry_line(key, digest, sz, mtime_ns, extra))
+        if len(self._buf) >= self.flush_every:
+            self.flush()
+
+    def evict(self, key: str, reason: str):
+        self.index.pop(key, None)
+        if self.read_only:
+            return
+        self._buf.append(evict_line(key, reason))
+        if len(self._buf) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buf:
+            return
+        lines, self._buf = self._buf, []
+        for path in (self.local, self.backup):
+            if path is None:
+                continue
+            try:
+                append_lines(path, lines)
+            except Exception as e:
+                if not self._warned and self.warn is not None:
+                    self._warned = True
+                    self.warn(f"[WARN] 카탈로그 기록 실패: {path} ({type(e).__name__}: {e})")
+
+
+# ---------------- 폴더 목록 캐시 / 순회 ----------------
+
+class DirIndex:
+    """
+    폴더 목록 캐시 — 한 줄 = [key, mtime_ns, 항목 수, [[파일명, 크기, mtime_ns]…], [하위폴더명…]].
+    폴더 mtime 은 항목 추가·삭제·이름 변경 때만 바뀜 → mtime 과 항목 수가 기록과 같으면
+    목록 조회·파일 stat 없이 저장된 이름과 크기를 재사용 (get).
+    파일 내용만 바뀐 경우는 폴더 mtime 에 드러나지 않으므로 기록된 크기·mtime 은 낡을 수 있음
+    → 호출 측이 해시 후보만 다시 stat 해서 카탈로그 항목과 대조 (CLI 해시 단계).
+    save() 는 바뀐 것이 있을 때만 통째로 다시 씀 (tmp → replace).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.dirs: dict = {}
+        self.reused = 0      # 목록 재사용한 폴더 수
+        self.listed = 0      # 다시 나열한 폴더 수
+        self._gone: "list[str]" = []
+        self._dirty = False
+
+    def load(self) -> int:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        k, mt, n, files, subs = json.loads(line)
+                        # 구버전 기록(파일명만) 은 버림 → 그 폴더는 한 번 다시 나열
+                        files = [(name, int(sz), int(fmt)) for name, sz, fmt in files]
+                        if n == len(files) + len(subs):
+                            self.dirs[k] = (int(mt), n, files, subs)
+                    except (ValueError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return len(self.dirs)
+
+    def get(self, d: str, mtime_ns: int) -> "tuple[list, list] | None":
+        """(하위폴더명, [(파일명, 크기, mtime_ns)]) — 기록이 없거나 mtime 이 다르면 None"""
+        rec = self.dirs.get(d.lower())
+        if rec is None or rec[0] != mtime_ns:
+            return None
+        self.reused += 1
+        return rec[3], rec[2]
+
+    def put(self, d: str, mtime_ns: int, subs: "list[str]", files: "list[tuple[str, int, int]]"):
+        self.listed += 1
+        key = d.lower()
+        old = self.dirs.get(key)
+        if old is not None:
+            gone = set(old[3]) - set(subs)
+            self._gone.extend(os.path.join(key, x.lower()) for x in gone)
+        newest = max([mtime_ns] + [f[2] for f in files])
+        if time.time_ns() - newest < DIR_MTIME_SLACK_NS or any(f[1] < 0 for f in files):
+            # 방금 바뀐 폴더·파일 (쓰는 중일 수 있음) 또는 stat 실패 — 다음 실행에서 다시 나열
+            self.dirs.pop(key, None)
+        else:
+            self.dirs[key] = (mtime_ns, len(files) + len(subs), files, subs)
+        self._dirty = True
+
+    def refresh(self, d: str, name: str, sz: int, mtime_ns: int):
+        """
+        재사용한 기록의 파일 1개를 실제 크기·mtime 으로 고침 (호출 측이 다시 stat 한 후보).
+        방금 바뀐 파일이면 그 폴더 기록을 버려 다음 실행에서 다시 나열.
+        """
+        key = d.lower()
+        rec = self.dirs.get(key)
+        if rec is None:
+            return
+        if time.time_ns() - mtime_ns < DIR_MTIME_SLACK_NS:
+            self.dirs.pop(key, None)
+        else:
+            files = [(n, sz, mtime_ns) if n == name else (n, s, m) for n, s, m in rec[2]]
+            self.dirs[key] = (rec[0], rec[1], files, rec[3])
+        self._dirty = True
+
+    def save(self) -> bool:
+        if not self._dirty:
+            return True
+        if self._gone:
+            gone = tuple(self._gone) + tuple(os.path.join(g, "") for g in self._gone)
+            self.dirs = {k: v for k, v in self.dirs.items()
+                         if not (k in self._gone or k.startswith(gone))}
+            self._gone = []
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for k, (mt, n, files, subs) in self.dirs.items():
+                    f.write(json.dumps([k, mt, n, files, subs], ensure_ascii=False) + "\n")
+            tmp.replace(self.path)
+            self._dirty = False
+            return True
+        except OSError:
+            return False
+
+
+def walk_with_stat(top: str, dindex: "DirIndex | None" = None):
+    """
+    os.walk(topdown=True) 와 같은 전위 순서로 (경로, 깊이, 하위폴더명, 파일목록) 반환.
+    파일목록은 [(파일명, 크기, mtime_ns)] — os.scandir 의 DirEntry.stat() 사용
+    (Windows 에서는 목록 조회 결과에 포함되어 추가 시스템 호출 없음).
+    호출 측이 하위폴더명 리스트를 제자리 수정하면 os.walk 처럼 탐색 대상이 줄어듦.
+    접근 불가 폴더는 조용히 건너뛰고, stat 실패 파일은 크기 -1 로 넘김.
+    폴더 심볼릭 링크는 따라가지 않음.
+    dindex 가 있으면 mtime 이 기록과 같은 폴더는 나열하지 않고 저장된 이름·크기·mtime 을
+    재사용 (파일 stat 도 생략), 나열한 폴더는 dindex 에 기록.
+    """
+    stack = [(top, 0)]
+    while stack:
+        cur, depth = stack.pop()
+        cached = None
+        if dindex is not None:
+            try:
+                mt = os.stat(cur).st_mtime_ns
+            except OSError:
+                continue
+            cached = dindex.get(cur, mt)
+        if cached is not None:
+            dirs  = list(cached[0])
+            files = list(cached[1])
+        else:
+            dirs  = []
+            files = []
+            try:
+                with os.scandir(cur) as it:
+                    for e in it:
+                        try:
+                            if e.is_dir(follow_symlinks=False):
+                                dirs.append(e.name)
+                                continue
+                            if e.is_dir():
+                                continue   # 폴더 링크 — os.walk(followlinks=False) 와 동일하게 제외
+                        except OSError:
+                            pass
+                        try:
+                            st = e.stat()
+                            files.append((e.name, st.st_size, st.st_mtime_ns))
+                        except OSError:
+                            files.append((e.name, -1, -1))
+            except OSError:
+                continue   # PermissionError 등 조용히 무시
+            if dindex is not None:
+                dindex.put(cur, mt, list(dirs), list(files))
+        yield cur, depth, dirs, files
+        # 역순으로 쌓아야 첫 번째 하위폴더부터 꺼냄 → os.walk 와 같은 전위 순서
+        for name in reversed(dirs):
+            stack.append((os.path.join(cur, name), depth + 1))
+
+
+# ---------------- 호스트 간 색인 내보내기 / 병합 ----------------
+#
+# 다른 PC 에 연결된 드라이브끼리 비교할 때 디스크 대신 이 파일만 옮김.
+#   파일: index_<PC명>_<YYYYMMDD_HHMM>.jsonl.gz (gzip JSON Lines)
+#   1줄 : {"format": "dedup-index", "version": 1, "host": .., "created": .., "roots": [..]}
+#   이후: [경로, 크기, mtime_ns, sha256, blake3]  (작은 파일 빠른 경로는 blake3 빈 칸)
+
+EXPORT_FORMAT  = "dedup-index"
+EXPORT_VERSION = 1
+
+
+def export_name(run_id: str) -> str:
+    return f"index_{HOSTNAME}_{run_id}.jsonl.gz"
+
+
+def write_export(path: Path, roots: "list[str]", rows) -> int:
+    """rows = (경로, 크기, mtime_ns, sha256, blake3) 반복 → 행 수. tmp → replace"""
+    head = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION,
+            "host": socket.gethostname(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "roots": roots}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    n = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(head, ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(list(row), ensure_ascii=False) + "\n")
+            n += 1
+    tmp.replace(path)
+    return n
+
+
+def read_export(path: Path) -> "tuple[dict, list]":
+    """
+    (헤더 dict, [(경로, 크기, mtime_ns, sha256, blake3)]).
+    형식이 다르면 ValueError. 전송 중 잘린 파일은 읽은 곳까지 반환하고 헤더에 "truncated": True.
+    """
+    rows = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            head = json.loads(f.readline())
+        except (ValueError, EOFError, OSError) as e:
+            raise ValueError(f"색인 파일이 아님: {path} ({type(e).__name__})") from e
+        if not isinstance(head, dict) or head.get("format") != EXPORT_FORMAT:
+            raise ValueError(f"색인 파일이 아님: {path}")
+        if int(head.get("version", 0)) > EXPORT_VERSION:
+            raise ValueError(f"지원하지 않는 색인 버전 {head.get('version')}: {path}")
+        try:
+            for line in f:
+                try:
+                    p, sz, mt, sha, b3 = json.loads(line)
+                    rows.append((str(p), int(sz), int(mt), str(sha), str(b3)))
+                except (ValueError, TypeError):
+                    continue
+        except (EOFError, OSError):
+            head["truncated"] = True
+    return head, rows
@@ -0,0 +1,318 @@
+# ============================================================
+# dedup_progress.py
+# ============================================================
+# 01_Dedup_pipe / 02_Full_pipe 를 모듈로 import 해 실행할 때 쓰는 공용 진행 보고.
+#
+#   Reporter      : 로그 출력 함수 + 진행 이벤트 수신 함수 + 중지/일시정지 이벤트 묶음
+#                   (CLI 기본값 = print, 진행 이벤트 없음, 중지 없음)
+#   ProgressMeter : 단계(stage) 하나의 파일 수 / 바이트 누적 → 속도·ETA 계산,
+#                   interval 초마다 ProgressEvent 전달, 중지 요청 시 PipelineStopped,
+#                   일시정지 중에는 파일 사이에서 대기 (열린 파일 없음)
+#   ProgressEvent : GUI 진행 막대용 구조화 이벤트 (로그 문자열 파싱 불필요)
+#   RunLog        : 작업 1회의 전체 로그 → 실행 폴더 run_log.txt (크기 제한 회전)
+#
+# 이어하기 (중지 → 같은 조건으로 다시 실행하면 마지막 완료 파일 다음부터):
+#   RunState      : 실행 폴더의 완료 단계 목록 (run_state.json)
+#   DoneJournal   : 단계 안에서 끝난 항목을 한 줄씩 기록 (JSON Lines, 줄마다 flush)
+#   install_stop_signal : CLI 의 Ctrl+C / Ctrl+Break → 중지 이벤트 (상태 저장 후 종료)
+# ============================================================
+
+import time
+import json
+import signal
+import logging
+import threading
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+
+PROGRESS_INTERVAL = 0.25   # 진행 이벤트 최소 간격 (초)
+
+RUN_LOG_NAME      = "run_log.txt"
+RUN_LOG_MAX_BYTES = 10 * 1024 * 1024   # 10MB 넘으면 run_log.txt.1 … 로 회전
+RUN_LOG_BACKUPS   = 5
+RUN_LOG_PENDING   = 10_000             # 실행 폴더가 정해지기 전 보관할 최대 줄 수
+
+RUN_STATE_NAME    = "run_state.json"
+PAUSE_POLL_SEC    = 0.2
+
+
+class PipelineStopped(Exception):
+    """중지 이벤트가 설정되어 파이프라인을 중단함"""
+
+
+@dataclass
+class ProgressEvent:
+    stage: str                  # 단계 이름 (예: "scan", "hash", "links", "copy")
+    files: int = 0              # 처리한 파일 수
+    total_files: int = 0        # 전체 파일 수 (0 = 미정)
+    bytes: int = 0              # 처리한 바이트
+    total_bytes: int = 0        # 전체 바이트 (0 = 미정)
+    rate: float = 0.0           # 파일/초
+    byte_rate: float = 0.0      # 바이트/초
+    eta: "float | None" = None  # 남은 시간(초), 전체량 미정이면 None
+    done: bool = False          # 단계 종료 이벤트
+
+    @property
+    def fraction(self) -> "float | None":
+        """진행률 0.0~1.0 (바이트 기준 우선, 전체량 미정이면 None)"""
+        if self.total_bytes > 0:
+            return min(1.0, self.bytes / self.total_bytes)
+        if self.total_files > 0:
+            return min(1.0, self.files / self.total_files)
+        return None
+
+
+class ProgressMeter:
+    """단계 하나의 진행 누적기. update() 마다 중지 여부 확인 (여러 작업 스레드에서 호출 가능)."""
+
+    def __init__(self, sink, stage: str, total_files: int = 0, total_bytes: int = 0,
+                 stop=None, pause=None, interval: float = PROGRESS_INTERVAL):
+        self.sink  = sink
+        self.stage = stage
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.stop  = stop
+        self.pause = pause
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self.t0    = time.monotonic()
+        self._next = self.t0
+        self._lock = threading.Lock()
+        self.update(0)               # 단계 시작 이벤트 (GUI 표시 전환)
+
+    def update(self, files: int = 1, nbytes: int = 0):
+        with self._lock:
+            self._update(files, nbytes)
+
+    def _update(self, files: int, nbytes: int):
+        self.files += files
+        self.bytes += nbytes
+        if self.pause is not None and self.pause.is_set():
+            paused_at = time.monotonic()
+            wait_while_paused(self.pause, self.stop)
+            self.t0 += time.monotonic() - paused_at     # 일시정지 시간은 속도 계산에서 제외
+        if self.stop is not None and self.stop.is_set():
+            raise PipelineStopped(self.stage)
+        if self.sink is None:
+            return
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            self.sink(self.event(now))
+
+    def event(self, now: "float | None" = None, done: bool = False) -> ProgressEvent:
+        elapsed = max((now or time.monotonic()) - self.t0, 1e-6)
+        rate, byte_rate = self.files / elapsed, self.bytes / elapsed
+        eta = None
+        if self.total_bytes > 0 and byte_rate > 0:
+            eta = max(0.0, (self.total_bytes - self.bytes) / byte_rate)
+        elif self.total_files > 0 and rate > 0:
+            eta = max(0.0, (self.total_files - self.files) / rate)
+        return ProgressEvent(self.stage, self.files, self.total_files,
+                             self.bytes, self.total_bytes, rate, byte_rate,
+                             0.0 if done else eta, done)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink(self.event(done=True))
+
+
+def wait_while_paused(pause, stop=None):
+    """pause 가 해제되거나 stop 이 설정될 때까지 대기"""
+    while pause.is_set() and not (stop is not None and stop.is_set()):
+        time.sleep(PAUSE_POLL_SEC)
+
+
+def _print_line(msg: str = ""):
+    print(msg, flush=True)
+
+
+class Reporter:
+    """
+    파이프라인 출력 묶음.
+      log(msg)        : 로그 한 줄 (기본 print)
+      meter(...)      : 단계별 ProgressMeter 생성 (progress 가 없으면 이벤트 생략)
+      check()         : 일시정지면 대기, 중지 요청 시 PipelineStopped
+    """
+
+    def __init__(self, log=None, progress=None, stop=None, pause=None):
+        self.log_fn   = log or _print_line
+        self.progress = progress
+        self.stop     = stop
+        self.pause    = pause
+
+    def log(self, msg: str = ""):
+        self.log_fn(msg)
+
+    def meter(self, stage: str, total_files: int = 0, total_bytes: int = 0) -> ProgressMeter:
+        return ProgressMeter(self.progress, stage, total_files, total_bytes,
+                             self.stop, self.pause)
+
+    def check(self):
+        if self.pause is not None:
+            wait_while_paused(self.pause, self.stop)
+        if self.stop is not None and self.stop.is_set():
+            raise PipelineStopped()
+
+
+class RunLog:
+    """
+    작업 1회의 전체 로그 파일 (여러 스레드에서 write 가능).
+    실행 폴더는 작업 도중에 정해지므로 attach(run_dir) 전 줄은
+    최근 RUN_LOG_PENDING 줄까지 메모리에 두었다가 attach 때 한꺼번에 기록.
+    파일을 열 수 없으면 조용히 기록을 생략 (화면 로그는 그대로).
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._pending: deque = deque(maxlen=RUN_LOG_PENDING)
+        self._handler: "RotatingFileHandler | None" = None
+        self._closed  = False
+
+    def attach(self, run_dir: Path):
+        with self._lock:
+            if self._handler is not None or self._closed:
+                return
+            try:
+                run_dir.mkdir(parents=True, exist_ok=True)
+                self._handler = RotatingFileHandler(
+                    run_dir / RUN_LOG_NAME, maxBytes=RUN_LOG_MAX_BYTES,
+                    backupCount=RUN_LOG_BACKUPS, encoding="utf-8")
+            except OSError:
+                self._closed = True
+                self._pending.clear()
+                return
+            for line in self._pending:
+                self._emit(line)
+            self._pending.clear()
+
+    def write(self, line: str):
+        with self._lock:
+            if self._handler is not None:
+                self._emit(line)
+            elif not self._closed:
+                self._pending.append(line)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            if self._handler is not None:
+                self._handler.close()
+                self._handler = None
+
+    def _emit(self, line: str):
+        self._handler.emit(logging.makeLogRecord({"msg": line}))
+
+
+# ---------------- 이어하기 ----------------
+
+class RunState:
+    """
+    실행 폴더의 이어하기 상태 — {"key": {...}, "stages": [...], "finished": bool}.
+      key    : 같은 작업인지 판별 (ROOT·모드 등, 다르면 이어하지 않음)
+      stages : 끝까지 완료한 단계 이름 (다시 실행 시 건너뜀)
+    저장은 tmp → replace (원자적 교체).
+    """
+
+    def __init__(self, path: Path, key: dict):
+        self.path     = path
+        self.key      = key
+        self.stages: "list[str]" = []
+        self.finished = False
+
+    @classmethod
+    def load(cls, path: Path, key: dict) -> "RunState | None":
+        """key 가 같고 끝나지 않은 상태만 반환 (없거나 깨졌으면 None)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(raw, dict) or raw.get("key") != key or raw.get("finished"):
+            return None
+        st = cls(path, key)
+        st.stages = [str(x) for x in raw.get("stages", [])]
+        return st
+
+    def done(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def mark(self, stage: str):
+        if stage not in self.stages:
+            self.stages.append(stage)
+        self.save()
+
+    def finish(self):
+        self.finished = True
+        self.save()
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": self.key, "stages": self.stages,
+                           "finished": self.finished}, f, ensure_ascii=False)
+            tmp.replace(self.path)
+        except OSError:
+            pass
+
+
+class DoneJournal:
+    """
+    단계 안에서 끝난 항목 기록 (JSON Lines, 한 줄 = dict 1개, 줄마다 flush).
+    비정상 종료로 잘린 마지막 줄은 읽을 때 건너뜀. reset=True 면 새로 시작.
+    """
+
+    def __init__(self, path: Path, reset: bool = False):
+        self.path = path
+        self.rows: "list[dict]" = []
+        if reset:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        else:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self.rows.append(json.loads(line))
+                        except ValueError:
+                            continue
+            except OSError:
+                pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def keys(self, field: str) -> set:
+        return {r.get(field) for r in self.rows}
+
+    def add(self, row: dict):
+        self.rows.append(row)
+        self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def install_stop_signal(stop: threading.Event, log=_print_line):
+    """
+    CLI 용: Ctrl+C (SIGINT) / Ctrl+Break (Windows SIGBREAK) → stop 설정.
+    파이프라인은 현재 파일을 마치고 상태를 저장한 뒤 PipelineStopped 로 끝남.
+    한 번 더 누르면 KeyboardInterrupt 로 즉시 중단.
+    """
+    def handler(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        stop.set()
+        log("[STOP] 중지 요청 — 현재 파일까지 저장 후 종료합니다 (다시 누르면 즉시 중단)")
+
+    signal.signal(signal.SIGINT, handler)
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, handler)
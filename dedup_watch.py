@@ -0,0 +1,512 @@
+# ============================================================
+# dedup_watch.py
+# ============================================================
+# ROOT 감시 데몬 — 해시 카탈로그(dedup_catalog) 를 계속 최신으로 유지.
+#   01_Dedup_pipe 의 WATCH 모드가 사용 (python 01_Dedup_pipe_CI_2.7.py → 3).
+#
+#   시작   : ROOT 전체를 1회 대조 → 카탈로그와 크기·mtime 이 다른 파일만 해시,
+#            카탈로그에만 남은(삭제된) 항목은 무효화 기록
+#   Linux  : inotify (ctypes, 추가 모듈 없음) 변경 알림 → 해당 파일만 다시 해시
+#   그 외 / inotify 감시 한도(max_user_watches) 초과 :
+#            WATCH_POLL_SEC 마다 폴더 mtime 만 확인 → 바뀐 폴더만 다시 나열
+#            (내용만 바뀐 파일은 폴더 mtime 이 그대로이므로 WATCH_FULL_SEC 마다 전체 대조)
+#   해시   : 마지막 알림 후 WATCH_SETTLE_SEC 동안 조용해진 파일만, 별도 스레드에서
+#            (프로세스 우선순위를 낮춰 다른 작업 방해 최소화)
+#
+# 하트비트 (<카탈로그>.watch.json) — inotify 로 감시 중이고 대기 해시가 없으면 ready=True.
+#   DUP / BIGFILE 실행은 ready 인 하트비트가 있으면 ROOT 순회 없이 카탈로그에서
+#   바로 후보를 만듦 (live_status).
+#   폴백(poll) 은 내용만 바뀐 파일을 최대 WATCH_FULL_SEC 동안 놓치므로 ready 로 알리지 않음.
+# ============================================================
+
+import os
+import sys
+import json
+import time
+import errno
+import heapq
+import select
+import struct
+import socket
+import threading
+from pathlib import Path
+
+WATCH_SETTLE_SEC = 2.0           # 마지막 변경 알림 후 이만큼 조용하면 해시 (쓰는 중인 파일 반복 해시 방지)
+WATCH_POLL_SEC   = 60.0          # 폴백: 폴더 mtime 확인 주기
+WATCH_FULL_SEC   = 6 * 3600      # 폴백: 전체 대조 주기
+WATCH_FLUSH_SEC  = 5.0           # 카탈로그 기록 주기
+WATCH_BEAT_SEC   = 10.0          # 하트비트 갱신 주기
+WATCH_BEAT_STALE = 3 * WATCH_BEAT_SEC
+WATCH_BEAT_SUFFIX = ".watch.json"
+
+# inotify 상수 (linux/inotify.h)
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR       = 0x40000000
+IN_NONBLOCK    = 0o4000
+IN_CLOEXEC     = 0o2000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+_EV_HEAD = struct.Struct("iIII")   # wd, mask, cookie, len
+
+
+class WatchLimitReached(OSError):
+    """inotify 감시 한도 초과 (fs.inotify.max_user_watches)"""
+
+
+class Inotify:
+    """Linux inotify 최소 래퍼 — 폴더 단위 감시, read() 는 (폴더, mask, 이름) 목록."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._ctypes = ctypes
+        self.wd_dir: "dict[int, str]" = {}
+        self.dir_wd: "dict[str, int]" = {}
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux")
+
+    @staticmethod
+    def max_watches() -> "int | None":
+        try:
+            return int(Path("/proc/sys/fs/inotify/max_user_watches").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def add(self, d: str) -> bool:
+        """폴더 감시 추가. 한도 초과면 WatchLimitReached, 폴더가 사라졌으면 False"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+        if wd < 0:
+            e = self._ctypes.get_errno()
+            if e == errno.ENOSPC:
+                raise WatchLimitReached(e, "inotify max_user_watches")
+            return False
+        self.wd_dir[wd] = d
+        self.dir_wd[d] = wd
+        return True
+
+    def remove(self, d: str):
+        wd = self.dir_wd.pop(d, None)
+        if wd is not None:
+            self.wd_dir.pop(wd, None)
+            self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> "list[tuple[str | None, int, str]]":
+        """이벤트 목록. 큐 넘침(IN_Q_OVERFLOW) 은 (None, mask, "")"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 20)
+        except BlockingIOError:
+            return []
+        out = []
+        pos = 0
+        while pos + _EV_HEAD.size <= len(data):
+            wd, mask, _cookie, n = _EV_HEAD.unpack_from(data, pos)
+            pos += _EV_HEAD.size
+            name = os.fsdecode(data[pos:pos + n].rstrip(b"\0"))
+            pos += n
+            if mask & IN_Q_OVERFLOW:
+                out.append((None, mask, ""))
+                continue
+            if mask & IN_IGNORED:
+                d = self.wd_dir.pop(wd, None)
+                if d is not None and self.dir_wd.get(d) == wd:
+                    del self.dir_wd[d]
+                continue
+            d = self.wd_dir.get(wd)
+            if d is not None:
+                out.append((d, mask, name))
+        return out
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self.wd_dir.clear()
+        self.dir_wd.clear()
+
+
+def lower_priority():
+    """감시 프로세스 우선순위 낮춤 (Windows: 백그라운드 모드 = CPU·I/O 모두, 그 외: nice 10)"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+            k32 = ctypes.windll.kernel32
+            k32.SetPriorityClass(k32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN)
+        else:
+            os.nice(10)
+    except Exception:
+        pass
+
+
+# ---------------- 하트비트 ----------------
+
+def heartbeat_path(catalog_path: Path) -> Path:
+    return catalog_path.with_name(catalog_path.stem + WATCH_BEAT_SUFFIX)
+
+
+def daemon_status(path: Path, root: Path) -> "dict | None":
+    """같은 ROOT 를 감시 중인 데몬의 최근 하트비트면 그 내용 (방식·ready 무관), 아니면 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            beat = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(beat, dict):
+        return None
+    if str(beat.get("root", "")).lower() != str(root).lower():
+        return None
+    if time.time() - float(beat.get("updated", 0)) > WATCH_BEAT_STALE:
+        return None
+    return beat
+
+
+def live_status(path: Path, root: Path) -> "dict | None":
+    """같은 ROOT 를 inotify 로 감시 중이고 대기 해시가 없는 하트비트면 그 내용, 아니면 None"""
+    beat = daemon_status(path, root)
+    if beat is None or not beat.get("ready") or beat.get("mode") != "inotify":
+        return None
+    return beat
+
+
+# ---------------- 감시 ----------------
+
+def _lacks_path(key: str, path: str, extra: dict) -> bool:
+    """대소문자가 섞인 경로인데 항목에 원래 경로가 없음 (이 기능 이전에 CLI 가 기록한 항목)"""
+    return key != path and "path" not in extra
+
+
+class CatalogWatcher:
+    """
+    ROOT 감시 → 카탈로그(dedup_catalog.HashCatalog) 갱신.
+      hash_file(path) : 파일 1개를 해시해 카탈로그에 기록 (크기·mtime 이 같으면 재사용)
+    카탈로그 쓰기(put / evict / flush) 는 해시 스레드 1개에서만 수행.
+    """
+
+    def __init__(self, root: Path, cat, hash_file, log, stop: threading.Event,
+                 use_inotify: bool = True, poll_sec: float = WATCH_POLL_SEC,
+                 settle_sec: float = WATCH_SETTLE_SEC, beat: "Path | None" = None):
+        self.root = str(root)
+        self.prefix = os.path.join(self.root, "").lower()
+        self.cat = cat
+        self.hash_file = hash_file
+        self.log = log
+        self.stop = stop
+        self.poll_sec = poll_sec
+        self.settle_sec = settle_sec
+        self.beat = beat
+        self.ino: "Inotify | None" = None
+        self.mode = "poll"
+        if use_inotify and Inotify.available():
+            try:
+                self.ino = Inotify()
+                self.mode = "inotify"
+            except OSError as e:
+                log(f"[WATCH][WARN] inotify 사용 불가 ({e}) → 폴더 mtime 주기 확인")
+
+        self.dir_mtime: "dict[str, int]" = {}        # 폴더 → mtime_ns
+        self.dir_files: "dict[str, set]" = {}        # 폴더 → 파일 이름
+        self.dir_subs:  "dict[str, set]" = {}        # 폴더 → 하위 폴더 경로
+        self._seen: "set | None" = None              # 전체 대조 중 확인한 key
+
+        self._cv   = threading.Condition()
+        self._due: "dict[str, float]" = {}           # 해시 대기 경로 → 예정 시각
+        self._heap: list = []
+        self._busy = False
+        self.ready = False
+        self._beat_ready = False
+        self.n_hashed = self.n_evicted = self.n_failed = 0
+
+    # ---------- 해시 대기열 ----------
+
+    def schedule(self, path: str, delay: float = 0.0):
+        due = time.monotonic() + delay
+        with self._cv:
+            self._due[path] = due
+            heapq.heappush(self._heap, (due, path))
+            self._cv.notify()
+
+    def _next_due(self) -> "str | None":
+        with self._cv:
+            while not self.stop.is_set():
+                now = time.monotonic()
+                while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)              # 이후 알림으로 미뤄진 항목
+                if self._heap and self._heap[0][0] <= now:
+                    _, path = heapq.heappop(self._heap)
+                    del self._due[path]
+                    self._busy = True
+                    return path
+                if not self._heap and self.cat.buffered:
+                    return None                            # 대기열이 비면 바로 기록
+                wait = self._heap[0][0] - now if self._heap else WATCH_FLUSH_SEC
+                self._cv.wait(min(wait, WATCH_FLUSH_SEC))
+                if not self._heap:
+                    return None
+            return None
+
+    def _worker(self):
+        last_flush = time.monotonic()
+        while not self.stop.is_set():
+            path = self._next_due()
+            if path is not None:
+                self._apply(path)
+                with self._cv:
+                    self._busy = False
+            if path is None or time.monotonic() - last_flush >= WATCH_FLUSH_SEC:
+                self.cat.flush()
+                last_flush = time.monotonic()
+        self.cat.flush()
+
+    def _apply(self, path: str):
+        key = path.lower()
+        try:
+            st = os.stat(path)
+        except OSError:
+            if key in self.cat.index:
+                self.cat.evict(key, "deleted")
+                self.n_evicted += 1
+            return
+        ent = self.cat.index.get(key)
+        if ent is not None and ent[1] == st.st_size and ent[2] == st.st_mtime_ns and ent[3]:
+            if _lacks_path(key, path, ent[3]):
+                # 해시는 그대로, 원래 경로만 보강 (리포트가 소문자 키 대신 실제 경로 사용)
+                self.cat.put(key, ent[0], ent[1], ent[2], {**ent[3], "path": path})
+            return
+        try:
+            self.hash_file(path)
+            self.n_hashed += 1
+        except OSError:
+            self.n_failed += 1
+
+    @property
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._due) + (1 if self._busy else 0)
+
+    # ---------- 폴더 나열 ----------
+
+    def _watch_dir(self, d: str):
+        if self.ino is None:
+            return
+        try:
+            self.ino.add(d)
+        except WatchLimitReached:
+            self.log(f"[WATCH] inotify 감시 한도 초과 (max_user_watches={Inotify.max_watches()}, "
+                     f"감시 폴더 {len(self.ino.dir_wd):,}개) → 폴더 mtime 주기 확인으로 전환")
+            self.ino.close()
+            self.ino = None
+            self.mode = "poll"
+
+    def scan(self, top: str, recursive: bool = True):
+        """
+        폴더 나열 → 카탈로그와 다른 파일 해시 예약, 사라진 파일·하위 폴더 무효화.
+        inotify 는 나열 전에 감시를 걸어 나열 중 생긴 변경도 놓치지 않음.
+        recursive=False 면 처음 보는 하위 폴더만 내려감 (폴백의 폴더 단위 재확인).
+        """
+        stack = [top]
+        while stack and not self.stop.is_set():
+            d = stack.pop()
+            self._watch_dir(d)
+            try:
+                mt = os.stat(d).st_mtime_ns
+                with os.scandir(d) as it:
+                    entries = list(it)
+            except OSError:
+                self.drop_dir(d)
+                continue
+            self.dir_mtime[d] = mt
+            names, subs = set(), set()
+            for e in entries:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        subs.add(e.path)
+                        if recursive or e.path not in self.dir_mtime:
+                            stack.append(e.path)
+                    elif e.is_file(follow_symlinks=False):
+                        names.add(e.name)
+                        self._check(e.path, e.stat(follow_symlinks=False))
+                except OSError:
+                    continue
+            for gone in self.dir_files.get(d, set()) - names:
+                self.schedule(os.path.join(d, gone))
+            for gone in self.dir_subs.get(d, set()) - subs:
+                self.drop_dir(gone)
+            self.dir_files[d] = names
+            self.dir_subs[d] = subs
+
+    def _check(self, path: str, st):
+        key = path.lower()
+        if self._seen is not None:
+            self._seen.add(key)
+        ent = self.cat.index.get(key)
+        if (ent is None or ent[1] != st.st_size or ent[2] != st.st_mtime_ns or not ent[3]
+                or _lacks_path(key, path, ent[3])):
+            self.schedule(path)
+
+    def drop_dir(self, d: str):
+        """사라진 폴더 — 하위 파일 전부 무효화 예약"""
+        stack = [d]
+        while stack:
+            x = stack.pop()
+            if self.ino is not None:
+                self.ino.remove(x)
+            self.dir_mtime.pop(x, None)
+            for name in self.dir_files.pop(x, ()):
+                self.schedule(os.path.join(x, name))
+            stack.extend(self.dir_subs.pop(x, ()))
+
+    def full_scan(self):
+        """ROOT 전체 대조 + 카탈로그에만 남은 항목 무효화"""
+        t0 = time.time()
+        self._seen = set()
+        self.scan(self.root)
+        if self.stop.is_set():
+            self._seen = None
+            return
+        stale = [k for k in list(self.cat.index) if k.startswith(self.prefix) and k not in self._seen]
+        self._seen = None
+        for k in stale:
+            ent = self.cat.index.get(k)
+            extra = ent[3] if ent is not None else None
+            self.schedule((extra or {}).get("path", k))
+        self.log(f"[WATCH] 전체 대조 완료: 폴더 {len(self.dir_mtime):,}개, "
+                 f"해시 대기 {self.pending:,}개, 카탈로그에만 있던 항목 {len(stale):,}개 "
+                 f"({time.time()-t0:.1f}s)")
+
+    # ---------- 변경 처리 ----------
+
+    def _on_event(self, d: "str | None", mask: int, name: str):
+        if d is None:
+            self.log("[WATCH] inotify 이벤트 큐 넘침 → 전체 대조")
+            self.full_scan()
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            if d == self.root:
+                self.log("[WATCH][WARN] ROOT 가 삭제/이동됨")
+            return
+        path = os.path.join(d, name)
+        if mask & IN_ISDIR:
+            subs = self.dir_subs.setdefault(d, set())
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                subs.add(path)
+                self.scan(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                subs.discard(path)
+                self.drop_dir(path)
+            return
+        files = self.dir_files.setdefault(d, set())
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            files.discard(name)
+            self.schedule(path)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_ATTRIB):
+            files.add(name)
+            self.schedule(path, self.settle_sec)
+
+    def _poll(self):
+        """폴백: mtime 이 바뀐 폴더만 다시 나열"""
+        changed = []
+        for d, mt in list(self.dir_mtime.items()):
+            try:
+                if os.stat(d).st_mtime_ns != mt:
+                    changed.append(d)
+            except OSError:
+                changed.append(d)
+        for d in changed:
+            if self.stop.is_set():
+                return
+            self.scan(d, recursive=False)
+        if changed:
+            self.log(f"[WATCH] 변경 폴더 {len(changed):,}개 재확인, 해시 대기 {self.pending:,}개")
+
+    # ---------- 하트비트 ----------
+
+    def is_ready(self) -> bool:
+        return (self.ready and self.mode == "inotify"
+                and self.pending == 0 and not self.cat.buffered)
+
+    def write_beat(self, stopped: bool = False):
+        if self.beat is None:
+            return
+        ready = self.is_ready() and not stopped
+        self._beat_ready = ready
+        beat = {
+            "root": self.root, "pid": os.getpid(), "host": socket.gethostname(),
+            "mode": self.mode, "pending": self.pending, "ready": ready,
+            "hashed": self.n_hashed, "evicted": self.n_evicted, "failed": self.n_failed,
+            "updated": time.time(),
+        }
+        try:
+            tmp = self.beat.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(beat, f, ensure_ascii=False)
+            tmp.replace(self.beat)
+        except OSError:
+            pass
+
+    # ---------- 실행 ----------
+
+    def run(self):
+        """stop 이 설정될 때까지 감시"""
+        worker = threading.Thread(target=self._worker, daemon=True)
+        worker.start()
+        self.log(f"[WATCH] 시작: {self.root} (방식={self.mode}) — 전체 대조 중…")
+        try:
+            self.write_beat()
+            self.full_scan()
+            self.ready = True
+            if self.ino is not None:
+                self.log(f"[WATCH] inotify 감시 폴더 {len(self.ino.dir_wd):,}개")
+            else:
+                self.log("[WATCH] 폴더 mtime 주기 확인 — DUP / BIGFILE 은 평소처럼 순회 "
+                         "(카탈로그 해시는 재사용)")
+            next_beat = next_poll = time.monotonic()
+            next_full = time.monotonic() + WATCH_FULL_SEC
+            while not self.stop.is_set():
+                if self.ino is not None:
+                    for d, mask, name in self.ino.read(1.0):
+                        self._on_event(d, mask, name)
+                else:
+                    self.stop.wait(1.0)
+                    now = time.monotonic()
+                    if now >= next_full:
+                        self.full_scan()
+                        next_full = now + WATCH_FULL_SEC
+                    elif now >= next_poll + self.poll_sec:
+                        self._poll()
+                        next_poll = now
+                # 대기 해시가 생기거나 비면 바로 갱신 (리포트가 오래된 ready 를 보지 않도록)
+                if time.monotonic() >= next_beat or self.is_ready() != self._beat_ready:
+                    self.write_beat()
+                    next_beat = time.monotonic() + WATCH_BEAT_SEC
+        finally:
+            self.stop.set()
+            with self._cv:
+                self._cv.notify_all()
+            worker.join()
+            if self.ino is not None:
+                self.ino.close()
+            self.write_beat(stopped=True)
+            self.log(f"[WATCH] 종료: 해시 {self.n_hashed:,}개, 무효화 {self.n_evicted:,}개, "
+                     f"실패 {self.n_failed:,}개")